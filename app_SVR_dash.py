@@ -1,4 +1,4 @@
-# app_SVR_dash.py (OPRAVENO: PŘÍMÝ IMPORT eic_codes ZNOVU AKTIVOVÁN, pevná volba zemí pro ladění)
+# app_SVR_dash.py (OPRAVENO: PŘÍMÝ IMPORT eic_codes ZNOVU AKTIVOVÁN, výběr více zemí pro srovnání)
 
 import streamlit as st
 import pandas as pd
@@ -6,11 +6,19 @@ from datetime import datetime, timedelta
 import plotly.express as px
 import pytz
 import base64
+import functools
+import json
 
 # Import modulů
-import data_loader as dl 
+import data_orchestrator as do
+import data_cache
+import diagnostics
+import entsoe_http
+import metrics
 import plot_generator as pg 
+import prefetch_scheduler
 import eic_codes # ZNOVU AKTIVOVÁNO: PŘÍMÝ IMPORT eic_codes
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # TOTO MUSÍ BÝT ABSOLUTNĚ PRVNÍ PŘÍKAZ STREAMLITU V CELÉM SKRIPTU.
 st.set_page_config(
@@ -29,6 +37,15 @@ def get_img_as_base64(file):
 
 img = get_img_as_base64("assets/logo.svg")
 
+# Přednačítání dat na pozadí (jeden plánovač pro celý proces)
+prefetch_scheduler.ensure_started()
+
+# Endpoint /metrics pro Prometheus (jeden pro celý proces) a záznam aktivity tohoto sezení
+metrics.ensure_server_started()
+script_run_ctx = get_script_run_ctx()
+if script_run_ctx is not None:
+    metrics.record_session_activity(script_run_ctx.session_id)
+
 # Vytvoření sloupců pro hlavičku
 col1, col2, col3 = st.columns([5, 1, 1])
 
@@ -64,26 +81,26 @@ selected_date = st.sidebar.date_input(
     min_value=datetime(2024, 1, 1).date() # Zabrání výběru příliš starých dat
 )
 
-# Vstup pro výběr země
-country_options =  ["CZ", ]  # Pevná volba zemí pro ladění
-default_country_index = country_options.index('CZ') if 'CZ' in country_options else 0
-selected_country = st.sidebar.selectbox(
-    "Vyberte zemi:",
+# Vstup pro výběr zemí - první vybraná země je hlavní (všechny grafy), další se zobrazí ve srovnání
+MAX_COMPARED_COUNTRIES = 4
+country_options = eic_codes.list_keys() + eic_codes.list_composite_keys() # Složené oblasti (DE) se skládají z regulačních oblastí
+selected_countries = st.sidebar.multiselect(
+    "Vyberte země (první je hlavní, další pro srovnání):",
     options=country_options,
-    index=default_country_index
+    default=["CZ"],
+    max_selections=MAX_COMPARED_COUNTRIES
 )
+if not selected_countries:
+    st.sidebar.warning("Není vybrána žádná země, zobrazuji CZ.")
+    selected_countries = ["CZ"]
+selected_country = selected_countries[0]
 
 # --- Výběr směru nabídkové křivky (pevně "Oba") ---
 selected_bid_direction_filter = "Oba" 
 
 # --- Logika pro slider hodiny a konverze UTC ---
 # Získání časové zóny pro selected_country pro lokální konverzi
-country_timezones_map = {
-    'CZ': 'Europe/Prague',
-    'PL': 'Europe/Berlin', 
-    'AT': 'Europe/Vienna', # NOVÁ ČASOVÁ ZÓNA PRO RAKOUSKO
-}
-user_tz_str = country_timezones_map.get(selected_country, 'UTC') 
+user_tz_str = eic_codes.get_timezone(selected_country)
 user_tz = pytz.timezone(user_tz_str)
 
 days_ago = (today - selected_date).days
@@ -137,74 +154,38 @@ st.header(f"Přehled pro {selected_country} - {selected_date.strftime('%d.%m.%Y'
 
 
 # --- Načtení dat s vizuální zpětnou vazbou v JEDNOM ZAVŘENÉM ST.STATUS BLOKU ---
-day_ahead_data = pd.DataFrame()
-afrr_activation_data = pd.DataFrame()
-procured_capacity_data = pd.DataFrame()
-all_aggregated_bids_data = {} # Pro uložení A67 i A68
-balancing_bids_afrr = pd.DataFrame()
+# Všechny datasety se stahují souběžně (data_orchestrator), status box se plní průběžně,
+# jak jednotlivé dotazy dobíhají.
+page_dataset_labels = {
+    "day_ahead": "Denní ceny",
+    "afrr_activation": "Ceny aktivace aFRR",
+    "procured_capacity": "Data rezervované kapacity",
+    "aggregated_bids_A67": "Agregované nabídky (Central Selection A67)",
+    "aggregated_bids_A68": "Agregované nabídky (Local Selection A68)",
+    "balancing_bids": "Balancing bids pro aFRR",
+}
+page_data = {dataset_name: pd.DataFrame() for dataset_name in page_dataset_labels}
+# Data pro srovnání zemí: dataset -> země -> DataFrame (včetně hlavní země)
+comparison_data = {
+    dataset_name: {country_code: pd.DataFrame() for country_code in selected_countries}
+    for dataset_name in do.COMPARISON_DATASETS
+}
 
 all_data_loaded_successfully = True
 
-# Jediný status box pro všechny načítání
-with st.status("Načítání dat z ENTSOE-E API...", expanded=False) as status:
-    st.write(f"Načítám denní ceny pro {selected_country}...")
-    day_ahead_data = dl.fetch_day_ahead_prices_data(selected_country, selected_date)
-    if day_ahead_data.empty:
-        status.write(f"⚠️ Denní ceny pro {selected_country} nejsou dostupné pro vybrané datum.")
-        all_data_loaded_successfully = False
-    else:
-        status.write(f"✅ Denní ceny pro {selected_country} načteny.")
-    
-    st.write(f"Načítám ceny aktivace aFRR pro {selected_country}...")
-    afrr_activation_data = dl.fetch_afrr_activation_prices_data(selected_date, selected_country)
-    if afrr_activation_data.empty:
-        status.write(f"⚠️ Ceny aktivace aFRR pro {selected_country} nejsou dostupné pro vybrané datum.")
-        all_data_loaded_successfully = False
-    else:
-        status.write(f"✅ Ceny aktivace aFRR pro {selected_country} načteny.")
+# Měření rerunu (časy fází, stav cache, stažená data) pro diagnostický panel a log
+rerun_diagnostics = diagnostics.start_rerun(label=f"{','.join(selected_countries)} {selected_date}")
 
-    st.write(f"Načítám rezervovanou kapacitu pro {selected_country}...")
-    procured_capacity_data = dl.fetch_procured_capacity_data(
-        target_date=selected_date,
-        country_code=selected_country
-    )
-    if procured_capacity_data.empty:
-        status.write(f"⚠️ Data rezervované kapacity pro {selected_country} nejsou dostupná pro vybrané datum.")
-        all_data_loaded_successfully = False
-    else:
-        status.write(f"✅ Data rezervované kapacity pro {selected_country} načtena.")
-
-    st.write(f"Načítám agregované nabídky (Central i Local Selection) pro {selected_country}...")
-    all_aggregated_bids_data = dl.fetch_all_aggregated_bids_data(
-        target_date=selected_date,
-        country_code=selected_country
-    )
-    if all_aggregated_bids_data.get("A67", pd.DataFrame()).empty and all_aggregated_bids_data.get("A68", pd.DataFrame()).empty:
-        status.write(f"⚠️ Agregované nabídky pro {selected_country} nejsou dostupné pro vybrané datum.")
-        all_data_loaded_successfully = False
-    else:
-        status.write(f"✅ Agregované nabídky pro {selected_country} načteny.")
-
-    st.write(f"Načítám balancing bids pro aFRR pro {selected_country}...")
-    balancing_bids_afrr = dl.fetch_balancing_bids_for_day_modular(
-        target_date=selected_date,
-        country_code=selected_country,
-        process_type="A51"
-    )
-    if balancing_bids_afrr.empty:
-        status.write(f"⚠️ Balancing bids pro aFRR pro {selected_country} nejsou dostupné pro vybrané datum.")
-        all_data_loaded_successfully = False
-    else:
-        status.write(f"✅ Balancing bids pro {selected_country} načteny.")
-    
-    # Aktualizace finálního stavu status boxu
-    if all_data_loaded_successfully:
-        status.update(label="Načítání dat dokončeno! ✅", state="complete", expanded=False) 
-    else:
-        status.update(label="Načítání dat dokončeno s problémy. ⚠️", state="error", expanded=True) # Rozbalí se, pokud jsou chyby
+# Jediný status box pro všechny načítání (plní se během vykreslování grafů níže)
+status = st.status("Načítání dat z ENTSOE-E API...", expanded=False)
+page_jobs = do.build_multi_country_jobs(selected_date, selected_countries)
+status.write(f"Načítám data pro {', '.join(selected_countries)} ({len(page_jobs)} datasetů souběžně)...")
 
 
 # --- Rozložení grafů do sloupců a řad (2x2 grid) ---
+# Každý graf má vlastní placeholder a vykreslí se hned, jakmile jsou načtena jeho vstupní data.
+loading_placeholder_text = "⏳ Načítám data pro graf..."
+
 col1_row1, col2_row1 = st.columns(2)
 
 with col1_row1:
@@ -215,14 +196,9 @@ with col1_row1:
     st.write("")  
     st.write("")  
 
-    fig_day_ahead = pg.create_day_ahead_price_plot(
-        df_prices=day_ahead_data, 
-        country=selected_country, 
-        date=selected_date, 
-        user_tz_str=user_tz_str,
-        df_afrr_activation_prices=afrr_activation_data 
-    )
-    st.plotly_chart(fig_day_ahead, use_container_width=True)
+    day_ahead_chart_placeholder = st.empty()
+    day_ahead_chart_placeholder.info(loading_placeholder_text)
+    day_ahead_chart_note_placeholder = st.empty()
 
 with col2_row1:
     st.subheader(f"Agregované aktivace a nabídky aFRR") # Zpět na subheader
@@ -242,21 +218,9 @@ with col2_row1:
         "Central Selection (A67)": "A67",
         "Local Selection (A68)": "A68"
     }[selected_agg_bids_process_type_label]
-    
-    # Zde se vybere již načtený DataFrame
-    aggregated_bids_data_for_plot = all_aggregated_bids_data.get(selected_agg_bids_process_type_code, pd.DataFrame())
 
-    if aggregated_bids_data_for_plot.empty:
-        st.info(f"Žádná data pro {selected_agg_bids_process_type_label} nejsou dostupná.")
-    
-    fig_agg_bids = pg.create_aggregated_bids_plot(
-        df_agg_bids=aggregated_bids_data_for_plot, # Použijeme filtrovaná data
-        country=selected_country,
-        date=selected_date,
-        user_tz_str=user_tz_str,
-        selected_process_type_label=selected_agg_bids_process_type_label # Pro titulek grafu
-    )
-    st.plotly_chart(fig_agg_bids, use_container_width=True)
+    agg_bids_chart_placeholder = st.empty()
+    agg_bids_chart_placeholder.info(loading_placeholder_text)
 
 
 col1_row2, col2_row2 = st.columns(2)
@@ -270,18 +234,84 @@ with col1_row2:
     st.write("")  
     # --- KONEC VKLÁDÁNÍ ---
 
+    bids_curve_chart_placeholder = st.empty()
+    bids_curve_chart_placeholder.info(loading_placeholder_text)
+
+with col2_row2:
+    st.subheader(f"Nabídková křivka rezervovaného výkonu (RV) pro {selected_hour_for_display:02d}:00-{selected_hour_for_display+1:02d}:00") # Zpět na subheader
+    
+    show_weighted_avg_capacity = st.checkbox("Zobrazit vážený průměr ceny RV", key="show_weighted_avg_capacity")
+
+    proc_capacity_chart_placeholder = st.empty()
+    proc_capacity_chart_placeholder.info(loading_placeholder_text)
+
+
+# --- Srovnání zemí (jen při výběru více zemí) ---
+comparison_prices_chart_placeholder = None
+comparison_agg_bids_chart_placeholder = None
+if len(selected_countries) > 1:
+    st.markdown("---")
+    st.header(f"Srovnání zemí: {', '.join(selected_countries)}")
+    col1_row3, col2_row3 = st.columns(2)
+    with col1_row3:
+        st.subheader("Ceny elektřiny na denním trhu a ceny aktivace aFRR")
+        comparison_prices_chart_placeholder = st.empty()
+        comparison_prices_chart_placeholder.info(loading_placeholder_text)
+    with col2_row3:
+        st.subheader(f"Agregované nabídky aFRR ({selected_agg_bids_process_type_label})")
+        comparison_agg_bids_chart_placeholder = st.empty()
+        comparison_agg_bids_chart_placeholder.info(loading_placeholder_text)
+
+
+# --- Funkce pro vykreslení jednotlivých grafů do jejich placeholderů ---
+def render_day_ahead_chart():
+    fig_day_ahead = pg.create_day_ahead_price_plot(
+        df_prices=page_data["day_ahead"], 
+        country=selected_country, 
+        date=selected_date, 
+        user_tz_str=user_tz_str,
+        df_afrr_activation_prices=page_data["afrr_activation"] 
+    )
+    day_ahead_chart_placeholder.plotly_chart(fig_day_ahead, use_container_width=True)
+    averaged_areas = page_data["afrr_activation"].attrs.get(do.UNWEIGHTED_MEAN_ATTR)
+    if averaged_areas:
+        day_ahead_chart_note_placeholder.caption(
+            f"Ceny aktivace aFRR pro {selected_country} jsou neváženým průměrem regulačních oblastí "
+            f"{', '.join(averaged_areas)}, nikoli cenou celé oblasti. Ceny jednotlivých oblastí ukazuje rozpad níže."
+        )
+
+
+def render_agg_bids_chart():
+    # Zde se vybere již načtený DataFrame
+    aggregated_bids_data_for_plot = page_data[f"aggregated_bids_{selected_agg_bids_process_type_code}"]
+
+    with agg_bids_chart_placeholder.container():
+        if aggregated_bids_data_for_plot.empty:
+            st.info(f"Žádná data pro {selected_agg_bids_process_type_label} nejsou dostupná.")
+        
+        fig_agg_bids = pg.create_aggregated_bids_plot(
+            df_agg_bids=aggregated_bids_data_for_plot, # Použijeme filtrovaná data
+            country=selected_country,
+            date=selected_date,
+            user_tz_str=user_tz_str,
+            selected_process_type_label=selected_agg_bids_process_type_label # Pro titulek grafu
+        )
+        st.plotly_chart(fig_agg_bids, use_container_width=True)
+
+
+def render_bids_curve_chart():
     fig_bids_curve, cumulative_bids_data_for_display = pg.create_cumulative_bid_curve_plot(
-        df_raw_bids=balancing_bids_afrr, 
+        df_raw_bids=page_data["balancing_bids"], 
         selected_date=selected_date, 
         bid_curve_filter_hour_utc=bid_curve_filter_hour_utc, 
         day_ahead_line_hour_utc=selected_hour_for_day_ahead_line_and_capacity_filter_utc, 
         country=selected_country,
         bid_type="aFRR",
         display_local_hour=selected_hour_for_display, 
-        df_day_ahead_prices=day_ahead_data, 
+        df_day_ahead_prices=page_data["day_ahead"], 
         selected_bid_direction=selected_bid_direction_filter 
     )
-    st.plotly_chart(fig_bids_curve, use_container_width=True) 
+    bids_curve_chart_placeholder.plotly_chart(fig_bids_curve, use_container_width=True) 
 
     # if st.checkbox("Zobrazit data nabídkových křivek aFRR pro vybranou hodinu", key="raw_data_cumulative_bids"):
     #     if not cumulative_bids_data_for_display.empty:
@@ -290,13 +320,9 @@ with col1_row2:
     #         st.info("Žádná kumulovaná data pro zobrazení.")
 
 
-with col2_row2:
-    st.subheader(f"Nabídková křivka rezervovaného výkonu (RV) pro {selected_hour_for_display:02d}:00-{selected_hour_for_display+1:02d}:00") # Zpět na subheader
-    
-    show_weighted_avg_capacity = st.checkbox("Zobrazit vážený průměr ceny RV", key="show_weighted_avg_capacity")
-
+def render_proc_capacity_chart():
     fig_proc_capacity_curve, cumulative_proc_capacity_data_for_display = pg.create_cumulative_procured_capacity_curve_plot(
-        df_raw_capacity=procured_capacity_data,
+        df_raw_capacity=page_data["procured_capacity"],
         selected_date=selected_date,
         selected_hour_utc=selected_hour_for_day_ahead_line_and_capacity_filter_utc, 
         country=selected_country,
@@ -304,10 +330,170 @@ with col2_row2:
         show_weighted_average=show_weighted_avg_capacity,
         user_tz_str=user_tz_str # <--- TOTO JE DŮLEŽITÉ!
     )
-    st.plotly_chart(fig_proc_capacity_curve, use_container_width=True) 
+    proc_capacity_chart_placeholder.plotly_chart(fig_proc_capacity_curve, use_container_width=True) 
 
     # if st.checkbox("Zobrazit data nabídkových křivek kapacity pro vybranou hodinu", key="raw_data_cumulative_capacity_bids"):
     #     if not cumulative_proc_capacity_data_for_display.empty:
     #         st.dataframe(cumulative_proc_capacity_data_for_display)
     #     else:
-    #         st.info("Žádná kumulovaná data kapacity pro zobrazení.")
\ No newline at end of file
+    #         st.info("Žádná kumulovaná data kapacity pro zobrazení.")
+
+
+def render_comparison_prices_chart():
+    fig_comparison_prices = pg.create_country_comparison_price_plot(
+        day_ahead_by_country=comparison_data["day_ahead"],
+        afrr_activation_by_country=comparison_data["afrr_activation"],
+        date=selected_date,
+        user_tz_str=user_tz_str
+    )
+    comparison_prices_chart_placeholder.plotly_chart(fig_comparison_prices, use_container_width=True)
+
+
+def render_comparison_agg_bids_chart():
+    fig_comparison_agg_bids = pg.create_country_comparison_agg_bids_plot(
+        agg_bids_by_country=comparison_data[f"aggregated_bids_{selected_agg_bids_process_type_code}"],
+        date=selected_date,
+        user_tz_str=user_tz_str,
+        selected_process_type_label=selected_agg_bids_process_type_label
+    )
+    comparison_agg_bids_chart_placeholder.plotly_chart(fig_comparison_agg_bids, use_container_width=True)
+
+
+# Graf -> (vykreslovací funkce, datasety (dataset, země), na kterých závisí)
+pending_charts = {
+    "day_ahead": (render_day_ahead_chart, {("day_ahead", selected_country), ("afrr_activation", selected_country)}),
+    "agg_bids": (render_agg_bids_chart, {(f"aggregated_bids_{selected_agg_bids_process_type_code}", selected_country)}),
+    "bids_curve": (render_bids_curve_chart, {("balancing_bids", selected_country), ("day_ahead", selected_country)}),
+    "proc_capacity": (render_proc_capacity_chart, {("procured_capacity", selected_country)}),
+}
+if len(selected_countries) > 1:
+    pending_charts["comparison_prices"] = (
+        render_comparison_prices_chart,
+        {(dataset_name, country_code) for dataset_name in ("day_ahead", "afrr_activation") for country_code in selected_countries}
+    )
+    pending_charts["comparison_agg_bids"] = (
+        render_comparison_agg_bids_chart,
+        {(f"aggregated_bids_{selected_agg_bids_process_type_code}", country_code) for country_code in selected_countries}
+    )
+finished_datasets = set()
+stale_datasets = [] # Datasety zobrazené ze zastaralé cache (obnovují se na pozadí)
+
+for (dataset_name, country_code), result, error, elapsed_s in do.run_concurrently(page_jobs):
+    label = page_dataset_labels[dataset_name]
+    if error is not None:
+        status.write(f"❌ {label} pro {country_code}: chyba při načítání ({error}).")
+        all_data_loaded_successfully = False
+    elif result is None or result.empty:
+        status.write(f"⚠️ {label} pro {country_code} nejsou dostupné pro vybrané datum.")
+        all_data_loaded_successfully = False
+    else:
+        if country_code == selected_country:
+            page_data[dataset_name] = result
+        if dataset_name in comparison_data:
+            comparison_data[dataset_name][country_code] = result
+        data_stale_since = data_cache.stale_since(result)
+        missing_areas = result.attrs.get(do.MISSING_AREAS_ATTR)
+        if missing_areas:
+            status.write(f"⚠️ {label} pro {country_code}: chybí data regulačních oblastí {', '.join(missing_areas)}, součet je neúplný.")
+        if data_stale_since is not None:
+            stale_datasets.append(f"{label} ({country_code})")
+            status.write(f"🕒 {label} pro {country_code}: zobrazena starší data (stav k {data_stale_since.astimezone(user_tz):%d.%m. %H:%M}), obnovují se na pozadí.")
+        else:
+            status.write(f"✅ {label} pro {country_code} načteny ({elapsed_s:.1f} s).")
+    finished_datasets.add((dataset_name, country_code))
+
+    # Vykreslení všech grafů, jejichž vstupní data jsou nyní kompletní
+    for chart_name, (render_chart, required_datasets) in list(pending_charts.items()):
+        if required_datasets <= finished_datasets:
+            render_chart()
+            del pending_charts[chart_name]
+
+# Rozpad složené oblasti (např. DE) podle regulačních oblastí - načítá se až na vyžádání,
+# obě části souběžně přes orchestrátor (data oblastí jsou po načtení stránky obvykle v cache)
+member_areas = eic_codes.get_member_areas(selected_country)
+if member_areas:
+    with st.expander(f"Rozpad {selected_country} podle regulačních oblastí ({', '.join(member_areas)})"):
+        if st.toggle("Načíst rozpad podle regulačních oblastí", value=False, key="show_composite_breakdown"):
+            breakdown_datasets = {
+                "prices": "afrr_activation",
+                "agg_bids": f"aggregated_bids_{selected_agg_bids_process_type_code}",
+            }
+            breakdown_jobs = {
+                part: functools.partial(do.fetch_composite_area_breakdown, dataset_name, selected_date, selected_country)
+                for part, dataset_name in breakdown_datasets.items()
+            }
+            breakdown = {}
+            for part, result, error, elapsed_s in do.run_concurrently(breakdown_jobs):
+                if error is not None:
+                    st.warning(f"Rozpad {page_dataset_labels[breakdown_datasets[part]]} se nepodařilo načíst ({error}).")
+                breakdown[part] = result or {}
+
+            col1_breakdown, col2_breakdown = st.columns(2)
+            with col1_breakdown:
+                fig_breakdown_prices = pg.create_country_comparison_price_plot(
+                    day_ahead_by_country={},
+                    afrr_activation_by_country=breakdown["prices"],
+                    date=selected_date,
+                    user_tz_str=user_tz_str
+                )
+                st.plotly_chart(fig_breakdown_prices, use_container_width=True)
+            with col2_breakdown:
+                fig_breakdown_agg_bids = pg.create_country_comparison_agg_bids_plot(
+                    agg_bids_by_country=breakdown["agg_bids"],
+                    date=selected_date,
+                    user_tz_str=user_tz_str,
+                    selected_process_type_label=selected_agg_bids_process_type_label
+                )
+                st.plotly_chart(fig_breakdown_agg_bids, use_container_width=True)
+
+# Výpadek ENTSO-E API: dotazy se odmítají bez čekání a zobrazují se poslední dobrá data
+open_circuits = [document_type for document_type, breaker_state in entsoe_http.get_circuit_breaker_states().items() if breaker_state["state"] != "closed"]
+if open_circuits:
+    st.sidebar.warning(f"🔌 ENTSO-E API je momentálně nedostupné (dokumenty {', '.join(open_circuits)}). Zobrazují se poslední uložená data, připojení se průběžně zkouší.")
+
+# Aktualizace finálního stavu status boxu
+if all_data_loaded_successfully and stale_datasets:
+    status.update(label=f"Načítání dat dokončeno, starší data se obnovují na pozadí ({', '.join(stale_datasets)}). 🕒", state="complete", expanded=True)
+elif all_data_loaded_successfully:
+    status.update(label="Načítání dat dokončeno! ✅", state="complete", expanded=False) 
+else:
+    status.update(label="Načítání dat dokončeno s problémy. ⚠️", state="error", expanded=True) # Rozbalí se, pokud jsou chyby
+
+# --- Diagnostika rerunu: kde stránka strávila čas (síť, ZIP, parsování, pandas, grafy) ---
+diagnostics.finish_rerun(rerun_diagnostics)
+metrics.RERUN_DURATION.observe(rerun_diagnostics.wall_s)
+st.sidebar.markdown("---")
+if st.sidebar.checkbox("Zobrazit diagnostiku načítání", value=False, key="show_diagnostics"):
+    diagnostics_summary = rerun_diagnostics.summary()
+    with st.sidebar.expander("Diagnostika posledního načtení", expanded=True):
+        cache_counts = ", ".join(f"{cache_status} {count}" for cache_status, count in diagnostics_summary["cache"].items())
+        st.caption(
+            f"Rerun {diagnostics_summary['wall_s']:.2f} s, staženo {diagnostics_summary['bytes'] / 1024:,.0f} KiB, "
+            f"{diagnostics_summary['rows']:,} řádků dat. Cache: {cache_counts or '-'}."
+        )
+        st.dataframe(
+            pd.DataFrame({"Fáze": list(diagnostics_summary["stages_s"]), "Čas (s)": list(diagnostics_summary["stages_s"].values())}),
+            hide_index=True, use_container_width=True
+        )
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Volání": call["name"],
+                    "Klíč": call["key"],
+                    "Cache": call["cache"] or "",
+                    "Zdroj": call["source"] or "",
+                    "Celkem (s)": call["total_s"],
+                    "KiB": round(call["bytes"] / 1024, 1),
+                    "Řádky": call["rows"],
+                    **{f"{stage_name} (s)": seconds for stage_name, seconds in call["stages_s"].items()},
+                }
+                for call in diagnostics_summary["calls"]
+            ]),
+            hide_index=True, use_container_width=True
+        )
+        st.download_button(
+            "Stáhnout jako JSON",
+            data=json.dumps(diagnostics_summary, ensure_ascii=False, indent=2, default=str),
+            file_name="svr_diagnostics.json",
+            mime="application/json"
+        )
@@ -0,0 +1,194 @@
+# backfill.py
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, timedelta
+from typing import Any, Callable, Iterator
+
+import data_loader as dl
+import data_store
+import eic_codes
+import entsoe_http
+
+"""
+Tento modul obsahuje CLI pro hromadné stažení historických dat (backfill) do lokálního úložiště.
+Používá stejné fetch funkce jako dashboard (data_loader.py), ale bez paměťové cache (data_cache.py),
+takže se historie ukládá jen na disk (data_store.py) a nedrží se v paměti.
+Partition, které už jsou uložené, se přeskakují - přerušený běh tedy stačí spustit znovu.
+
+Použití (z kořene repozitáře, API klíč v .streamlit/secrets.toml):
+
+    python backfill.py --start 2024-01-01 --end 2024-12-31
+    python backfill.py --countries CZ AT --datasets afrr_activation_prices aggregated_bids_A67 --workers 4
+
+Backfill má vlastní limit dotazů (--rate-per-min, SVR_BACKFILL_RATE_PER_MIN), aby spolu s dashboardem
+nepřekročil kvótu ENTSO-E na token.
+"""
+
+# Datasety pro backfill: název -> (fetch funkce s @data_store.persisted, název parametru dne, další argumenty)
+BACKFILL_DATASETS: dict[str, tuple[Callable[..., Any], str, dict]] = {
+    "day_ahead_prices": (dl.fetch_day_ahead_prices_data, "target_date_param", {}),
+    "afrr_activation_prices": (dl.fetch_afrr_activation_prices_data, "target_date", {}),
+    "procured_capacity": (dl.fetch_procured_capacity_data, "target_date", {}),
+    "aggregated_bids_A67": (dl._fetch_single_aggregated_bids_data, "target_date", {"process_type": "A67"}),
+    "aggregated_bids_A68": (dl._fetch_single_aggregated_bids_data, "target_date", {"process_type": "A68"}),
+    "balancing_bids": (dl.fetch_balancing_bids_for_day_modular, "target_date", {"process_type": "A51"}),
+}
+
+# Výchozí počet souběžných dotazů - ENTSO-E omezuje počet dotazů na token
+DEFAULT_WORKERS = 4
+
+# Výchozí limit dotazů/min pro backfill. Běží v samostatném procesu vedle dashboardu (ten má
+# entsoe_http.RATE_LIMIT_PER_MINUTE) a oba sdílí kvótu 400 dotazů/min na token.
+DEFAULT_RATE_PER_MINUTE = float(os.environ.get("SVR_BACKFILL_RATE_PER_MIN", 60))
+
+# Jak často (počet dokončených úloh) se loguje průběh
+PROGRESS_EVERY = 50
+
+
+def _persisted_fetcher(cached_func: Callable[..., Any]) -> Callable[..., Any]:
+    """Vrátí fetch funkci bez paměťové cache (jen vrstvu data_store.persisted)."""
+    return getattr(cached_func, "__wrapped__", cached_func)
+
+
+def iter_backfill_tasks(
+    countries: list[str],
+    start_date: date,
+    end_date: date,
+    datasets: list[str]
+) -> Iterator[tuple[str, str, date, Callable[..., Any], dict]]:
+    """Generuje úlohy (dataset, země, den, fetch funkce, kwargs) od nejnovějšího dne po nejstarší."""
+    day = end_date
+    while day >= start_date:
+        for country_code in countries:
+            for dataset in datasets:
+                cached_func, date_param, extra_kwargs = BACKFILL_DATASETS[dataset]
+                kwargs = {"country_code": country_code, date_param: day, **extra_kwargs}
+                yield dataset, country_code, day, _persisted_fetcher(cached_func), kwargs
+        day -= timedelta(days=1)
+
+
+def run_backfill(
+    countries: list[str],
+    start_date: date,
+    end_date: date,
+    datasets: list[str],
+    workers: int = DEFAULT_WORKERS
+) -> dict[str, int]:
+    """
+    Stáhne a uloží všechny chybějící partition. Vrací počty úloh podle výsledku:
+    skipped (už uloženo), stored (staženo a uloženo), empty (API nevrátilo data),
+    failed (chyba dotazu nebo uložení, výjimka) - takové partition se při dalším běhu zkusí znovu.
+    """
+    last_closed_day = date.today()
+    while not data_store.is_day_closed(last_closed_day):
+        last_closed_day -= timedelta(days=1)
+    if end_date > last_closed_day:
+        logging.warning(f"Dny po {last_closed_day} ještě nejsou uzavřené a neukládají se, backfill končí dnem {last_closed_day}.")
+        end_date = last_closed_day
+
+    counts = {"skipped": 0, "stored": 0, "empty": 0, "failed": 0}
+    started_at = time.monotonic()
+    tasks = iter_backfill_tasks(countries, start_date, end_date, datasets)
+
+    def run_task(dataset, country_code, target_date, fetcher, kwargs) -> str:
+        # Backfill jde přes limiter s nižší prioritou než interaktivní načítání stránky
+        with entsoe_http.request_priority(entsoe_http.PRIORITY_BACKGROUND):
+            df = fetcher(**kwargs)
+        if fetcher.is_stored(**kwargs):
+            return "stored"
+        if df is not None and data_store.INCOMPLETE_ATTR in df.attrs:
+            # Fetch funkce chyby API nevyhazují - prázdný výsledek po chybě není "žádná data"
+            logging.error(f"Backfill {dataset} pro {country_code}, {target_date}: dotaz selhal ({df.attrs[data_store.INCOMPLETE_ATTR]}).")
+            return "failed"
+        if df is None or df.empty:
+            logging.info(f"Backfill {dataset} pro {country_code}, {target_date}: API nevrátilo žádná data.")
+            return "empty"
+        logging.error(f"Backfill {dataset} pro {country_code}, {target_date}: data stažena, ale nepodařilo se je uložit.")
+        return "failed"
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="svr-backfill") as executor:
+        in_flight = {}
+        tasks_exhausted = False
+        try:
+            while in_flight or not tasks_exhausted:
+                # Úlohy se zadávají průběžně, aby víceletý rozsah nevytvořil statisíce futures najednou
+                while not tasks_exhausted and len(in_flight) < workers * 2:
+                    task = next(tasks, None)
+                    if task is None:
+                        tasks_exhausted = True
+                        break
+                    dataset, country_code, target_date, fetcher, kwargs = task
+                    if fetcher.is_stored(**kwargs):
+                        counts["skipped"] += 1
+                        continue
+                    in_flight[executor.submit(run_task, *task)] = task
+
+                if not in_flight:
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dataset, country_code, target_date, _, _ = in_flight.pop(future)
+                    try:
+                        counts[future.result()] += 1
+                    except Exception as e:
+                        logging.error(f"Backfill {dataset} pro {country_code}, {target_date} selhal: {e}")
+                        counts["failed"] += 1
+
+                    processed = counts["stored"] + counts["empty"] + counts["failed"]
+                    if processed % PROGRESS_EVERY == 0:
+                        logging.info(f"Backfill průběh (aktuálně {target_date}): {counts}, {time.monotonic() - started_at:.0f} s")
+        except KeyboardInterrupt:
+            logging.warning("Backfill přerušen, rozpracované dotazy se ruší. Uložené partition zůstávají, běh lze zopakovat.")
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    logging.info(f"Backfill dokončen za {time.monotonic() - started_at:.0f} s: {counts}")
+    return counts
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Hromadné stažení historických dat ENTSO-E do lokálního úložiště.")
+    parser.add_argument("--countries", nargs="+", default=eic_codes.list_keys(),
+                        help="Kódy zemí z eic_codes.py (výchozí: všechny).")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="První den (YYYY-MM-DD).")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today() - timedelta(days=2),
+                        help="Poslední den včetně (YYYY-MM-DD, výchozí: poslední uzavřený den).")
+    parser.add_argument("--datasets", nargs="+", choices=list(BACKFILL_DATASETS), default=list(BACKFILL_DATASETS),
+                        help="Datasety ke stažení (výchozí: všechny).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Počet souběžných dotazů na API.")
+    parser.add_argument("--rate-per-min", type=float, default=DEFAULT_RATE_PER_MINUTE,
+                        help=f"Limit dotazů na API za minutu včetně opakování (výchozí: {DEFAULT_RATE_PER_MINUTE:g}).")
+    args = parser.parse_args(argv)
+
+    unknown_countries = [c for c in args.countries if not eic_codes.get_eic(c)]
+    if unknown_countries:
+        parser.error(f"Neznámé kódy zemí: {', '.join(unknown_countries)}")
+    if args.start > args.end:
+        parser.error("--start nesmí být po --end.")
+    if args.workers < 1:
+        parser.error("--workers musí být alespoň 1.")
+    if args.rate_per_min <= 0:
+        parser.error("--rate-per-min musí být kladné.")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    logging.info(f"Backfill {args.start} až {args.end}, země {args.countries}, datasety {args.datasets}, {args.workers} vláken, {args.rate_per_min:g} dotazů/min.")
+    entsoe_http.rate_limiter.set_rate(args.rate_per_min)
+    try:
+        counts = run_backfill(args.countries, args.start, args.end, args.datasets, args.workers)
+    except KeyboardInterrupt:
+        return 130
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
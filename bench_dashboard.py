@@ -0,0 +1,250 @@
+# bench_dashboard.py
+
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Plánovač prefetchu by během měření stahoval data na pozadí a zkresloval studené běhy
+os.environ.setdefault("SVR_PREFETCH_ENABLED", "0")
+# Endpoint metrik benchmark nepotřebuje (a port může držet běžící dashboard)
+os.environ.setdefault("SVR_METRICS_ENABLED", "0")
+
+from streamlit.testing.v1 import AppTest
+
+import data_loader as dl
+import data_orchestrator as do
+import data_store
+import entsoe_http
+import entsoe_mock_server
+import plot_generator as pg
+
+"""
+Tento modul obsahuje end-to-end benchmark rerunů dashboardu (app_SVR_dash.py).
+Skript aplikace se spouští headless přes streamlit.testing.v1.AppTest proti lokálnímu
+mock serveru (entsoe_mock_server.py) s prázdným úložištěm dat a postupně mění datum,
+výběr zemí, slider hodiny a přepínač A67/A68 - každá změna je jeden rerun jako v prohlížeči.
+
+Rerun je "studený", pokud během něj šel aspoň jeden dotaz na (mock) API, jinak "teplý".
+Pro oba druhy se vypisují percentily doby rerunu a čas strávený v jednotlivých fázích:
+fetch funkcích data_loader (včetně cache vrstev) a funkcích plot_generator.create_*.
+Fetche běží souběžně, součet fází proto může být delší než celý rerun.
+
+Použití (z kořene repozitáře):
+
+    python bench_dashboard.py
+    python bench_dashboard.py --countries CZ CZ,AT DE --days 3 --hours 0 12 --rounds 3
+    python bench_dashboard.py --latency-ms 300 --json bench_dashboard.json
+"""
+
+# Možnosti přepínače agregovaných nabídek v app_SVR_dash.py
+AGG_BIDS_RADIO_OPTIONS = ["Central Selection (A67)", "Local Selection (A68)"]
+
+APP_PATH = Path(__file__).resolve().parent / "app_SVR_dash.py"
+
+# Měřené fáze: (modul, zkratka modulu, názvy funkcí)
+_TIMED_FUNCTIONS = [
+    (dl, "dl", [
+        "fetch_day_ahead_prices_data",
+        "fetch_afrr_activation_prices_data",
+        "fetch_procured_capacity_data",
+        "_fetch_single_aggregated_bids_data",
+        "fetch_balancing_bids_for_day_modular",
+    ]),
+    (do, "do", ["fetch_composite_area", "fetch_composite_area_breakdown"]),
+    (pg, "pg", [name for name in dir(pg) if name.startswith("create_")]),
+]
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StageTimer:
+    """Sčítá čas a počet volání měřených funkcí (thread-safe, fetche běží ve workerech)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(float)
+        self._calls = Counter()
+
+    def wrap(self, stage: str, func):
+        @functools.wraps(func) # Zachová i atributy cache vrstev (.refresh, .clear)
+        def timed(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._durations[stage] += time.perf_counter() - started_at
+                    self._calls[stage] += 1
+        return timed
+
+    def pop(self) -> dict[str, dict]:
+        """Vrátí fáze naměřené od posledního volání a vynuluje je."""
+        with self._lock:
+            stages = {stage: {"s": seconds, "calls": self._calls[stage]} for stage, seconds in self._durations.items()}
+            self._durations.clear()
+            self._calls.clear()
+        return stages
+
+
+def install_stage_timer(timer: StageTimer) -> None:
+    """Obalí měřené funkce v modulech časovačem (aplikace je volá přes atributy modulů)."""
+    for module, label, names in _TIMED_FUNCTIONS:
+        for name in names:
+            setattr(module, name, timer.wrap(f"{label}.{name}", getattr(module, name)))
+
+
+def build_sweep(country_sets: list[list[str]], dates: list, hours: list[int]) -> list[dict]:
+    """Posloupnost stavů widgetů; každý stav je jeden rerun."""
+    return [
+        {"countries": countries, "date": target_date, "hour": hour, "agg_bids": radio_option}
+        for countries in country_sets
+        for target_date in dates
+        for hour in hours
+        for radio_option in AGG_BIDS_RADIO_OPTIONS
+    ]
+
+
+def _apply_step(app: AppTest, step: dict) -> None:
+    app.sidebar.date_input[0].set_value(step["date"])
+    app.sidebar.multiselect[0].set_value(step["countries"])
+    app.sidebar.slider[0].set_value(step["hour"])
+    app.radio(key="agg_bids_radio").set_value(step["agg_bids"])
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Percentil metodou nejbližšího pořadí (bez interpolace)."""
+    ordered = sorted(values)
+    index = max(int(round(percentile / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _timed_run(app: AppTest, server: entsoe_mock_server.MockEntsoeServer, timer: StageTimer, step: dict | None) -> dict:
+    requests_before = sum(server.stats.values())
+    timer.pop()
+    started_at = time.perf_counter()
+    app.run()
+    elapsed_s = time.perf_counter() - started_at
+    requests = sum(server.stats.values()) - requests_before
+    return {
+        "step": {**step, "date": step["date"].isoformat()} if step else "initial",
+        "kind": "cold" if requests else "warm",
+        "elapsed_s": elapsed_s,
+        "api_requests": requests,
+        "stages": timer.pop(),
+        "charts": len(app.get("plotly_chart")),
+        "exceptions": [exception.value for exception in app.exception],
+    }
+
+
+def run_benchmark(country_sets: list[list[str]], dates: list, hours: list[int], rounds: int, timeout: float,
+                  server: entsoe_mock_server.MockEntsoeServer) -> list[dict]:
+    """Projde sweep `rounds`krát a vrátí záznam pro každý rerun (první je výchozí stav stránky)."""
+    timer = StageTimer()
+    install_stage_timer(timer)
+
+    app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    app.secrets["entsoe_api"] = {"token": "benchmark"}
+    runs = [_timed_run(app, server, timer, None)]
+    sweep = build_sweep(country_sets, dates, hours)
+    for round_index in range(rounds):
+        for step in sweep:
+            _apply_step(app, step)
+            runs.append(_timed_run(app, server, timer, step))
+        logging.info(f"Kolo {round_index + 1}/{rounds} hotovo ({len(sweep)} rerunů).")
+    return runs
+
+
+def summarize(runs: list[dict]) -> dict:
+    """Percentily doby rerunu a fází zvlášť pro studené a teplé reruny."""
+    summary = {}
+    for kind in ("cold", "warm"):
+        kind_runs = [run for run in runs if run["kind"] == kind]
+        if not kind_runs:
+            continue
+        stage_names = sorted({stage for run in kind_runs for stage in run["stages"]})
+        summary[kind] = {
+            "reruns": len(kind_runs),
+            "rerun_ms": {f"p{p}": round(_percentile([run["elapsed_s"] for run in kind_runs], p) * 1000, 1) for p in PERCENTILES},
+            "stages_ms": {
+                stage: {
+                    f"p{p}": round(_percentile([run["stages"].get(stage, {"s": 0.0})["s"] for run in kind_runs], p) * 1000, 1)
+                    for p in (50, 95)
+                } | {"calls_per_rerun": round(sum(run["stages"].get(stage, {"calls": 0})["calls"] for run in kind_runs) / len(kind_runs), 1)}
+                for stage in stage_names
+            },
+        }
+    return summary
+
+
+def _format_summary(summary: dict) -> str:
+    lines = []
+    for kind, kind_summary in summary.items():
+        rerun_ms = kind_summary["rerun_ms"]
+        lines.append(f"{kind.upper()} reruny ({kind_summary['reruns']}): " + ", ".join(f"{name} {value:,.0f} ms" for name, value in rerun_ms.items()))
+        lines.append(f"  {'fáze':<48}{'p50 ms':>10}{'p95 ms':>10}{'volání':>9}")
+        for stage, stage_ms in sorted(kind_summary["stages_ms"].items(), key=lambda item: -item[1]["p50"]):
+            lines.append(f"  {stage:<48}{stage_ms['p50']:>10,.1f}{stage_ms['p95']:>10,.1f}{stage_ms['calls_per_rerun']:>9}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark rerunů dashboardu (headless AppTest proti mock serveru ENTSOE-E API).")
+    parser.add_argument("--countries", nargs="+", default=["CZ", "CZ,AT"],
+                        help="Výběry zemí ve sweepu, země jednoho výběru oddělené čárkou (výchozí: CZ a CZ,AT).")
+    parser.add_argument("--days", type=int, default=2, help="Počet dní zpět od dneška ve sweepu (výchozí 2).")
+    parser.add_argument("--hours", nargs="+", type=int, default=[0, 8, 18], help="Hodiny slideru ve sweepu.")
+    parser.add_argument("--rounds", type=int, default=2, help="Kolikrát se sweep projde (další kola jsou teplá).")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latence mock serveru (ms).")
+    parser.add_argument("--fixtures-dir", default=None, help="Adresář s nahranými odpověďmi pro mock server.")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout jednoho rerunu (s).")
+    parser.add_argument("--json", type=Path, default=None, help="Uloží souhrn a všechny reruny do JSON souboru.")
+    args = parser.parse_args(argv)
+
+    args.country_sets = [[code.strip().upper() for code in selection.split(",") if code.strip()] for selection in args.countries]
+    if any(not selection for selection in args.country_sets):
+        parser.error("--countries obsahuje prázdný výběr.")
+    if args.days < 1 or args.rounds < 1:
+        parser.error("--days a --rounds musí být alespoň 1.")
+    if any(not 0 <= hour <= 23 for hour in args.hours):
+        parser.error("--hours musí být v rozsahu 0-23.")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = _parse_args(argv)
+
+    today = datetime.now().date()
+    dates = [today - timedelta(days=offset) for offset in range(args.days)]
+
+    with tempfile.TemporaryDirectory(prefix="svr-bench-store-") as store_dir, \
+            entsoe_mock_server.MockEntsoeServer(latency_ms=args.latency_ms, fixtures_dir=args.fixtures_dir) as server:
+        # Prázdné úložiště a mock API, aby první načtení každého dne bylo opravdu studené
+        data_store.STORE_DIR = Path(store_dir)
+        entsoe_http.ENTSOE_API_URL = server.base_url
+        runs = run_benchmark(args.country_sets, dates, args.hours, args.rounds, args.timeout, server)
+
+    summary = summarize(runs)
+    print(_format_summary(summary))
+
+    failed_runs = [run for run in runs if run["exceptions"]]
+    for run in failed_runs:
+        print(f"CHYBA v rerunu {run['step']}: {run['exceptions'][0][:200]}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"summary": summary, "runs": runs}, indent=2, ensure_ascii=False))
+    return 1 if failed_runs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
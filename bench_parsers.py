@@ -0,0 +1,239 @@
+# bench_parsers.py
+
+import argparse
+import functools
+import gc
+import io
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import data_loader as dl
+import entsoe_documents
+import entsoe_fixtures
+import entsoe_xml
+
+"""
+Tento modul obsahuje benchmark XML parserů z data_loader.py nad syntetickými dokumenty
+(entsoe_fixtures.py) realistických i větších velikostí, včetně ZIP a vnořeného ZIP balení.
+Pro každý případ měří propustnost (body/s, medián z opakování), špičku paměti (tracemalloc),
+počet alokovaných bloků, které po parsování zůstanou držené výsledkem, a počet gen0 garbage collection.
+Výsledky se porovnávají s uloženými baseline (bench_parsers_baseline.json) - regrese
+nad toleranci vrátí nenulový exit kód, takže je vidět při review.
+
+Měří se XML backend zvolený v entsoe_xml.py (lxml, pokud je nainstalované), jiný lze vybrat
+přes --backend. Baseline se ukládá zvlášť pro každý backend; platí pro stroj, na kterém byla
+naměřena - po změně parseru nebo stroje ji přegenerujte.
+
+Použití (z kořene repozitáře):
+
+    python bench_parsers.py
+    python bench_parsers.py --cases a37_daily a37_daily_nested_zip --repeat 10
+    python bench_parsers.py --scale 10               # 10x více časových řad
+    python bench_parsers.py --backend etree
+    python bench_parsers.py --update-baseline
+"""
+
+BASELINE_PATH = Path(__file__).resolve().parent / "bench_parsers_baseline.json"
+
+# Povolená odchylka od baseline (propustnost níž, paměť a bloky výš), než se případ označí jako regrese
+DEFAULT_TOLERANCE = 0.20
+
+DEFAULT_REPEAT = 5
+
+_DOMAIN = "10YCZ-CEPS-----N"
+_PERIOD_START = datetime(2025, 6, 1, 22, 0)
+
+# Případy: název -> (parser, typ dokumentu, časové řady, periody na řadu, body na periodu, rozlišení min, balení)
+# Balení: "xml", "zip" (více XML v ZIPu), "nested_zip" (každé XML ve vlastním vnitřním ZIPu)
+BENCHMARK_CASES = {
+    "a37_hourly": ("reserve_bids", "A37", 400, 1, 4, 15, "xml"),
+    "a37_daily": ("reserve_bids", "A37", 1000, 24, 4, 15, "xml"),
+    "a37_daily_nested_zip": ("reserve_bids", "A37", 1000, 24, 4, 15, "nested_zip"),
+    "a15_daily_4h_blocks": ("procured_capacity", "A15", 60, 6, 16, 15, "xml"),
+    "a15_daily_60min": ("procured_capacity", "A15", 60, 1, 24, 60, "zip"),
+    "a24_daily": ("aggregated_bids", "A24", 2, 1, 96, 15, "xml"),
+    "a24_week_many_series": ("aggregated_bids", "A24", 40, 1, 672, 15, "xml"),
+    "a84_daily": ("activation_prices", "A84", 2, 1, 96, 15, "xml"),
+    "a84_week_many_series": ("activation_prices", "A84", 40, 1, 672, 15, "xml"),
+    "a84_daily_60min": ("activation_prices", "A84", 2, 1, 24, 60, "xml"),
+}
+
+# Počet XML dokumentů v ZIP balení
+ZIP_PARTS = 4
+
+
+def _parse_reserve_bids(document: bytes, xml_backend: str | None = None):
+    columns = dl._new_reserve_bid_columns()
+    for _, xml_stream in entsoe_documents.iter_xml_streams(io.BytesIO(document), "benchmark A37"):
+        dl._parse_reserve_bid_xml_modular(xml_stream, "A51", _DOMAIN, columns, xml_backend=xml_backend)
+    return columns.to_frame()
+
+
+def _parse_procured_capacity(document: bytes, xml_backend: str | None = None):
+    columns = dl._new_procured_capacity_columns()
+    for _, xml_stream in entsoe_documents.iter_xml_streams(io.BytesIO(document), "benchmark A15"):
+        dl._parse_procured_capacity_xml_modular(xml_stream, "A51", _DOMAIN, "A01", columns, xml_backend=xml_backend)
+    return columns.to_frame()
+
+
+def _parse_frames(parser):
+    def parse(document: bytes, xml_backend: str | None = None):
+        frames = [parser(xml_stream, xml_backend=xml_backend) for _, xml_stream in entsoe_documents.iter_xml_streams(io.BytesIO(document), "benchmark")]
+        return frames[0] if len(frames) == 1 else frames
+    return parse
+
+
+PARSERS = {
+    "reserve_bids": _parse_reserve_bids,
+    "procured_capacity": _parse_procured_capacity,
+    "aggregated_bids": _parse_frames(dl._parse_aggregated_bids_xml_modular),
+    "activation_prices": _parse_frames(dl._parse_activated_balancing_price_xml_modular),
+}
+
+
+def build_document(document_type: str, n_series: int, n_periods: int, points_per_period: int, resolution_minutes: int, packaging: str) -> bytes:
+    """Vygeneruje dokument daného tvaru (časové řady × periody × body) a zabalí ho podle `packaging`."""
+    period_end = _PERIOD_START + timedelta(minutes=resolution_minutes * points_per_period * n_periods)
+    if document_type == "A37":
+        documents = entsoe_fixtures.split_reserve_bid_document(
+            _PERIOD_START, period_end, _DOMAIN, n_series=n_series, parts=ZIP_PARTS if packaging != "xml" else 1,
+            n_periods=n_periods, resolution_minutes=resolution_minutes)
+    else:
+        documents = {f"{document_type}.xml": entsoe_fixtures.balancing_document(
+            document_type, _PERIOD_START, period_end, _DOMAIN, n_series=n_series,
+            n_periods=n_periods, resolution_minutes=resolution_minutes)}
+
+    if packaging == "xml":
+        return next(iter(documents.values()))
+    return entsoe_fixtures.zip_documents(documents, nested=packaging == "nested_zip")
+
+
+def _rows(result) -> int:
+    return sum(len(frame) for frame in result) if isinstance(result, list) else len(result)
+
+
+def run_case(name: str, scale: float = 1.0, repeat: int = DEFAULT_REPEAT, xml_backend: str | None = None) -> dict:
+    """Změří jeden případ z BENCHMARK_CASES a vrátí výsledky (propustnost, paměť, alokace)."""
+    parser_name, document_type, n_series, n_periods, points_per_period, resolution_minutes, packaging = BENCHMARK_CASES[name]
+    n_series = max(int(n_series * scale), 1)
+    document = build_document(document_type, n_series, n_periods, points_per_period, resolution_minutes, packaging)
+    parse = functools.partial(PARSERS[parser_name], xml_backend=xml_backend)
+    points = n_series * n_periods * points_per_period
+
+    parse(document) # Zahřátí (importy, cache regexů a kategorií)
+    durations = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        parse(document)
+        durations.append(time.perf_counter() - started_at)
+    median_s = statistics.median(durations)
+
+    # Paměť a alokace se měří zvlášť - tracemalloc parsování výrazně zpomaluje
+    gc.collect()
+    gc_collections_before = gc.get_stats()[0]["collections"]
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = parse(document)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+    gc_collections = gc.get_stats()[0]["collections"] - gc_collections_before
+
+    return {
+        "document_kib": round(len(document) / 1024, 1),
+        "points": points,
+        "rows": _rows(result),
+        "median_ms": round(median_s * 1000, 2),
+        "points_per_s": round(points / median_s),
+        "peak_kib": round(peak_bytes / 1024, 1),
+        "retained_blocks": retained_blocks,
+        "gc_gen0_collections": gc_collections,
+    }
+
+
+def compare_with_baseline(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Vrátí seznam regresí proti baseline (prázdný, pokud je vše v toleranci)."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["rows"] != expected["rows"]:
+            regressions.append(f"{name}: počet řádků {result['rows']} != baseline {expected['rows']}")
+        if result["points_per_s"] < expected["points_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: propustnost {result['points_per_s']:,} bodů/s < baseline {expected['points_per_s']:,}")
+        if result["peak_kib"] > expected["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{name}: špička paměti {result['peak_kib']:,} KiB > baseline {expected['peak_kib']:,}")
+        if result["retained_blocks"] > expected["retained_blocks"] * (1 + tolerance) + 100:
+            regressions.append(f"{name}: držené bloky {result['retained_blocks']:,} > baseline {expected['retained_blocks']:,}")
+    return regressions
+
+
+def _format_table(results: dict[str, dict], baseline: dict[str, dict]) -> str:
+    header = f"{'případ':<24}{'KiB':>9}{'body':>9}{'ms':>10}{'body/s':>13}{'vs. base':>10}{'peak KiB':>11}{'bloky':>9}{'gc0':>6}"
+    lines = [header, "-" * len(header)]
+    for name, result in results.items():
+        expected = baseline.get(name)
+        ratio = f"{result['points_per_s'] / expected['points_per_s']:.2f}x" if expected else "-"
+        lines.append(
+            f"{name:<24}{result['document_kib']:>9,.0f}{result['points']:>9,}{result['median_ms']:>10,.1f}"
+            f"{result['points_per_s']:>13,}{ratio:>10}{result['peak_kib']:>11,.0f}{result['retained_blocks']:>9,}{result['gc_gen0_collections']:>6}"
+        )
+    return "\n".join(lines)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark XML parserů ENTSO-E dokumentů nad syntetickými daty.")
+    parser.add_argument("--cases", nargs="+", choices=list(BENCHMARK_CASES), default=list(BENCHMARK_CASES),
+                        help="Případy k měření (výchozí: všechny).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Počet opakování pro medián času.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Násobek počtu časových řad (velikosti dokumentů).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Povolená odchylka od baseline (0.2 = 20 %%).")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Soubor s baseline.")
+    parser.add_argument("--backend", choices=entsoe_xml.BACKENDS, default=entsoe_xml.backend,
+                        help=f"XML backend parserů (výchozí v tomto prostředí: {entsoe_xml.backend}).")
+    parser.add_argument("--update-baseline", action="store_true", help="Uloží výsledky jako novou baseline.")
+    parser.add_argument("--json", type=Path, default=None, help="Uloží výsledky do JSON souboru.")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat musí být alespoň 1.")
+    if args.update_baseline and args.scale != 1.0:
+        parser.error("Baseline se ukládá jen pro --scale 1.")
+    if entsoe_xml.resolve_backend(args.backend) != args.backend:
+        parser.error(f"XML backend {args.backend} není v tomto prostředí dostupný.")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = _parse_args(argv)
+
+    results = {name: run_case(name, args.scale, args.repeat, args.backend) for name in args.cases}
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() and args.scale == 1.0 else {}
+    baseline = baselines.get(args.backend, {})
+    print(f"XML backend: {args.backend}")
+    print(_format_table(results, baseline))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.update_baseline:
+        baselines[args.backend] = {**baseline, **results}
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline pro backend {args.backend} uložena do {args.baseline}.")
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESE: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
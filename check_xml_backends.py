@@ -0,0 +1,200 @@
+# check_xml_backends.py
+
+import argparse
+import logging
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+import bench_parsers
+import entsoe_fixtures
+import entsoe_xml
+
+"""
+Tento modul obsahuje diferenciální kontrolu XML backendů (entsoe_xml.py): každý dokument
+z korpusu se zparsuje parsery z data_loader.py jednou přes lxml a jednou přes ElementTree
+a výsledné DataFrame se musí shodovat včetně typů a kategorií. Výjimka je rozdíl, pokud ji
+dokument nemá vyvolat záměrně (_EXPECTED_ERRORS); u poškozených dokumentů (_BROKEN_SUFFIXES)
+musí selhat oba backendy, typ výjimky se ale může lišit.
+
+Korpus tvoří syntetické dokumenty (entsoe_fixtures.py) ve tvarech benchmarku parserů
+(bench_parsers.py), jejich úpravy na okrajové případy (chybějící a prázdné hodnoty,
+alternativní tagy, chybějící start periody, useknuté XML) a volitelně nahrané odpovědi
+mock serveru (entsoe_mock_server.py --record-from ... --fixtures-dir ...).
+
+Použití (z kořene repozitáře, vyžaduje nainstalované lxml):
+
+    python check_xml_backends.py
+    python check_xml_backends.py --fixtures-dir fixtures/ --verbose
+
+Stejná kontrola běží v testech (tests/test_xml_backends.py, nahrané odpovědi přes SVR_XML_FIXTURES_DIR).
+"""
+
+# Parser podle typu dokumentu (stejné funkce jako v benchmarku parserů)
+PARSER_BY_DOCUMENT_TYPE = {
+    "A37": "reserve_bids",
+    "A15": "procured_capacity",
+    "A24": "aggregated_bids",
+    "A84": "activation_prices",
+}
+
+# Tag hodnoty, na které se zkouší chybějící a prázdné hodnoty
+_VALUE_TAG_BY_DOCUMENT_TYPE = {
+    "A37": "energy_Price.amount",
+    "A15": "procurement_Price.amount",
+    "A24": "secondaryQuantity",
+    "A84": "activation_Price.amount",
+}
+
+
+# Dokumenty, které parsery záměrně odmítají výjimkou (přípona názvu -> typ výjimky):
+# prázdný element hodnoty neprojde float() u obou backendů, stejně jako v původním parseru ElementTree
+_EXPECTED_ERRORS = {
+    "_empty_values": ValueError,
+}
+
+# Poškozené dokumenty - pokud selžou, musí selhat oba backendy, typ výjimky se může lišit
+_BROKEN_SUFFIXES = ("_truncated", "_zip_with_broken_part")
+
+
+def _drop_every_nth(document: bytes, tag: str, n: int) -> bytes:
+    """Odstraní každý n-tý element `tag` (hodnota pak chybí jen v části bodů periody)."""
+    counter = iter(range(10**9))
+    pattern = re.compile(rf"<{re.escape(tag)}>[^<]*</{re.escape(tag)}>".encode())
+    return pattern.sub(lambda match: b"" if next(counter) % n == 0 else match.group(0), document)
+
+
+def _empty_every_nth(document: bytes, tag: str, n: int) -> bytes:
+    """Vyprázdní každý n-tý element `tag` (findtext vrací "")."""
+    counter = iter(range(10**9))
+    pattern = re.compile(rf"<{re.escape(tag)}>[^<]*</{re.escape(tag)}>".encode())
+    return pattern.sub(lambda match: f"<{tag}/>".encode() if next(counter) % n == 0 else match.group(0), document)
+
+
+def _drop_every_other_period_start(document: bytes) -> bytes:
+    counter = iter(range(10**9))
+    pattern = re.compile(rb"<Period><timeInterval><start>[^<]*</start>")
+    return pattern.sub(lambda match: b"<Period><timeInterval>" if next(counter) % 2 else match.group(0), document)
+
+
+def _document(document_type: str, n_series: int, n_periods: int, points_per_period: int, resolution_minutes: int) -> bytes:
+    return bench_parsers.build_document(document_type, n_series, n_periods, points_per_period, resolution_minutes, "xml")
+
+
+def build_corpus() -> dict[str, tuple[str, bytes]]:
+    """Vrátí korpus {název: (typ dokumentu, obsah odpovědi)}."""
+    corpus = {}
+    for name, (_, document_type, n_series, n_periods, points_per_period, resolution_minutes, packaging) in bench_parsers.BENCHMARK_CASES.items():
+        # Menší verze případů benchmarku; ZIP balení se zkouší u všech typů
+        n_series = max(n_series // 10, 2)
+        corpus[name] = (document_type, bench_parsers.build_document(document_type, n_series, n_periods, points_per_period, resolution_minutes, packaging))
+
+    for document_type in PARSER_BY_DOCUMENT_TYPE:
+        value_tag = _VALUE_TAG_BY_DOCUMENT_TYPE[document_type]
+        # Krátké periody čte lxml po bodech, dlouhé po sloupcích - okrajové případy pro obě cesty
+        for shape, (n_periods, points_per_period) in {"short": (6, 4), "long": (3, 48)}.items():
+            for resolution_minutes in (15, 60):
+                document = _document(document_type, 3, n_periods, points_per_period, resolution_minutes)
+                prefix = f"{document_type.lower()}_{shape}_{resolution_minutes}min"
+                corpus[prefix] = (document_type, document)
+                corpus[f"{prefix}_missing_values"] = (document_type, _drop_every_nth(document, value_tag, 5))
+                corpus[f"{prefix}_all_values_missing"] = (document_type, _drop_every_nth(document, value_tag, 1))
+                corpus[f"{prefix}_empty_values"] = (document_type, _empty_every_nth(document, value_tag, 7))
+                corpus[f"{prefix}_missing_start"] = (document_type, _drop_every_other_period_start(document))
+                corpus[f"{prefix}_truncated"] = (document_type, document[:len(document) * 3 // 5])
+                corpus[f"{prefix}_zip"] = (document_type, entsoe_fixtures.zip_documents({"a.xml": document, "b.xml": document}))
+                corpus[f"{prefix}_zip_with_broken_part"] = (document_type, entsoe_fixtures.zip_documents(
+                    {"a.xml": document, "b.xml": document[:len(document) // 2], "c.xml": _drop_every_nth(document, value_tag, 3)}, nested=True))
+
+    # A37 s alternativními tagy výkonu a ceny (starší verze schématu)
+    document = _document("A37", 3, 4, 24, 15)
+    corpus["a37_alternative_tags"] = ("A37", document.replace(b"quantity.quantity>", b"quantity>").replace(b"energy_Price.amount>", b"price.amount>"))
+    corpus["a37_mixed_alternative_tags"] = ("A37", _drop_every_nth(document, "energy_Price.amount", 2).replace(b"<Point><position>3</position>", b"<Point><position>3</position><Price.amount>1.5</Price.amount>"))
+    corpus["a37_missing_power"] = ("A37", _drop_every_nth(document, "quantity.quantity", 4))
+    return corpus
+
+
+def load_fixtures(fixtures_dir: Path) -> dict[str, tuple[str, bytes]]:
+    """Nahrané odpovědi mock serveru ({typ dokumentu}_{hash}.xml/.zip) pro typy s XML parserem."""
+    corpus = {}
+    for path in sorted(fixtures_dir.glob("*")):
+        document_type = path.name.split("_", 1)[0]
+        if path.suffix in (".xml", ".zip") and document_type in PARSER_BY_DOCUMENT_TYPE:
+            corpus[f"fixture:{path.name}"] = (document_type, path.read_bytes())
+    return corpus
+
+
+def _parse(document_type: str, content: bytes, xml_backend: str):
+    """Zparsuje odpověď stejně jako benchmark parserů; vrací DataFrame, seznam DataFrame nebo výjimku."""
+    try:
+        return bench_parsers.PARSERS[PARSER_BY_DOCUMENT_TYPE[document_type]](content, xml_backend=xml_backend)
+    except Exception as e:
+        return e
+
+
+def _frames(result) -> list[pd.DataFrame]:
+    return result if isinstance(result, list) else [result]
+
+
+def compare(name: str, document_type: str, content: bytes) -> str | None:
+    """Zparsuje dokument oběma backendy; vrací popis rozdílu nebo None při shodě."""
+    lxml_result, etree_result = (_parse(document_type, content, backend) for backend in ("lxml", "etree"))
+
+    if isinstance(lxml_result, Exception) or isinstance(etree_result, Exception):
+        both_failed = isinstance(lxml_result, Exception) and isinstance(etree_result, Exception)
+        expected_error = next((error for suffix, error in _EXPECTED_ERRORS.items() if name.endswith(suffix)), None)
+        if both_failed and expected_error is not None and type(lxml_result) is type(etree_result) is expected_error:
+            return None
+        if both_failed and name.endswith(_BROKEN_SUFFIXES):
+            return None
+        return f"{name}: lxml -> {lxml_result!r}, etree -> {etree_result!r}"
+
+    lxml_frames, etree_frames = _frames(lxml_result), _frames(etree_result)
+    if len(lxml_frames) != len(etree_frames):
+        return f"{name}: počet DataFrame lxml {len(lxml_frames)} != etree {len(etree_frames)}"
+    for index, (lxml_frame, etree_frame) in enumerate(zip(lxml_frames, etree_frames)):
+        try:
+            pd.testing.assert_frame_equal(lxml_frame, etree_frame, check_exact=True, check_categorical=True)
+        except AssertionError as e:
+            return f"{name}[{index}]: {e}"
+    return None
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Diferenciální kontrola XML backendů lxml a ElementTree nad korpusem dokumentů.")
+    parser.add_argument("--fixtures-dir", type=Path, default=None, help="Adresář s nahranými odpověďmi mock serveru.")
+    parser.add_argument("--verbose", action="store_true", help="Vypíše každý zkontrolovaný dokument.")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    # Parsery u nevalidních dokumentů záměrně logují varování (data_loader už logging nastavil na INFO)
+    logging.getLogger().setLevel(logging.ERROR)
+    args = _parse_args(argv)
+
+    if entsoe_xml.lxml_etree is None:
+        print("lxml není nainstalované, není co porovnávat (pip install lxml).")
+        return 2
+
+    corpus = build_corpus()
+    if args.fixtures_dir:
+        corpus.update(load_fixtures(args.fixtures_dir))
+
+    mismatches = []
+    for name, (document_type, content) in corpus.items():
+        mismatch = compare(name, document_type, content)
+        if mismatch:
+            mismatches.append(mismatch)
+        if args.verbose:
+            print(f"{'ROZDÍL' if mismatch else 'OK':<7}{name}")
+
+    for mismatch in mismatches:
+        print(f"ROZDÍL: {mismatch}")
+    print(f"Zkontrolováno {len(corpus)} dokumentů, rozdílů: {len(mismatches)}.")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
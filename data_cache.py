@@ -0,0 +1,333 @@
+# data_cache.py
+
+import functools
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytz
+
+import data_store
+import diagnostics
+import eic_codes
+import entsoe_http
+import metrics
+import single_flight
+
+"""
+Tento modul obsahuje paměťovou cache fetch funkcí z data_loader.py s dobou platnosti podle stáří dat.
+st.cache_data umí jen jedno TTL pro celou funkci, tady má každý záznam vlastní expiraci:
+
+    uzavřený den (data se už nemění)    bez expirace
+    minulý, ještě neuzavřený den        PAST_DAY_TTL (pozdní publikace a opravy)
+    aktuální den                        do další publikace podle rozlišení datasetu (INTRADAY_PUBLICATION)
+    budoucí den                         do očekávané publikace (aukce DA, bloky kapacitních aukcí)
+
+Prázdné výsledky (NoMatchingData, chyba API) se drží zvlášť v negativní cache: další pokus
+přijde až po exponenciálně rostoucím intervalu (nejdřív ale v čase daném tabulkou výše),
+takže reruny skriptu neposílají opakované dotazy na data, která ještě neexistují.
+
+Po vypršení se záznam neblokuje: volající hned dostane poslední dobrá data (stale-while-revalidate,
+označená v DataFrame.attrs, viz stale_since) a obnova proběhne na pozadí.
+Data, která data_store vrátil jako poslední dobrý výsledek (výpadek API), nesou svůj
+původní čas stažení a do cache se ukládají jen na krátko (LAST_GOOD_TTL).
+Neúplné výsledky (část odpovědi se nepodařilo zpracovat) platí jen INCOMPLETE_RESULT_TTL.
+
+Cache je sdílená celým procesem (všemi sezeními) a volajícím vrací kopie DataFrame,
+stejně jako st.cache_data.
+"""
+
+# Maximální počet záznamů v cache; při překročení se zahazují nejdéle nepoužité
+MAX_ENTRIES = 256
+
+PAST_DAY_TTL = timedelta(hours=1)
+
+# Prázdný výsledek uzavřeného dne (chyba nebo chybějící data) se nedrží navždy
+EMPTY_RESULT_TTL = timedelta(hours=1)
+
+# Jak často zkoušet znovu, pokud očekávaná publikace ještě nepřišla
+PUBLICATION_RETRY = timedelta(minutes=15)
+
+# Negativní cache: interval dalšího pokusu roste 1, 2, 4, ... min až do stropu
+NEGATIVE_BACKOFF_BASE = timedelta(minutes=1)
+NEGATIVE_BACKOFF_MAX = timedelta(hours=1)
+NEGATIVE_BACKOFF_MAX_CLOSED_DAY = timedelta(hours=24)
+
+# Jak dlouho držet v cache poslední dobrá data z úložiště, vrácená při výpadku API
+LAST_GOOD_TTL = timedelta(minutes=1)
+
+# Jak dlouho držet v cache neúplný výsledek (data_store.INCOMPLETE_ATTR), než se den stáhne znovu
+INCOMPLETE_RESULT_TTL = timedelta(minutes=5)
+
+# Počet vláken pro obnovu zastaralých záznamů na pozadí
+REVALIDATE_WORKERS = 4
+
+
+# Časy publikací jsou dané obchodním časem ENTSO-E
+_MARKET_TZ = pytz.timezone("Europe/Brussels")
+
+# Publikace pro aktuální den: dataset -> (perioda, zpoždění publikace po konci periody)
+INTRADAY_PUBLICATION = {
+    "afrr_activation_prices": (timedelta(minutes=15), timedelta(minutes=5)),
+    "aggregated_bids": (timedelta(minutes=15), timedelta(minutes=5)),
+    "balancing_bids": (timedelta(minutes=15), timedelta(minutes=5)),
+    "procured_capacity": (timedelta(hours=4), timedelta(minutes=15)),
+}
+
+# Výsledky denní aukce (SDAC) pro následující den
+DAY_AHEAD_PUBLICATION = timedelta(hours=12, minutes=45)
+
+
+def next_publication_after(now: datetime, period: timedelta, offsets: tuple[timedelta, ...]) -> datetime:
+    """
+    Vrátí nejbližší čas po `now` ve tvaru půlnoc (obchodní čas) + posun + k * perioda.
+    Počítá se v lokálním "nástěnném" čase, takže např. 13:00 zůstává 13:00 i přes změnu času.
+    """
+    now_local = now.astimezone(_MARKET_TZ).replace(tzinfo=None)
+    midnight = datetime.combine(now_local.date(), datetime.min.time())
+    candidates = []
+    for offset in offsets:
+        first_run = midnight + offset
+        periods_elapsed = max((now_local - first_run) // period + 1, 0)
+        candidates.append(first_run + periods_elapsed * period)
+    return _MARKET_TZ.localize(min(candidates))
+
+
+def _local_midnight(target_date: date, country_code: str) -> datetime:
+    local_tz = pytz.timezone(eic_codes.get_timezone(country_code))
+    return local_tz.localize(datetime(target_date.year, target_date.month, target_date.day))
+
+
+def expires_at(dataset: str, country_code: str, target_date: date, is_empty: bool, now: datetime) -> datetime | None:
+    """Vrátí okamžik (UTC-aware), kdy záznam přestane platit; None = platí navždy."""
+    local_today = now.astimezone(pytz.timezone(eic_codes.get_timezone(country_code))).date()
+
+    if target_date < local_today:
+        if data_store.is_day_closed(target_date, now):
+            return now + EMPTY_RESULT_TTL if is_empty else None
+        return now + PAST_DAY_TTL
+
+    if target_date == local_today:
+        if dataset == "day_ahead_prices":
+            # Ceny DA pro dnešek jsou známé od včerejší aukce a během dne se nemění
+            return now + PUBLICATION_RETRY if is_empty else _local_midnight(target_date + timedelta(days=1), country_code)
+        period, delay = INTRADAY_PUBLICATION[dataset]
+        return next_publication_after(now, period, (delay,))
+
+    # Budoucí den
+    if dataset == "day_ahead_prices":
+        if not is_empty:
+            return _local_midnight(target_date + timedelta(days=1), country_code)
+        now_market = now.astimezone(_MARKET_TZ)
+        publication = _MARKET_TZ.localize(datetime.combine(now_market.date(), datetime.min.time()) + DAY_AHEAD_PUBLICATION)
+        # Před aukcí čekáme na publikaci, po ní (zpožděné výsledky) zkoušíme znovu v kratším intervalu
+        return publication if now < publication else now + PUBLICATION_RETRY
+    if dataset == "procured_capacity":
+        period, delay = INTRADAY_PUBLICATION[dataset]
+        return next_publication_after(now, period, (delay,))
+    # Ostatní data pro budoucí den vznikají až během něj
+    return max(min(_local_midnight(target_date, country_code), now + PAST_DAY_TTL), now + PUBLICATION_RETRY)
+
+
+class _CacheEntry:
+    __slots__ = ("df", "fetched_at", "expires_at")
+
+    def __init__(self, df: pd.DataFrame, fetched_at: datetime, expires_at: datetime | None):
+        self.df = df
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+    def is_fresh(self, now: datetime) -> bool:
+        return self.expires_at is None or now < self.expires_at
+
+
+class _NegativeEntry:
+    __slots__ = ("df", "failures", "retry_at")
+
+    def __init__(self, df: pd.DataFrame, failures: int, retry_at: datetime):
+        self.df = df
+        self.failures = failures
+        self.retry_at = retry_at
+
+
+def negative_retry_at(dataset: str, country_code: str, target_date: date, failures: int, now: datetime) -> datetime:
+    """Okamžik dalšího pokusu po `failures` prázdných výsledcích za sebou."""
+    max_backoff = NEGATIVE_BACKOFF_MAX_CLOSED_DAY if data_store.is_day_closed(target_date, now) else NEGATIVE_BACKOFF_MAX
+    backoff = min(NEGATIVE_BACKOFF_BASE * 2 ** (failures - 1), max_backoff)
+    # Dříve než při očekávané publikaci nemá smysl se ptát znovu
+    return max(now + backoff, expires_at(dataset, country_code, target_date, True, now))
+
+
+_entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+_negative_entries: dict[tuple, _NegativeEntry] = {}
+_entries_lock = threading.Lock()
+
+# Klíče, které se právě obnovují na pozadí (stale-while-revalidate)
+_revalidating: set[tuple] = set()
+_revalidate_executor = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="svr-revalidate")
+
+# Souběžné missy stejného klíče (reruny více sezení) stahují a ukládají výsledek jen jednou,
+# jinak by se jeden prázdný výsledek započítal do negativní cache za každého volajícího
+_miss_flights = single_flight.SingleFlight("cache")
+
+
+def stale_since(df: pd.DataFrame) -> datetime | None:
+    """
+    Pro DataFrame vrácený ze zastaralého záznamu nebo z posledních dobrých dat úložiště
+    vrátí čas jeho stažení (UTC), jinak None.
+    """
+    return df.attrs.get(data_store.STALE_ATTR)
+
+
+def _stale_copy(entry: _CacheEntry) -> pd.DataFrame:
+    df = entry.df.copy()
+    df.attrs[data_store.STALE_ATTR] = df.attrs.get(data_store.STALE_ATTR, entry.fetched_at)
+    return df
+
+
+def _store_result(key: tuple, df: pd.DataFrame) -> None:
+    """Uloží výsledek dotazu: neprázdný jako platný záznam, prázdný do negativní cache."""
+    dataset, country_code, target_date, variant = key
+    now = datetime.now(pytz.utc)
+    with _entries_lock:
+        if df is None or df.empty:
+            failures = _negative_entries[key].failures + 1 if key in _negative_entries else 1
+            retry_at = negative_retry_at(dataset, country_code, target_date, failures, now)
+            _negative_entries[key] = _NegativeEntry(df, failures, retry_at)
+            logging.info(f"{dataset} pro {country_code}, {target_date} ({variant}) je prázdné ({failures}x za sebou), další pokus v {retry_at.astimezone(_MARKET_TZ):%H:%M}.")
+        elif data_store.STALE_ATTR in df.attrs:
+            # Poslední dobrá data z úložiště (API nedostupné) - zkusíme API brzy znovu
+            _entries[key] = _CacheEntry(df, df.attrs[data_store.STALE_ATTR], now + LAST_GOOD_TTL)
+            _entries.move_to_end(key)
+        elif data_store.INCOMPLETE_ATTR in df.attrs:
+            # Neúplná data uzavřeného dne by jinak v cache zůstala navždy
+            _entries[key] = _CacheEntry(df, now, now + INCOMPLETE_RESULT_TTL)
+            _entries.move_to_end(key)
+        else:
+            _negative_entries.pop(key, None)
+            _entries[key] = _CacheEntry(df, now, expires_at(dataset, country_code, target_date, False, now))
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+        # Negativní záznamy jsou malé, ale bez úklidu by rostly s každým novým dnem
+        for stale_key in [k for k, e in _negative_entries.items() if e.retry_at < now - NEGATIVE_BACKOFF_MAX_CLOSED_DAY]:
+            del _negative_entries[stale_key]
+
+
+def _revalidate(key: tuple, fetch) -> None:
+    try:
+        # Obnova na pozadí nesmí předbíhat blokující načítání stránek
+        with entsoe_http.request_priority(entsoe_http.PRIORITY_BACKGROUND):
+            _store_result(key, fetch())
+    except Exception as e:
+        logging.error(f"Obnova {key} na pozadí selhala: {e}")
+    finally:
+        with _entries_lock:
+            _revalidating.discard(key)
+
+
+def _record_lookup(dataset: str, status: str) -> None:
+    """Stav vyhledání (hit, stale, negative, miss) pro diagnostiku rerunu a metriky procesu."""
+    diagnostics.set_cache_status(status)
+    metrics.CACHE_LOOKUPS.inc(dataset=dataset, status=status)
+
+
+def cache_sizes() -> dict[str, int]:
+    """Počet platných, negativních a právě obnovovaných záznamů (pro monitoring)."""
+    with _entries_lock:
+        return {"entries": len(_entries), "negative": len(_negative_entries), "revalidating": len(_revalidating)}
+
+
+metrics.REGISTRY.register(metrics.CallbackGauge(
+    "svr_cache_entries",
+    "Počet záznamů v paměťové cache fetch funkcí (entries, negative, revalidating).",
+    ("kind",),
+    cache_sizes,
+))
+
+
+def cached(dataset: str):
+    """
+    Dekorátor pro fetch funkce v data_loader.py (nad @data_store.persisted, jehož partition klíč používá).
+    Zastaralý záznam se vrátí hned (označený, viz stale_since) a obnoví se na pozadí;
+    synchronně se stahuje jen tehdy, když pro klíč žádná předchozí data nejsou.
+    Dekorovaná funkce má navíc `refresh(*args, **kwargs)` - synchronně stáhne a uloží nová data,
+    aniž by starý záznam zmizel, a `clear(*args, **kwargs)` - bez argumentů smaže všechny
+    záznamy datasetu (včetně negativních).
+    """
+    def decorator(func):
+        def key_for(args, kwargs) -> tuple:
+            country_code, target_date, variant = func.partition_key(*args, **kwargs)
+            return (dataset, country_code.upper(), target_date, variant)
+
+        def lookup(key, args, kwargs) -> pd.DataFrame:
+            with _entries_lock:
+                now = datetime.now(pytz.utc)
+                entry = _entries.get(key)
+                if entry is not None and entry.is_fresh(now):
+                    _entries.move_to_end(key)
+                    _record_lookup(dataset, "hit")
+                    return entry.df.copy()
+
+                negative_entry = _negative_entries.get(key)
+                if negative_entry is not None and now < negative_entry.retry_at:
+                    # Poslední obnova nic nevrátila - raději ukážeme poslední dobrá data než nic
+                    _record_lookup(dataset, "stale" if entry is not None else "negative")
+                    return _stale_copy(entry) if entry is not None else negative_entry.df.copy()
+
+                if entry is not None:
+                    if key not in _revalidating:
+                        _revalidating.add(key)
+                        _revalidate_executor.submit(_revalidate, key, functools.partial(func, *args, **kwargs))
+                    _record_lookup(dataset, "stale")
+                    return _stale_copy(entry)
+
+            _record_lookup(dataset, "miss")
+            return _miss_flights.do(key, functools.partial(fetch_once, key, args, kwargs)).copy()
+
+        def fetch_once(key, args, kwargs) -> pd.DataFrame:
+            with _entries_lock:
+                # Volající, který se minul s právě dokončeným stažením, použije jeho výsledek
+                now = datetime.now(pytz.utc)
+                entry = _entries.get(key)
+                if entry is not None and entry.is_fresh(now):
+                    return entry.df
+                negative_entry = _negative_entries.get(key)
+                if negative_entry is not None and now < negative_entry.retry_at:
+                    return negative_entry.df
+            df = func(*args, **kwargs)
+            _store_result(key, df)
+            return df
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_for(args, kwargs)
+            with diagnostics.call("fetch", dataset, f"{key[1]} {key[2]} {key[3]}"):
+                df = lookup(key, args, kwargs)
+                diagnostics.set_rows(len(df))
+                return df
+
+        def refresh(*args, **kwargs) -> pd.DataFrame:
+            df = func(*args, **kwargs)
+            _store_result(key_for(args, kwargs), df)
+            return df.copy()
+
+        def clear(*args, **kwargs) -> None:
+            with _entries_lock:
+                if args or kwargs:
+                    key = key_for(args, kwargs)
+                    _entries.pop(key, None)
+                    _negative_entries.pop(key, None)
+                else:
+                    for key in [k for k in _entries if k[0] == dataset]:
+                        del _entries[key]
+                    for key in [k for k in _negative_entries if k[0] == dataset]:
+                        del _negative_entries[key]
+
+        wrapper.refresh = refresh
+        wrapper.clear = clear
+        return wrapper
+    return decorator
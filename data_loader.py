@@ -6,30 +6,153 @@ import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, date # Přidán date pro cutoff_date
 import pytz 
 import requests
-import io
 import zipfile
+import contextlib
+import functools
+import itertools
+import time
+import threading
+from array import array
+import numpy as np
 from entsoe import EntsoePandasClient 
+from entsoe.exceptions import NoMatchingDataError
 import logging
 
 import eic_codes # PŘÍMÝ IMPORT eic_codes
+import data_store
+import data_cache
+import diagnostics
+import entsoe_http
+import entsoe_documents
+import entsoe_xml
+import metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 """
 Tento modul obsahuje funkce pro načítání dat z ENTSOE API.
-Používá Streamlit kešovací mechanismy (st.cache_resource, st.cache_data)
+Používá kešovací mechanismy (st.cache_resource, data_cache.py s dobou platnosti podle stáří dat)
 pro efektivní získávání dat a minimalizaci API volání.
+Data uzavřených dnů jsou navíc ukládána do perzistentního úložiště (data_store.py),
+takže přežijí restart i vypršení TTL.
 Chybové stavy jsou ošetřeny vracením prázdných DataFrame a interním logováním.
 """
 
 # --- Konfigurace a inicializace ENTSOE klienta ---
+# Timeout pro čtení odpovědi v dotazech přes entsoe-py klienta (s)
+ENTSOE_CLIENT_READ_TIMEOUT = 60
+
 @st.cache_resource
 def get_entsoe_client():
     api_token_from_secrets = st.secrets["entsoe_api"]["token"]
-    return EntsoePandasClient(api_key=api_token_from_secrets)
+    # Sdílená session z entsoe_http; opakování řeší adaptér session, proto jediný pokus bez čekání
+    # (entsoe-py jinak čeká retry_delay i po posledním neúspěšném pokusu).
+    # Bez timeoutu by entsoe-py při zaseknutém spojení čekal neomezeně dlouho.
+    return EntsoePandasClient(
+        api_key=api_token_from_secrets, session=entsoe_http.get_session(), retry_count=1, retry_delay=0,
+        timeout=(entsoe_http.CONNECT_TIMEOUT, ENTSOE_CLIENT_READ_TIMEOUT)
+    )
+
+# --- Časové okno lokálního dne ---
+def _local_day_utc_window(target_date: date, country_code: str) -> tuple[datetime, datetime]:
+    """
+    Vrátí UTC-naive interval [začátek, konec) lokálního dne v časové zóně dané země.
+    Zohledňuje přechod na letní/zimní čas (den má 23, 24 nebo 25 hodin),
+    takže stačí jediný dotaz na API přesně pro tento interval.
+    """
+    local_tz = pytz.timezone(eic_codes.get_timezone(country_code))
+    start_local = local_tz.localize(datetime(target_date.year, target_date.month, target_date.day))
+    next_day = target_date + timedelta(days=1)
+    end_local = local_tz.localize(datetime(next_day.year, next_day.month, next_day.day))
+    return start_local.astimezone(pytz.utc).replace(tzinfo=None), end_local.astimezone(pytz.utc).replace(tzinfo=None)
+
+def _failed_result(error) -> pd.DataFrame:
+    """
+    Prázdný výsledek fetch funkce po chybě dotazu (HTTP, spojení, circuit breaker, nezpracovatelná odpověď).
+    Na rozdíl od prázdného výsledku "data nejsou publikována" nese popis chyby v attrs[data_store.INCOMPLETE_ATTR].
+    """
+    df = pd.DataFrame()
+    df.attrs[data_store.INCOMPLETE_ATTR] = str(error)
+    return df
+
+def _mark_incomplete(df: pd.DataFrame, skipped_parts: list[str]) -> pd.DataFrame:
+    """
+    Označí výsledek, ze kterého se vynechala část odpovědi (neplatný vnořený ZIP, nevalidní XML dokument),
+    v attrs[data_store.INCOMPLETE_ATTR], aby ho data_store neuložil jako definitivní.
+    Pokud se ze zbytku odpovědi nezískala žádná data, jde o chybu dotazu (_failed_result).
+    """
+    if not skipped_parts:
+        return df
+    reason = f"vynechané části odpovědi: {'; '.join(skipped_parts)}"
+    if df.empty:
+        return _failed_result(reason)
+    logging.warning(f"Výsledek je neúplný, {reason}.")
+    df.attrs[data_store.INCOMPLETE_ATTR] = reason
+    return df
+
+# --- Inkrementální obnova ještě neuzavřeného dne ---
+# (dataset, země, den, varianta) -> naposledy stažená surová data dne; drží se jen pro neuzavřené dny
+_intraday_frames: dict[tuple, pd.DataFrame] = {}
+_intraday_lock = threading.Lock()
+
+def _fetch_day_incrementally(key: tuple, start_utc: datetime, end_utc: datetime, download) -> pd.DataFrame | None:
+    """
+    Vrátí surová data dne [start_utc, end_utc). `download(od, do)` stáhne interval a vrátí DataFrame
+    se sloupcem Timestamp (UTC-naive), při chybě None.
+    Pro neuzavřený den se stahuje jen konec dne od poslední hodiny s daty (ta se stahuje znovu,
+    může být publikovaná jen částečně) a výsledek se sloučí s předchozím stažením.
+    Uzavřený den se vždy stahuje celý, aby se do úložiště dostala i dodatečně opravená data.
+    """
+    target_date = key[2]
+    if data_store.is_day_closed(target_date):
+        with _intraday_lock:
+            _intraday_frames.pop(key, None)
+        return download(start_utc, end_utc)
+
+    with _intraday_lock:
+        previous_df = _intraday_frames.get(key)
+
+    tail_start = start_utc
+    if previous_df is not None and not previous_df.empty:
+        tail_start = max(start_utc, previous_df['Timestamp'].max().floor('h').to_pydatetime())
+        logging.info(f"Inkrementální obnova {key[0]} pro {key[1]}, {target_date}: stahuji jen od {tail_start} UTC.")
+
+    df_tail = download(tail_start, end_utc)
+    if df_tail is None:
+        # Chyba při stahování konce dne - vrátíme aspoň předchozí data
+        return previous_df
+    if df_tail.empty and previous_df is not None and not previous_df.empty:
+        # Konec dne nic nevrátil (mezera v publikaci, NoMatchingData, částečný výpadek) -
+        # předchozí data se nezkracují, jinak by zmizela poslední hodina, kterou už máme
+        return previous_df
+
+    with diagnostics.stage("transform"):
+        if previous_df is not None and tail_start > start_utc:
+            if not df_tail.empty:
+                df_tail = df_tail[df_tail['Timestamp'] >= tail_start]
+            df_day = pd.concat([previous_df[previous_df['Timestamp'] < tail_start], df_tail], ignore_index=True)
+        else:
+            df_day = df_tail
+
+        if not df_day.empty:
+            df_day = df_day[(df_day['Timestamp'] >= start_utc) & (df_day['Timestamp'] < end_utc)]
+
+    incomplete = df_tail.attrs.get(data_store.INCOMPLETE_ATTR)
+    with _intraday_lock:
+        # Dny, které se mezitím uzavřely, se už inkrementálně neobnovují
+        for stale_key in [k for k in _intraday_frames if data_store.is_day_closed(k[2])]:
+            del _intraday_frames[stale_key]
+        if incomplete:
+            _intraday_frames.pop(key, None) # Neúplná data nejsou základ pro další obnovu, příště se stáhne celý den
+        elif not df_day.empty:
+            _intraday_frames[key] = df_day
+    if incomplete:
+        df_day.attrs[data_store.INCOMPLETE_ATTR] = incomplete
+    return df_day
 
 # --- Funkce pro načítání denních cen ---
-@st.cache_data(ttl=3600)
+@data_cache.cached("day_ahead_prices")
+@data_store.persisted("day_ahead_prices")
 def fetch_day_ahead_prices_data(country_code: str, target_date_param: datetime.date) -> pd.DataFrame: # ZMĚNA: Přejmenován parametr 'date'
     client = get_entsoe_client() 
     start_ts = pd.Timestamp(f'{target_date_param} 00:00:00', tz='Europe/Brussels')
@@ -40,7 +163,7 @@ def fetch_day_ahead_prices_data(country_code: str, target_date_param: datetime.d
     cutoff_date_15min_resolution = date(2025, 10, 1) # ZMĚNA: Používáme přímo 'date' z importu
 
     query_params = {
-        'country_code': country_code,
+        'country_code': eic_codes.get_bidding_zone(country_code), # Denní ceny jsou po nabídkových zónách (DE_* -> DE_LU)
         'start': start_ts,
         'end': end_ts
     }
@@ -53,107 +176,223 @@ def fetch_day_ahead_prices_data(country_code: str, target_date_param: datetime.d
 
 
     try:
-        df_prices_series = client.query_day_ahead_prices(**query_params)
-        
-        df_prices = df_prices_series.reset_index(name='Price')
-        df_prices = df_prices.rename(columns={'index': 'Time'})
-        
-        # Ošetření časových zón: konvertovat na UTC-naive, pokud jsou aware
-        if not df_prices['Time'].dt.tz is None: 
-            df_prices['Time'] = df_prices['Time'].dt.tz_convert('UTC').dt.tz_localize(None)
+        # Stažení i parsování řeší entsoe-py; síť a čekání na limitér se měří zvlášť v entsoe_http
+        with _observed_request("A44"), diagnostics.stage("parse"):
+            df_prices_series = client.query_day_ahead_prices(**query_params)
         
-        df_prices = df_prices.dropna(subset=['Time'])
+        with diagnostics.stage("transform"):
+            df_prices = df_prices_series.reset_index(name='Price')
+            df_prices = df_prices.rename(columns={'index': 'Time'})
+            
+            # Ošetření časových zón: konvertovat na UTC-naive, pokud jsou aware
+            if not df_prices['Time'].dt.tz is None: 
+                df_prices['Time'] = df_prices['Time'].dt.tz_convert('UTC').dt.tz_localize(None)
+            
+            df_prices = df_prices.dropna(subset=['Time'])
         
         return df_prices
+    except NoMatchingDataError as e:
+        logging.info(f"API pro denní trh vrátilo NoMatchingData ({country_code}, {target_date_param}): {e}")
+        return pd.DataFrame()
     except Exception as e:
         logging.error(f"Nepodařilo se načíst data pro denní trh ({country_code}, {target_date_param}): {e}") # ZMĚNA
-        return pd.DataFrame()
+        return _failed_result(e)
+
+
+# --- POMOCNÉ FUNKCE PRO STREAMOVÉ PARSOVÁNÍ XML DOKUMENTŮ ENTSO-E ---
+
+_RESERVE_BID_NS = 'urn:iec62325.351:tc57wg16:451-7:reservebiddocument:7:1'
+_BALANCING_NS = 'urn:iec62325.351:tc57wg16:451-6:balancingdocument:4:1'
+
+# Kategorie směru jsou pevné, aby se DataFrame z různých dnů daly spojovat bez ztráty typu
+_DIRECTION_CATEGORIES = ("Unknown", "Up", "Down")
+_FLOW_DIRECTION_CATEGORIES = ("A01", "A02")
+
+
+def _qname(namespace: str, tag: str) -> str:
+    """Vrátí plně kvalifikovaný název elementu ve tvaru, který používá ElementTree ({ns}tag)."""
+    return f"{{{namespace}}}{tag}"
+
+
+def _direction_label(flow_direction: str | None) -> str:
+    if flow_direction == "A01":
+        return "Up"
+    elif flow_direction == "A02":
+        return "Down"
+    return "Unknown"
+
+
+class _ColumnBuffers:
+    """
+    Typované sloupcové buffery, do kterých parsery zapisují body přímo.
+    Časy jsou int64 (epoch s, UTC), čísla float64 a opakující se řetězce kódy kategorií.
+    DataFrame se z bufferů postaví jednou na konci (to_frame), bez dictu na řádek.
+    """
+
+    def __init__(self, columns: list[tuple]):
+        # columns: [(název, "float")] nebo [(název, "category", výchozí kategorie)] v pořadí výstupu
+        self.column_order = [column[0] for column in columns]
+        self.timestamps = array("q")
+        self.floats = {column[0]: array("d") for column in columns if column[1] == "float"}
+        self.codes = {column[0]: array("q") for column in columns if column[1] == "category"}
+        self.categories = {
+            column[0]: {value: code for code, value in enumerate(column[2] if len(column) > 2 else ())}
+            for column in columns if column[1] == "category"
+        }
+        self._default_category_counts = {name: len(mapping) for name, mapping in self.categories.items()}
+        self.constants = {}
+        self.skipped_documents = [] # Popisy dokumentů, které parser kvůli chybě vynechal (neúplný výsledek)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def code_for(self, column: str, value: str | None) -> int:
+        """Vrátí kód kategorie pro hodnotu (None -> -1, tj. NaN)."""
+        if value is None:
+            return -1
+        mapping = self.categories[column]
+        code = mapping.get(value)
+        if code is None:
+            code = mapping[value] = len(mapping)
+        return code
+
+    def truncate(self, length: int) -> None:
+        """Zahodí řádky od indexu `length` (např. body z nevalidního dokumentu) i kategorie, které přidaly jen ony."""
+        for buffer in (self.timestamps, *self.floats.values(), *self.codes.values()):
+            del buffer[length:]
+        for name, codes in self.codes.items():
+            # Kódy se přidělují postupně, kategorie zahozených řádků jsou tedy na konci
+            keep = max(self._default_category_counts[name], max(codes, default=-1) + 1)
+            mapping = self.categories[name]
+            if len(mapping) > keep:
+                self.categories[name] = dict(itertools.islice(mapping.items(), keep))
+
+    def to_frame(self) -> pd.DataFrame:
+        row_count = len(self.timestamps)
+        data = {"Timestamp": pd.to_datetime(np.frombuffer(self.timestamps, dtype=np.int64), unit="s")}
+        for name in self.column_order:
+            if name in self.floats:
+                data[name] = np.frombuffer(self.floats[name], dtype=np.float64)
+            else:
+                data[name] = pd.Categorical.from_codes(np.frombuffer(self.codes[name], dtype=np.int64), categories=list(self.categories[name]))
+        for name, value in self.constants.items():
+            data[name] = pd.Categorical.from_codes(np.zeros(row_count, dtype=np.int8), categories=[value])
+        return pd.DataFrame(data)
+
+
+# --- Hooky pro metriky procesu (metrics.py) ---
+@contextlib.contextmanager
+def _observed_request(document_type: str):
+    """Zaznamená výsledek a dobu jednoho dotazu na ENTSOE-E API (včetně zpracování odpovědi)."""
+    started_at = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except NoMatchingDataError:
+        outcome = "no_data"
+        raise
+    except entsoe_http.CircuitOpenError:
+        outcome = "circuit_open"
+        raise
+    except requests.exceptions.HTTPError:
+        outcome = "http_error"
+        raise
+    except requests.exceptions.RequestException:
+        outcome = "connection_error"
+        raise
+    finally:
+        metrics.ENTSOE_REQUESTS.inc(document_type=document_type, outcome=outcome)
+        if outcome != "circuit_open": # Odmítnutý dotaz API nevolal, zkreslil by latence
+            metrics.ENTSOE_REQUEST_DURATION.observe(time.perf_counter() - started_at, document_type=document_type)
+
+def _observed_parser(document_type: str):
+    """Dekorátor parseru: zaznamená dobu parsování a počet bodů jednoho XML dokumentu."""
+    def decorator(parser):
+        @functools.wraps(parser)
+        def wrapper(*args, **kwargs):
+            # Parsery se sdílenými _ColumnBuffers vrací celé buffery - počítají se jen nově přidané body
+            rows_before = next((len(arg) for arg in (*args, *kwargs.values()) if isinstance(arg, _ColumnBuffers)), 0)
+            started_at = time.perf_counter()
+            result = parser(*args, **kwargs)
+            metrics.PARSE_DURATION.observe(time.perf_counter() - started_at, document_type=document_type)
+            metrics.PARSED_POINTS.inc(len(result) - rows_before, document_type=document_type)
+            return result
+        return wrapper
+    return decorator
 
 
 # --- FUNKCE PRO NAČÍTÁNÍ NABÍDKOVÝCH KŘIVEK (BALANCING BIDS) ---
 
-def _parse_reserve_bid_xml_modular(xml_data_str: str, 
+def _new_reserve_bid_columns() -> _ColumnBuffers:
+    """Prázdné sloupcové buffery pro _parse_reserve_bid_xml_modular."""
+    return _ColumnBuffers([
+        ("Bid ID", "category"),
+        ("Power (MW)", "float"),
+        ("Price (EUR/MWh)", "float"),
+        ("Direction", "category", _DIRECTION_CATEGORIES),
+    ])
+
+@diagnostics.timed_stage("parse")
+@_observed_parser("A37")
+def _parse_reserve_bid_xml_modular(xml_source, 
                                    process_type: str, 
-                                   connecting_domain: str) -> list:
-    data_points = []
-    ns = {'rbd': 'urn:iec62325.351:tc57wg16:451-7:reservebiddocument:7:1'}
-    
+                                   connecting_domain: str,
+                                   columns: _ColumnBuffers | None = None,
+                                   xml_backend: str | None = None) -> _ColumnBuffers:
+    """
+    Streamově parsuje XML dokument Reserve Bid (A37).
+    `xml_source` je binární stream (např. člen ZIP archivu) nebo bytes.
+    Body se zapisují přímo do typovaných sloupcových bufferů `columns` (lze sdílet napříč
+    více dokumenty jedné odpovědi); DataFrame vznikne voláním columns.to_frame().
+    `xml_backend` vybere XML backend místo výchozího entsoe_xml.backend (viz entsoe_xml.iter_series_points).
+    """
+    if columns is None:
+        columns = _new_reserve_bid_columns()
+    columns.constants.update({"ProcessType": process_type, "ConnectingDomain": connecting_domain})
+
+    power_tags = (_qname(_RESERVE_BID_NS, "quantity.quantity"), _qname(_RESERVE_BID_NS, "quantity"))
+    price_tags = (_qname(_RESERVE_BID_NS, "energy_Price.amount"), _qname(_RESERVE_BID_NS, "price.amount"), _qname(_RESERVE_BID_NS, "Price.amount"))
+
+    timestamps = columns.timestamps
+    bid_id_codes = columns.codes["Bid ID"]
+    powers = columns.floats["Power (MW)"]
+    prices = columns.floats["Price (EUR/MWh)"]
+    direction_codes = columns.codes["Direction"]
+
+    rows_before = len(columns)
+    last_series_key = None
+    bid_id_code = direction_code = -1
+
     try:
-        root = ET.fromstring(xml_data_str)
+        for bid_id, flow_direction, timestamp, (power_str, price_str) in entsoe_xml.iter_series_points(
+                xml_source, _RESERVE_BID_NS, "Bid_TimeSeries", "Reserve Bid", (power_tags, price_tags), xml_backend=xml_backend):
+            if power_str is None:
+                logging.debug(f"Přeskočen bod pro Reserve Bid kvůli chybějícímu Power: ID={bid_id}, Time={timestamp}")
+                continue
+
+            if (bid_id, flow_direction) != last_series_key: # Kódy kategorií se počítají jednou za časovou řadu
+                last_series_key = (bid_id, flow_direction)
+                bid_id_code = columns.code_for("Bid ID", bid_id or "N/A")
+                direction_code = columns.code_for("Direction", _direction_label(flow_direction))
+
+            timestamps.append(timestamp)
+            bid_id_codes.append(bid_id_code)
+            powers.append(float(power_str))
+            prices.append(float(price_str) if price_str is not None else 0.0)
+            direction_codes.append(direction_code)
     except ET.ParseError as e:
         logging.warning(f"Chyba parsování XML pro rezervní nabídky: {e}")
-        return []
+        columns.truncate(rows_before) # Body z nevalidního dokumentu se zahodí celé
+        columns.skipped_documents.append(f"nevalidní XML ({e})")
+    except Exception:
+        columns.truncate(rows_before) # Např. prázdná hodnota (float("")) - ani tady nesmí zůstat část dokumentu
+        raise
 
-    if len(root.findall(".//rbd:Bid_TimeSeries", ns)) == 0:
-        return []
-
-    for time_series in root.findall(".//rbd:Bid_TimeSeries", ns):
-        bid_id_elem = time_series.find(".//rbd:mRID", ns)
-        bid_id = bid_id_elem.text if bid_id_elem is not None else "N/A"
-        
-        current_timeseries_direction = "Unknown"
-        direction_elem = time_series.find(".//rbd:flowDirection.direction", ns)
-        if direction_elem is not None and direction_elem.text:
-            if direction_elem.text == "A01": 
-                current_timeseries_direction = "Up"
-            elif direction_elem.text == "A02":
-                current_timeseries_direction = "Down"
-        
-        for period in time_series.findall(".//rbd:Period", ns):
-            start_time_str = period.findtext('rbd:timeInterval/rbd:start', default=None, namespaces=ns) 
-            
-            resolution_str = period.findtext('rbd:resolution', default="PT15M", namespaces=ns) 
-            
-            if start_time_str is None or resolution_str is None:
-                logging.warning(f"Chybí start_time nebo resolution v Period elementu pro Reserve Bid.")
-                continue
+    return columns
 
-            step = timedelta(minutes=15)
-            if resolution_str == "PT60M" or resolution_str == "P1H": step = timedelta(hours=1)
-            elif resolution_str == "PT30M": step = timedelta(minutes=30)
-            elif resolution_str == "PT1M": step = timedelta(minutes=1)
-            
-            try:
-                start_datetime = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%MZ")
-            except ValueError:
-                logging.warning(f"Nelze parsovat start_time: {start_time_str} pro Reserve Bid.")
-                continue
-                
-            for point in period.findall(".//rbd:Point", ns):
-                pos_str = point.findtext('rbd:position', default="0", namespaces=ns) 
-                position = int(pos_str) if pos_str is not None else 0
-                
-                power_str = point.findtext('rbd:quantity.quantity', default=None, namespaces=ns) 
-                if power_str is None: 
-                    power_str = point.findtext('rbd:quantity', default=None, namespaces=ns) 
-                
-                price_str = point.findtext('rbd:energy_Price.amount', default=None, namespaces=ns) 
-                if price_str is None: 
-                    price_str = point.findtext('rbd:price.amount', default=None, namespaces=ns) 
-                if price_str is None:
-                    price_str = point.findtext('rbd:Price.amount', default=None, namespaces=ns) 
-
-                power = float(power_str) if power_str is not None else None
-                price = float(price_str) if price_str is not None else 0.0 
-                
-                if power is None:
-                    logging.debug(f"Přeskočen bod pro Reserve Bid kvůli chybějícímu Power: ID={bid_id}, Time={start_time_str}, Pos={position}")
-                    continue
-
-                timestamp = start_datetime + (position - 1) * step
-
-                data_points.append({
-                    "Timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    "Bid ID": bid_id,
-                    "Power (MW)": power,
-                    "Price (EUR/MWh)": price,
-                    "Direction": current_timeseries_direction,
-                    "ProcessType": process_type,
-                    "ConnectingDomain": connecting_domain
-                })
-    return data_points
-
-@st.cache_data(ttl=3600)
+@data_cache.cached("balancing_bids")
+@data_store.persisted("balancing_bids")
 def fetch_balancing_bids_for_day_modular(
     target_date: datetime.date,
     country_code: str,
@@ -166,7 +405,6 @@ def fetch_balancing_bids_for_day_modular(
     pro jeden konkrétní den.
     """
     api_key = st.secrets["entsoe_api"]["token"]
-    entsoe_api_url = "https://web-api.tp.entsoe.eu/api"
     
     connecting_domain = eic_codes.get_eic(country_code)
 
@@ -190,155 +428,84 @@ def fetch_balancing_bids_for_day_modular(
         'periodEnd': period_end_str,
     }
     
-    all_extracted_data = []
-    xml_str = ""
+    # Sloupcové buffery sdílené všemi XML dokumenty v odpovědi; DataFrame se staví jednou na konci
+    bid_columns = _new_reserve_bid_columns()
+    skipped_zips = []
+    failure = None
 
     try:
-        response = requests.get(entsoe_api_url, params=params, timeout=90)
-        response.raise_for_status()
-
-        content_type = response.headers.get('Content-Type', '')
-
-        if 'application/zip' in content_type or response.content.startswith(b'PK\x03\x04'):
-            try:
-                with io.BytesIO(response.content) as bio_zip1:
-                    with zipfile.ZipFile(bio_zip1) as zip_file_level1:
-                        for file_name_l1 in zip_file_level1.namelist():
-                            with zip_file_level1.open(file_name_l1) as content_l1:
-                                bytes_l1 = content_l1.read()
-                                
-                                is_nested_zip_processed = False
-                                if file_name_l1.lower().endswith('.zip'):
-                                    try:
-                                        with io.BytesIO(bytes_l1) as bio_zip2:
-                                            with zipfile.ZipFile(bio_zip2) as zip_file_level2:
-                                                for file_name_l2 in zip_file_level2.namelist():
-                                                    if file_name_l2.lower().endswith('.xml'):
-                                                        with zip_file_level2.open(file_name_l2) as xml_file_l2:
-                                                            try:
-                                                                xml_str = xml_file_l2.read().decode("utf-8")
-                                                            except UnicodeDecodeError:
-                                                                xml_str = xml_file_l2.read().decode("ISO-8859-1", errors='replace')
-                                                            
-                                                            parsed_points = _parse_reserve_bid_xml_modular(xml_str, process_type, connecting_domain)
-                                                            all_extracted_data.extend(parsed_points)
-                                                is_nested_zip_processed = True
-                                    except zipfile.BadZipFile:
-                                        logging.warning(f"Soubor {file_name_l1} vypadal jako ZIP, ale není platný.")
-                                    except Exception as e_nested:
-                                        logging.error(f"Chyba při zpracování vnořeného ZIPu {file_name_l1}: {e_nested}")
-
-                                if not is_nested_zip_processed and file_name_l1.lower().endswith('.xml'):
-                                    try:
-                                        xml_str = bytes_l1.decode("utf-8")
-                                    except UnicodeDecodeError:
-                                        xml_str = bytes_l1.decode("ISO-8859-1", errors='replace')
-                                    
-                                    parsed_points = _parse_reserve_bid_xml_modular(xml_str, process_type, connecting_domain)
-                                    all_extracted_data.extend(parsed_points)
-            except zipfile.BadZipFile:
-                logging.error(f"Chyba: Odpověď byla označena jako ZIP, ale není to platný ZIP archiv pro {target_date}.")
-            except Exception as e_zip_outer:
-                 logging.error(f"Neznámá chyba při zpracování hlavního ZIPu pro {target_date}: {e_zip_outer}")
-        
-        elif 'application/xml' in content_type or 'text/xml' in content_type:
-            try:
-                xml_str = response.content.decode("utf-8")
-            except UnicodeDecodeError:
-                xml_str = response.content.decode("ISO-8859-1", errors='replace')
-            
-            if "NoMatchingData" in xml_str or "Error_Reason" in xml_str :
-                 logging.info(f"API pro balancing bids vrátilo NoMatchingData/Error_Reason pro {target_date}: {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
-            else:
-                parsed_points = _parse_reserve_bid_xml_modular(xml_str, process_type, connecting_domain)
-                all_extracted_data.extend(parsed_points)
-        else:
-            logging.warning(f"Neočekávaný Content-Type pro balancing bids: {content_type}. Obsah (prvních 200b): {response.content[:200]}")
-
+        with _observed_request(document_type), entsoe_documents.fetch_document(params, timeout=90) as document:
+            # XML se parsuje přímo ze streamu (i z vnořeného ZIPu), bez kopií v paměti a dekódování do str
+            for xml_name, xml_stream in entsoe_documents.iter_xml_streams(document, "balancing bids", skipped_zips):
+                _parse_reserve_bid_xml_modular(xml_stream, process_type, connecting_domain, bid_columns)
+
+    except NoMatchingDataError as e:
+        logging.info(f"API pro balancing bids vrátilo NoMatchingData/Error_Reason pro {target_date}: {e}")
+    except zipfile.BadZipFile as e:
+        logging.error(f"Chyba: Odpověď byla označena jako ZIP, ale není to platný ZIP archiv pro {target_date}.")
+        failure = e
     except requests.exceptions.HTTPError as e:
-        error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response else "No response text"
-        logging.error(f"HTTP Chyba při načítání balancing bids: {e.response.status_code if e.response else 'N/A'} pro {target_date}. Odpověď: {error_text}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
+        error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response is not None else "No response text"
+        logging.error(f"HTTP Chyba při načítání balancing bids: {e.response.status_code if e.response is not None else 'N/A'} pro {target_date}. Odpověď: {error_text}")
+        failure = e
     except requests.exceptions.RequestException as e:
         logging.error(f"Chyba spojení při načítání balancing bids: {e} pro {target_date}.")
+        failure = e
     except Exception as e:
-        logging.error(f"Neznámá chyba při stahování/základním zpracování balancing bids pro {target_date}: {e}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
+        logging.error(f"Neznámá chyba při stahování/základním zpracování balancing bids pro {target_date}: {e}")
+        failure = e
 
-    df_bids = pd.DataFrame(all_extracted_data)
-    
-    if not df_bids.empty and 'Timestamp' not in df_bids.columns:
-        logging.error("Chyba: 'Timestamp' sloupec chybí v DataFrame z balancing bids!")
-        return pd.DataFrame()
+    # Odpověď zpracovaná jen zčásti (chyba uprostřed ZIPu) se nevrací - uzavřený den by se uložil neúplný
+    if failure is not None:
+        return _failed_result(failure)
+    skipped_parts = skipped_zips + bid_columns.skipped_documents
+    if len(bid_columns) == 0:
+        return _mark_incomplete(pd.DataFrame(), skipped_parts)
 
-    if not df_bids.empty:
-        df_bids['Timestamp'] = pd.to_datetime(df_bids['Timestamp'], errors='coerce')
-        if not df_bids['Timestamp'].dt.tz is None:
-            df_bids['Timestamp'] = df_bids['Timestamp'].dt.tz_convert('UTC').dt.tz_localize(None)
-        
-        df_bids = df_bids.dropna(subset=['Timestamp'])
-        return df_bids
-    else:
-        return pd.DataFrame()
+    # Časy jsou v bufferech už jako UTC-naive datetime64, bez převodu přes řetězce
+    with diagnostics.stage("transform"):
+        return _mark_incomplete(bid_columns.to_frame(), skipped_parts)
 
 
 # --- FUNKCE PRO NAČÍTÁNÍ AKTIVOVANÝCH CEN RE (aFRR+, aFRR-) ---
 
-def _parse_activated_balancing_price_xml_modular(xml_data_str: str) -> pd.DataFrame:
+@diagnostics.timed_stage("parse")
+@_observed_parser("A84")
+def _parse_activated_balancing_price_xml_modular(xml_source, xml_backend: str | None = None) -> pd.DataFrame:
     """
-    Parsuje XML obsah pro aktivované ceny regulační energie.
+    Streamově parsuje XML obsah pro aktivované ceny regulační energie.
+    `xml_source` je binární stream nebo bytes.
     Vrací DataFrame s UTC-naive datetime a cenami.
     """
-    ns = {'ns': 'urn:iec62325.351:tc57wg16:451-6:balancingdocument:4:1'}
-    data = []
+    tag_price = _qname(_BALANCING_NS, "activation_Price.amount")
+    columns = _ColumnBuffers([
+        ("flowDirection", "category", _FLOW_DIRECTION_CATEGORIES),
+        ("activation_price", "float"),
+    ])
+    timestamps = columns.timestamps
+    direction_codes = columns.codes["flowDirection"]
+    prices = columns.floats["activation_price"]
+
     try:
-        root = ET.fromstring(xml_data_str)
+        for _, flow_direction, timestamp, (price_str,) in entsoe_xml.iter_series_points(
+                xml_source, _BALANCING_NS, "TimeSeries", "Activated Balancing Price", ((tag_price,),),
+                xml_backend=xml_backend):
+            timestamps.append(timestamp)
+            direction_codes.append(columns.code_for("flowDirection", flow_direction))
+            prices.append(float(price_str) if price_str is not None else float('nan'))
     except ET.ParseError as e:
         logging.warning(f"Chyba parsování XML pro aktivované ceny RE: {e}")
-        return pd.DataFrame()
+        return _failed_result(f"nevalidní XML ({e})")
 
-    for ts in root.findall('.//ns:TimeSeries', ns):
-        flow_direction = ts.findtext('ns:flowDirection.direction', default=None, namespaces=ns)
-        period = ts.find('ns:Period', ns)
-        if period is not None:
-            start_time_str = period.findtext('ns:timeInterval/ns:start', default=None, namespaces=ns)
-            resolution_str = period.findtext('ns:resolution', default="PT15M", namespaces=ns)
-            if start_time_str is None or resolution_str is None:
-                logging.warning(f"Chybí start_time nebo resolution v Period elementu pro Activated Balancing Price.")
-                continue
-            
-            start_time_utc_aware = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%MZ").replace(tzinfo=pytz.UTC)
-
-            if resolution_str == "PT15M":
-                step = timedelta(minutes=15)
-            elif resolution_str in ("PT60M", "P1H"):
-                step = timedelta(hours=1)
-            elif resolution_str == "PT30M":
-                step = timedelta(minutes=30)
-            else:
-                step = timedelta(minutes=15) # Default
-
-            for point in period.findall('ns:Point', ns):
-                pos_str = point.findtext('ns:position', default="0", namespaces=ns)
-                pos = int(pos_str) if pos_str is not None else 0
-                price_str = point.findtext('ns:activation_Price.amount', default="nan", namespaces=ns)
-                price = float(price_str) if price_str is not None else float('nan')
-                
-                dt_utc_aware = start_time_utc_aware + (pos - 1) * step
-                
-                data.append({
-                    "Timestamp": dt_utc_aware.replace(tzinfo=None),
-                    "flowDirection": flow_direction,
-                    "activation_price": price
-                })
-    
-    df = pd.DataFrame(data)
-    if df.empty or 'Timestamp' not in df.columns:
+    if len(columns) == 0:
         logging.error("Chyba: 'Timestamp' sloupec chybí v DataFrame z aktivovaných cen RE!")
         return pd.DataFrame()
 
-    df_out = df.pivot_table(
+    df_out = columns.to_frame().pivot_table(
         index="Timestamp",
         columns="flowDirection",
-        values="activation_price"
+        values="activation_price",
+        observed=True
     ).rename(
         columns={"A01": "afrr_plus_price", "A02": "afrr_minus_price"}
     ).reset_index()
@@ -350,7 +517,8 @@ def _parse_activated_balancing_price_xml_modular(xml_data_str: str) -> pd.DataFr
     return df_out[["Timestamp", "afrr_plus_price", "afrr_minus_price"]].sort_values("Timestamp")
 
 
-@st.cache_data(ttl=3600)
+@data_cache.cached("afrr_activation_prices")
+@data_store.persisted("afrr_activation_prices")
 def fetch_afrr_activation_prices_data(
     target_date: datetime.date,
     country_code: str,
@@ -362,154 +530,144 @@ def fetch_afrr_activation_prices_data(
     Načítá a parsuje ceny aktivované regulační energie (aFRR+, aFRR-) pro danou zemi a datum.
     """
     api_key = st.secrets["entsoe_api"]["token"]
-    entsoe_api_url = "https://web-api.tp.entsoe.eu/api"
 
     control_area_domain = eic_codes.get_eic(country_code) # ZDE SE POUŽÍVÁ eic_codes.get_eic()
 
-    country_timezones_map_for_loader = {
-        'CZ': 'Europe/Prague',
-        'PL': 'Europe/Berlin',
-        'AT': 'Europe/Vienna', # NOVÁ ČASOVÁ ZÓNA PRO RAKOUSKO
-    }
-    local_tz_str = country_timezones_map_for_loader.get(country_code, 'UTC')
-
     if not control_area_domain:
         logging.error(f"Nepodporovaný kód země pro aFRR aktivované ceny: {country_code} (EIC kód nenalezen).")
         return pd.DataFrame()
 
-    dates_to_fetch = [target_date - timedelta(days=1), target_date]
-    all_fetched_data = []
-
-    for day_to_fetch in dates_to_fetch:
-        start_period = datetime(day_to_fetch.year, day_to_fetch.month, day_to_fetch.day, 0, 0, 0)
-        end_period = start_period + timedelta(days=1)
-
-        period_start_str = start_period.strftime("%Y%m%d%H%M")
-        period_end_str = end_period.strftime("%Y%m%d%H%M")
-
+    def download_window(window_start: datetime, window_end: datetime) -> pd.DataFrame | None:
         params = {
             "securityToken": api_key,
             "documentType": document_type,
             "processType": process_type,
             "controlArea_Domain": control_area_domain,
             "businessType": business_type,
-            "periodStart": period_start_str,
-            "periodEnd": period_end_str
+            "periodStart": window_start.strftime("%Y%m%d%H%M"),
+            "periodEnd": window_end.strftime("%Y%m%d%H%M")
         }
-        
-        xml_str = "" # ZMĚNA ZDE: Inicializace xml_str
 
+        all_fetched_data = []
+        skipped_parts = []
         try:
-            response = requests.get(url=entsoe_api_url, params=params, timeout=60)
-            response.raise_for_status()
-
-            xml_str = response.content.decode("utf-8", errors="replace") # xml_str zde definováno
-            
-            if "NoMatchingData" in xml_str or "Error_Reason" in xml_str:
-                logging.info(f"API pro aktivované ceny aFRR vrátilo (pro {day_to_fetch}): {xml_str[:250].replace(chr(10), '').replace(chr(13), '')}...")
-                continue
-            
-            df_day_prices = _parse_activated_balancing_price_xml_modular(xml_str)
-            if not df_day_prices.empty:
-                all_fetched_data.append(df_day_prices)
-
+            with _observed_request(document_type), entsoe_documents.fetch_document(params, timeout=60) as document:
+                for xml_name, xml_stream in entsoe_documents.iter_xml_streams(document, "aktivované ceny aFRR", skipped_parts):
+                    df_prices = _parse_activated_balancing_price_xml_modular(xml_stream)
+                    if data_store.INCOMPLETE_ATTR in df_prices.attrs:
+                        skipped_parts.append(f"{xml_name}: {df_prices.attrs[data_store.INCOMPLETE_ATTR]}")
+                    elif not df_prices.empty:
+                        all_fetched_data.append(df_prices)
+
+        except NoMatchingDataError as e:
+            logging.info(f"API pro aktivované ceny aFRR vrátilo NoMatchingData/Error_Reason (pro {target_date}): {e}")
         except requests.exceptions.HTTPError as e:
-            error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response else "No response text"
-            # Reference na xml_str, nyní bezpečnější díky inicializaci
-            logging.error(f"HTTP Chyba při načítání aktivovaných cen aFRR (pro {day_to_fetch}): {e.response.status_code if e.response else 'N/A'}. Odpověď: {error_text}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
+            error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response is not None else "No response text"
+            logging.error(f"HTTP Chyba při načítání aktivovaných cen aFRR (pro {target_date}): {e.response.status_code if e.response is not None else 'N/A'}. Odpověď: {error_text}")
+            return None
         except requests.exceptions.RequestException as e:
-            logging.error(f"Chyba spojení při načítání aktivovaných cen aFRR (pro {day_to_fetch}): {e}.")
+            logging.error(f"Chyba spojení při načítání aktivovaných cen aFRR (pro {target_date}): {e}.")
+            return None
         except Exception as e:
-            # Reference na xml_str, nyní bezpečnější díky inicializaci
-            logging.error(f"Neznámá chyba při stahování/zpracování aktivovaných cen aFRR (pro {day_to_fetch}): {e}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
-    
-    if not all_fetched_data:
-        return pd.DataFrame()
+            logging.error(f"Neznámá chyba při stahování/zpracování aktivovaných cen aFRR (pro {target_date}): {e}")
+            return None
+
+        if not all_fetched_data:
+            return _mark_incomplete(pd.DataFrame(), skipped_parts)
+        with diagnostics.stage("transform"):
+            return _mark_incomplete(pd.concat(all_fetched_data, ignore_index=True), skipped_parts)
+
+    # Jediný dotaz přesně na UTC okno lokálního dne (místo dvou celých UTC dnů);
+    # pro aktuální den se stahuje jen chybějící konec (viz _fetch_day_incrementally)
+    start_utc, end_utc = _local_day_utc_window(target_date, country_code)
+    intraday_key = ("afrr_activation_prices", country_code.upper(), target_date, f"{business_type}_{process_type}_{document_type}")
+    df_afrr_prices_raw = _fetch_day_incrementally(intraday_key, start_utc, end_utc, download_window)
+
+    if df_afrr_prices_raw is None:
+        return _failed_result("stažení aktivovaných cen aFRR selhalo")
+    incomplete = df_afrr_prices_raw.attrs.get(data_store.INCOMPLETE_ATTR)
+    if df_afrr_prices_raw.empty:
+        return _failed_result(incomplete) if incomplete else pd.DataFrame()
+
+    # API vrací celé periody časových řad - ořízneme na přesné okno lokálního dne
+    with diagnostics.stage("transform"):
+        in_window = (df_afrr_prices_raw['Timestamp'] >= start_utc) & (df_afrr_prices_raw['Timestamp'] < end_utc)
+        df_afrr_prices_filtered = df_afrr_prices_raw[in_window].reset_index(drop=True)
+
+    if df_afrr_prices_filtered.empty:
+        return _failed_result(incomplete) if incomplete else pd.DataFrame()
+    if incomplete:
+        df_afrr_prices_filtered.attrs[data_store.INCOMPLETE_ATTR] = incomplete
+    return df_afrr_prices_filtered
 
-    df_afrr_prices_raw = pd.concat(all_fetched_data, ignore_index=True)
-    
-    temp_local_tz = pytz.timezone(local_tz_str)
-    
-    if df_afrr_prices_raw['Timestamp'].dt.tz is not None:
-        df_afrr_prices_raw['Timestamp'] = df_afrr_prices_raw['Timestamp'].dt.tz_convert(None)
 
-    df_afrr_prices_raw['Timestamp_aware_local'] = df_afrr_prices_raw['Timestamp'].dt.tz_localize('UTC', ambiguous='NaT', nonexistent='NaT').dt.tz_convert(temp_local_tz)
+# --- FUNKCE PRO NAČÍTÁNÍ REZERVOVANÉ KAPACITY (A15) ---
 
-    df_afrr_prices_filtered = df_afrr_prices_raw[df_afrr_prices_raw['Timestamp_aware_local'].dt.date == target_date].copy()
-    
-    if not df_afrr_prices_filtered.empty:
-        df_afrr_prices_filtered['Timestamp'] = df_afrr_prices_filtered['Timestamp_aware_local'].dt.tz_convert('UTC').dt.tz_localize(None)
-        df_afrr_prices_filtered = df_afrr_prices_filtered.drop(columns=['Timestamp_aware_local'])
+def _new_procured_capacity_columns() -> _ColumnBuffers:
+    """Prázdné sloupcové buffery pro _parse_procured_capacity_xml_modular."""
+    return _ColumnBuffers([
+        ("TimeSeries ID", "category"),
+        ("Capacity (MW)", "float"),
+        ("Capacity Price (EUR/MW)", "float"),
+        ("Direction", "category", _DIRECTION_CATEGORIES),
+    ])
+
+@diagnostics.timed_stage("parse")
+@_observed_parser("A15")
+def _parse_procured_capacity_xml_modular(xml_source, process_type: str, area_domain: str, market_agreement_type: str,
+                                         columns: _ColumnBuffers | None = None, xml_backend: str | None = None) -> _ColumnBuffers:
+    """
+    Streamově parsuje XML dokument Procured balancing reserves (A15) do typovaných
+    sloupcových bufferů (viz _parse_reserve_bid_xml_modular).
+    """
+    if columns is None:
+        columns = _new_procured_capacity_columns()
+    columns.constants.update({"ProcessType": process_type, "AreaDomain": area_domain, "MarketAgreementType": market_agreement_type})
 
-        df_afrr_prices_filtered = df_afrr_prices_filtered.dropna(subset=['Timestamp'])
-        return df_afrr_prices_filtered
-    else:
-        return pd.DataFrame()
+    tag_quantity = _qname(_BALANCING_NS, "quantity")
+    tag_price = _qname(_BALANCING_NS, "procurement_Price.amount")
 
+    timestamps = columns.timestamps
+    series_id_codes = columns.codes["TimeSeries ID"]
+    capacities = columns.floats["Capacity (MW)"]
+    prices = columns.floats["Capacity Price (EUR/MW)"]
+    direction_codes = columns.codes["Direction"]
 
-# --- FUNKCE PRO NAČÍTÁNÍ REZERVOVANÉ KAPACITY (A15) ---
+    rows_before = len(columns)
+    last_series_key = None
+    series_id_code = direction_code = -1
 
-def _parse_procured_capacity_xml_modular(xml_data_str: str, process_type: str, area_domain: str, market_agreement_type: str) -> list:
-    data_points = []
-    ns = {'bmd': 'urn:iec62325.351:tc57wg16:451-6:balancingdocument:4:1'}
     try:
-        root = ET.fromstring(xml_data_str)
+        for timeseries_id, flow_direction, timestamp, (capacity_str, price_str) in entsoe_xml.iter_series_points(
+                xml_source, _BALANCING_NS, "TimeSeries", "Procured Capacity", ((tag_quantity,), (tag_price,)),
+                xml_backend=xml_backend):
+            if capacity_str is None:
+                logging.debug(f"Přeskočen bod pro Procured Capacity kvůli chybějícímu Capacity: ID={timeseries_id}, Time={timestamp}")
+                continue
+
+            if (timeseries_id, flow_direction) != last_series_key:
+                last_series_key = (timeseries_id, flow_direction)
+                series_id_code = columns.code_for("TimeSeries ID", timeseries_id or "N/A")
+                direction_code = columns.code_for("Direction", _direction_label(flow_direction))
+
+            timestamps.append(timestamp)
+            series_id_codes.append(series_id_code)
+            capacities.append(float(capacity_str))
+            prices.append(float(price_str) if price_str is not None else 0.0)
+            direction_codes.append(direction_code)
     except ET.ParseError as e:
         logging.warning(f"Chyba parsování XML pro rezervovanou kapacitu: {e}")
-        return []
-    for time_series in root.findall(".//bmd:TimeSeries", ns):
-        timeseries_id_elem = time_series.find(".//bmd:mRID", ns)
-        timeseries_id = timeseries_id_elem.text if timeseries_id_elem is not None else "N/A"
-        direction_elem = time_series.find(".//bmd:flowDirection.direction", ns)
-        direction = "Up" if direction_elem is not None and direction_elem.text == "A01" else "Down" if direction_elem is not None and direction_elem.text == "A02" else "Unknown"
-        for period in time_series.findall(".//bmd:Period", ns):
-            start_time_str = period.findtext('bmd:timeInterval/bmd:start', default=None, namespaces=ns)
-            resolution_str = period.findtext('bmd:resolution', default="PT15M", namespaces=ns)
-            if start_time_str is None or resolution_str is None:
-                logging.warning(f"Chybí start_time nebo resolution v Period elementu pro Procured Capacity.")
-                continue
-            step = timedelta(minutes=15)
-            if resolution_str in ["PT60M", "P1H"]:
-                step = timedelta(hours=1)
-            elif resolution_str == "PT30M":
-                step = timedelta(minutes=30)
-            elif resolution_str == "PT1M":
-                step = timedelta(minutes=1)
-            
-            try:
-                start_datetime = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%MZ")
-            except ValueError:
-                logging.warning(f"Nelze parsovat start_time: {start_time_str} pro Procured Capacity.")
-                continue
-            for point in period.findall(".//bmd:Point", ns):
-                pos_str = point.findtext('bmd:position', default="0", namespaces=ns)
-                position = int(pos_str) if pos_str is not None else 0
-                capacity_str = point.findtext('bmd:quantity', default=None, namespaces=ns)
-                price_str = point.findtext('bmd:procurement_Price.amount', default=None, namespaces=ns)
-                
-                capacity = float(capacity_str) if capacity_str is not None else None
-                price = float(price_str) if price_str is not None else 0.0
-                
-                if capacity is None:
-                    logging.debug(f"Přeskočen bod pro Procured Capacity kvůli chybějícímu Capacity: ID={timeseries_id}, Time={start_time_str}, Pos={position}")
-                    continue
-
-                timestamp = start_datetime + (position - 1) * step
-
-                data_points.append({
-                    "Timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    "TimeSeries ID": timeseries_id,
-                    "Capacity (MW)": capacity,
-                    "Capacity Price (EUR/MW)": price,
-                    "Direction": direction,
-                    "ProcessType": process_type,
-                    "AreaDomain": area_domain,
-                    "MarketAgreementType": market_agreement_type
-                })
-    return data_points
-
-
-@st.cache_data(ttl=3600)
+        columns.truncate(rows_before)
+        columns.skipped_documents.append(f"nevalidní XML ({e})")
+    except Exception:
+        columns.truncate(rows_before)
+        raise
+
+    return columns
+
+
+@data_cache.cached("procured_capacity")
+@data_store.persisted("procured_capacity")
 def fetch_procured_capacity_data(
     target_date: datetime.date,
     country_code: str,
@@ -522,7 +680,6 @@ def fetch_procured_capacity_data(
     Vrací DataFrame s časovou řadou cen a objemů za rezervovanou kapacitu (pro Day-Ahead).
     """
     api_key = st.secrets["entsoe_api"]["token"]
-    entsoe_api_url = "https://web-api.tp.entsoe.eu/api"
     
     area_domain = eic_codes.get_eic(country_code)
 
@@ -546,161 +703,87 @@ def fetch_procured_capacity_data(
         'Type_MarketAgreement.Type': market_agreement_type
     }
     
-    all_extracted_data = []
-    xml_str = "" # ZMĚNA ZDE: Inicializace xml_str
+    capacity_columns = _new_procured_capacity_columns()
+    skipped_zips = []
+    failure = None
 
     try:
-        response = requests.get(url=entsoe_api_url, params=params, timeout=90)
-        response.raise_for_status()
-
-        content_type = response.headers.get('Content-Type', '')
-
-        if 'application/zip' in content_type or response.content.startswith(b'PK\x03\x04'):
-            try:
-                with io.BytesIO(response.content) as bio_zip1:
-                    with zipfile.ZipFile(bio_zip1) as zip_file_level1:
-                        for file_name_l1 in zip_file_level1.namelist():
-                            with zip_file_level1.open(file_name_l1) as content_l1:
-                                bytes_l1 = content_l1.read()
-                                
-                                is_nested_zip_processed = False
-                                if file_name_l1.lower().endswith('.zip'):
-                                    try:
-                                        with io.BytesIO(bytes_l1) as bio_zip2:
-                                            with zipfile.ZipFile(bio_zip2) as zip_file_level2:
-                                                for file_name_l2 in zip_file_level2.namelist():
-                                                    if file_name_l2.lower().endswith('.xml'):
-                                                        with zip_file_level2.open(file_name_l2) as xml_file_l2:
-                                                            try:
-                                                                xml_str = xml_file_l2.read().decode("utf-8") # xml_str zde definováno
-                                                            except UnicodeDecodeError:
-                                                                xml_str = xml_file_l2.read().decode("ISO-8859-1", errors='replace')
-                                                            
-                                                            parsed_points = _parse_procured_capacity_xml_modular(xml_str, process_type, area_domain, market_agreement_type)
-                                                            all_extracted_data.extend(parsed_points)
-                                                is_nested_zip_processed = True
-                                    except zipfile.BadZipFile:
-                                        logging.warning(f"Soubor {file_name_l1} vypadal jako ZIP, ale není platný pro kapacitu.")
-                                    except Exception as e_nested:
-                                        logging.error(f"Chyba při zpracování vnořeného ZIPu pro kapacitu {file_name_l1}: {e_nested}")
-
-                                if not is_nested_zip_processed and file_name_l1.lower().endswith('.xml'):
-                                    try:
-                                        xml_str = bytes_l1.decode("utf-8") # xml_str zde definováno
-                                    except UnicodeDecodeError:
-                                        xml_str = bytes_l1.decode("ISO-8859-1", errors='replace')
-                                    
-                                    parsed_points = _parse_procured_capacity_xml_modular(xml_str, process_type, area_domain, market_agreement_type)
-                                    all_extracted_data.extend(parsed_points)
-            except zipfile.BadZipFile:
-                logging.error(f"Chyba: Odpověď byla označena jako ZIP, ale není to platný ZIP archiv pro rezervovanou kapacitu.")
-            except Exception as e_zip_outer:
-                 logging.error(f"Neznámá chyba při zpracování hlavního ZIPu pro rezervovanou kapacitu: {e_zip_outer}")
-        
-        elif 'application/xml' in content_type or 'text/xml' in content_type:
-            try:
-                xml_str = response.content.decode("utf-8") # xml_str zde definováno
-            except UnicodeDecodeError:
-                xml_str = response.content.decode("ISO-8859-1", errors='replace')
-            
-            if "NoMatchingData" in xml_str or "Error_Reason" in xml_str :
-                 logging.info(f"API pro rezervovanou kapacitu vrátilo NoMatchingData/Error_Reason (pro {target_date}): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
-            else:
-                parsed_points = _parse_procured_capacity_xml_modular(xml_str, process_type, area_domain, market_agreement_type)
-                all_extracted_data.extend(parsed_points)
-        else:
-            logging.warning(f"Neočekávaný Content-Type pro rezervovanou kapacitu: {content_type}. Obsah (prvních 200b): {response.content[:200]}")
-
+        with _observed_request(document_type), entsoe_documents.fetch_document(params, timeout=90) as document:
+            for xml_name, xml_stream in entsoe_documents.iter_xml_streams(document, "rezervovanou kapacitu", skipped_zips):
+                _parse_procured_capacity_xml_modular(xml_stream, process_type, area_domain, market_agreement_type, capacity_columns)
+
+    except NoMatchingDataError as e:
+        logging.info(f"API pro rezervovanou kapacitu vrátilo NoMatchingData/Error_Reason (pro {target_date}): {e}")
+    except zipfile.BadZipFile as e:
+        logging.error(f"Chyba: Odpověď byla označena jako ZIP, ale není to platný ZIP archiv pro rezervovanou kapacitu.")
+        failure = e
     except requests.exceptions.HTTPError as e:
-        error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response else "No response text"
-        # Reference na xml_str, nyní bezpečnější díky inicializaci
-        logging.error(f"HTTP Chyba při načítání rezervované kapacity: {e.response.status_code if e.response else 'N/A'} pro {target_date}. Odpověď: {error_text}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
+        error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response is not None else "No response text"
+        logging.error(f"HTTP Chyba při načítání rezervované kapacity: {e.response.status_code if e.response is not None else 'N/A'} pro {target_date}. Odpověď: {error_text}")
+        failure = e
     except requests.exceptions.RequestException as e:
         logging.error(f"Chyba spojení při načítání rezervované kapacity: {e} pro {target_date}.")
+        failure = e
     except Exception as e:
-        # Reference na xml_str, nyní bezpečnější díky inicializaci
-        logging.error(f"Neznámá chyba při stahování/základním zpracování pro rezervovanou kapacitu pro {target_date}: {e}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
+        logging.error(f"Neznámá chyba při stahování/základním zpracování pro rezervovanou kapacitu pro {target_date}: {e}")
+        failure = e
+
+    # Odpověď zpracovaná jen zčásti se nevrací (viz fetch_balancing_bids_for_day_modular)
+    if failure is not None:
+        return _failed_result(failure)
+    skipped_parts = skipped_zips + capacity_columns.skipped_documents
 
-    df_capacity = pd.DataFrame(all_extracted_data)
-    
     # NOVÁ KONTROLA: Logujeme, pokud je DataFrame prázdný a vrátíme ho.
     # To umožní plot_generatoru zpracovat prázdný DataFrame a vypsat uživatelskou zprávu.
-    if df_capacity.empty:
+    if len(capacity_columns) == 0:
         logging.info(f"fetch_procured_capacity_data pro {country_code}, {target_date} vrátila prázdný DataFrame.")
-        return pd.DataFrame()
+        return _mark_incomplete(pd.DataFrame(), skipped_parts)
 
-    if 'Timestamp' not in df_capacity.columns:
-        logging.error("Chyba: 'Timestamp' sloupec chybí v DataFrame z rezervované kapacity po parsování! Sloupce: %s", df_capacity.columns.tolist())
-        return pd.DataFrame()
-
-    if not df_capacity.empty:
-        df_capacity['Timestamp'] = pd.to_datetime(df_capacity['Timestamp'], errors='coerce')
-        if not df_capacity['Timestamp'].dt.tz is None:
-            df_capacity['Timestamp'] = df_capacity['Timestamp'].dt.tz_convert('UTC').dt.tz_localize(None)
-        
-        df_capacity = df_capacity.dropna(subset=['Timestamp'])
-        return df_capacity
-    else: # Toto else by nemělo nastat kvůli kontrole na .empty výše, ale pro jistotu
-        return pd.DataFrame()
+    # Časy jsou v bufferech už jako UTC-naive datetime64, bez převodu přes řetězce
+    with diagnostics.stage("transform"):
+        return _mark_incomplete(capacity_columns.to_frame(), skipped_parts)
 
 # --- POMOCNÉ FUNKCE PRO AGREGÁTOVANÉ NABÍDKY (A24) ---
-def _parse_aggregated_bids_xml_modular(xml_data_str: str) -> pd.DataFrame:
+@diagnostics.timed_stage("parse")
+@_observed_parser("A24")
+def _parse_aggregated_bids_xml_modular(xml_source, xml_backend: str | None = None) -> pd.DataFrame:
     """
-    Parsuje XML obsah pro agregované nabídky (A24).
+    Streamově parsuje XML obsah pro agregované nabídky (A24).
+    `xml_source` je binární stream nebo bytes.
     Vrací DataFrame s UTC-naive datetime a objemy (offered, activated, unavailable).
     """
-    ns = {'ns': 'urn:iec62325.351:tc57wg16:451-6:balancingdocument:4:1'}
-    data = []
+    tag_offered = _qname(_BALANCING_NS, "quantity")
+    tag_activated = _qname(_BALANCING_NS, "secondaryQuantity")
+    tag_unavailable = _qname(_BALANCING_NS, "unavailable_Quantity.quantity")
+    columns = _ColumnBuffers([
+        ("flowDirection", "category", _FLOW_DIRECTION_CATEGORIES),
+        ("offered", "float"),
+        ("activated", "float"),
+        ("unavailable", "float"),
+    ])
+    timestamps = columns.timestamps
+    direction_codes = columns.codes["flowDirection"]
+    offered = columns.floats["offered"]
+    activated = columns.floats["activated"]
+    unavailable = columns.floats["unavailable"]
+
     try:
-        root = ET.fromstring(xml_data_str)
+        for _, flow_direction, timestamp, (offered_str, activated_str, unavailable_str) in entsoe_xml.iter_series_points(
+                xml_source, _BALANCING_NS, "TimeSeries", "Aggregated Bids", ((tag_offered,), (tag_activated,), (tag_unavailable,)),
+                xml_backend=xml_backend):
+
+            timestamps.append(timestamp)
+            direction_codes.append(columns.code_for("flowDirection", flow_direction))
+            offered.append(float(offered_str) if offered_str is not None else float('nan'))
+            activated.append(float(activated_str) if activated_str is not None else float('nan'))
+            unavailable.append(float(unavailable_str) if unavailable_str is not None else float('nan'))
     except ET.ParseError as e:
         logging.warning(f"Chyba parsování XML pro agregované nabídky: {e}")
-        return pd.DataFrame()
+        return _failed_result(f"nevalidní XML ({e})")
 
-    for ts in root.findall('.//ns:TimeSeries', ns):
-        flow_direction = ts.findtext('ns:flowDirection.direction', default=None, namespaces=ns)
-        period = ts.find('ns:Period', ns)
-        if period is not None:
-            start_time_str = period.findtext('ns:timeInterval/ns:start', default=None, namespaces=ns)
-            resolution_str = period.findtext('ns:resolution', default="PT15M", namespaces=ns)
-            if start_time_str is None or resolution_str is None:
-                logging.warning(f"Chybí start_time nebo resolution v Period elementu pro Aggregated Bids.")
-                continue
-            
-            start_time_utc_aware = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%MZ").replace(tzinfo=pytz.UTC)
-
-            if resolution_str == "PT15M":
-                step = timedelta(minutes=15)
-            elif resolution_str in ("PT60M", "P1H"):
-                step = timedelta(hours=1)
-            elif resolution_str == "PT30M":
-                step = timedelta(minutes=30)
-            elif resolution_str == "PT1M":
-                step = timedelta(minutes=1)
-            else:
-                step = timedelta(minutes=15)
-
-            for point in period.findall('ns:Point', ns):
-                pos_str = point.findtext('ns:position', default="0", namespaces=ns)
-                pos = int(pos_str) if pos_str is not None else 0
-                offered_str = point.findtext('ns:quantity', default=None, namespaces=ns)
-                activated_str = point.findtext('ns:secondaryQuantity', default=None, namespaces=ns)
-                unavailable_str = point.findtext('ns:unavailable_Quantity.quantity', default=None, namespaces=ns)
-                
-                offered = float(offered_str) if offered_str is not None else float('nan')
-                activated = float(activated_str) if activated_str is not None else float('nan')
-                unavailable = float(unavailable_str) if unavailable_str is not None else float('nan')
-                
-                dt_utc_aware = start_time_utc_aware + (pos - 1) * step
-                
-                data.append({
-                    "Timestamp": dt_utc_aware.replace(tzinfo=None),
-                    "flowDirection": flow_direction,
-                    "offered": offered,
-                    "activated": activated,
-                    "unavailable": unavailable
-                })
-    return pd.DataFrame(data)
+    if len(columns) == 0:
+        return pd.DataFrame()
+    return columns.to_frame()
 
 # Pomocná funkce pro vyplnění NaN offered hodnot
 def _fill_offered_nearest_modular(df: pd.DataFrame) -> pd.DataFrame:
@@ -709,7 +792,8 @@ def _fill_offered_nearest_modular(df: pd.DataFrame) -> pd.DataFrame:
             df[col] = df[col].interpolate(method="nearest", limit_direction="both")
     return df
 
-@st.cache_data(ttl=3600)
+@data_cache.cached("aggregated_bids")
+@data_store.persisted("aggregated_bids")
 def _fetch_single_aggregated_bids_data(
     target_date: datetime.date,
     country_code: str,
@@ -720,7 +804,6 @@ def _fetch_single_aggregated_bids_data(
     Načítá a parsuje agregované nabídky (A24) pro danou zemi a datum pro JEDEN process_type.
     """
     api_key = st.secrets["entsoe_api"]["token"]
-    entsoe_api_url = "https://web-api.tp.entsoe.eu/api"
     
     area_domain = eic_codes.get_eic(country_code)
 
@@ -728,114 +811,105 @@ def _fetch_single_aggregated_bids_data(
         logging.error(f"Nepodporovaný kód země pro agregované nabídky: {country_code} (EIC kód nenalezen).")
         return pd.DataFrame()
 
-    dates_to_fetch = [target_date - timedelta(days=1), target_date]
-    all_fetched_data = []
-    xml_str = "" # ZMĚNA ZDE: Inicializace xml_str
-
-    for day_to_fetch in dates_to_fetch:
-        start_period = datetime(day_to_fetch.year, day_to_fetch.month, day_to_fetch.day, 0, 0, 0)
-        end_period = start_period + timedelta(days=1)
-
-        period_start_str = start_period.strftime("%Y%m%d%H%M")
-        period_end_str = end_period.strftime("%Y%m%d%H%M")
-
+    def download_window(window_start: datetime, window_end: datetime) -> pd.DataFrame | None:
         params = {
             "securityToken": api_key,
             "documentType": document_type,
             "processType": process_type,
             "area_Domain": area_domain,
-            "periodStart": period_start_str,
-            "periodEnd": period_end_str
+            "periodStart": window_start.strftime("%Y%m%d%H%M"),
+            "periodEnd": window_end.strftime("%Y%m%d%H%M")
         }
-        
-        try:
-            response = requests.get(url=entsoe_api_url, params=params, timeout=60)
-            response.raise_for_status()
-
-            xml_str = response.content.decode("utf-8", errors="replace") # xml_str zde definováno
-            
-            if "NoMatchingData" in xml_str or "Error_Reason" in xml_str:
-                logging.info(f"API pro agregované nabídky vrátilo (pro {day_to_fetch}, {process_type}): {xml_str[:250].replace(chr(10), '').replace(chr(13), '')}...")
-                continue
-            
-            df_day_bids = _parse_aggregated_bids_xml_modular(xml_str)
-            if not df_day_bids.empty:
-                all_fetched_data.append(df_day_bids)
 
+        all_fetched_data = []
+        skipped_parts = []
+        try:
+            with _observed_request(document_type), entsoe_documents.fetch_document(params, timeout=60) as document:
+                for xml_name, xml_stream in entsoe_documents.iter_xml_streams(document, "agregované nabídky", skipped_parts):
+                    df_bids = _parse_aggregated_bids_xml_modular(xml_stream)
+                    if data_store.INCOMPLETE_ATTR in df_bids.attrs:
+                        skipped_parts.append(f"{xml_name}: {df_bids.attrs[data_store.INCOMPLETE_ATTR]}")
+                    elif not df_bids.empty:
+                        all_fetched_data.append(df_bids)
+
+        except NoMatchingDataError as e:
+            logging.info(f"API pro agregované nabídky vrátilo NoMatchingData/Error_Reason (pro {target_date}, {process_type}): {e}")
         except requests.exceptions.HTTPError as e:
-            error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response else "No response text"
-            # Reference na xml_str, nyní bezpečnější díky inicializaci
-            logging.error(f"HTTP Chyba při načítání agregovaných nabídek (pro {day_to_fetch}, {process_type}): {e.response.status_code if e.response else 'N/A'}. Odpověď: {error_text}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
+            error_text = e.response.text[:250].replace(chr(10),'').replace(chr(13),'') if e.response is not None else "No response text"
+            logging.error(f"HTTP Chyba při načítání agregovaných nabídek (pro {target_date}, {process_type}): {e.response.status_code if e.response is not None else 'N/A'}. Odpověď: {error_text}")
+            return None
         except requests.exceptions.RequestException as e:
-            logging.error(f"Chyba spojení při načítání agregovaných nabídek (pro {day_to_fetch}, {process_type}): {e}.")
+            logging.error(f"Chyba spojení při načítání agregovaných nabídek (pro {target_date}, {process_type}): {e}.")
+            return None
         except Exception as e:
-            # Reference na xml_str, nyní bezpečnější díky inicializaci
-            logging.error(f"Neznámá chyba při stahování/zpracování agregovaných nabídek (pro {day_to_fetch}, {process_type}): {e}. XML (prvních 250b): {xml_str[:250].replace(chr(10),'').replace(chr(13),'')}...")
-    
-    if not all_fetched_data:
+            logging.error(f"Neznámá chyba při stahování/zpracování agregovaných nabídek (pro {target_date}, {process_type}): {e}")
+            return None
+
+        if not all_fetched_data:
+            return _mark_incomplete(pd.DataFrame(), skipped_parts)
+        with diagnostics.stage("transform"):
+            return _mark_incomplete(pd.concat(all_fetched_data, ignore_index=True), skipped_parts)
+
+    # Jediný dotaz přesně na UTC okno lokálního dne (místo dvou celých UTC dnů);
+    # pro aktuální den se stahuje jen chybějící konec (viz _fetch_day_incrementally)
+    start_utc, end_utc = _local_day_utc_window(target_date, country_code)
+    intraday_key = ("aggregated_bids", country_code.upper(), target_date, f"{process_type}_{document_type}")
+    df_agg_bids_raw = _fetch_day_incrementally(intraday_key, start_utc, end_utc, download_window)
+
+    if df_agg_bids_raw is None:
+        return _failed_result(f"stažení agregovaných nabídek {process_type} selhalo")
+    incomplete = df_agg_bids_raw.attrs.get(data_store.INCOMPLETE_ATTR)
+    if df_agg_bids_raw.empty:
         logging.info(f"_fetch_single_aggregated_bids_data pro {country_code}, {target_date}, {process_type} vrátila prázdný DataFrame.")
-        return pd.DataFrame()
+        return _failed_result(incomplete) if incomplete else pd.DataFrame()
 
-    df_agg_bids_raw = pd.concat(all_fetched_data, ignore_index=True)
-    
-    country_timezones_map_for_loader = {
-        'CZ': 'Europe/Prague',
-        'PL': 'Europe/Berlin',
-        'AT': 'Europe/Vienna', # NOVÁ ČASOVÁ ZÓNA PRO RAKOUSKO
-    }
-    local_tz_str = country_timezones_map_for_loader.get(country_code, 'UTC')
-    temp_local_tz = pytz.timezone(local_tz_str)
+    with diagnostics.stage("transform"):
+        # API vrací celé periody časových řad - ořízneme na přesné okno lokálního dne
+        in_window = (df_agg_bids_raw['Timestamp'] >= start_utc) & (df_agg_bids_raw['Timestamp'] < end_utc)
+        df_agg_bids_filtered = df_agg_bids_raw[in_window]
     
-    if df_agg_bids_raw['Timestamp'].dt.tz is not None:
-        df_agg_bids_raw['Timestamp'] = df_agg_bids_raw['Timestamp'].dt.tz_convert(None)
-
-    df_agg_bids_raw['Timestamp_aware_local'] = df_agg_bids_raw['Timestamp'].dt.tz_localize('UTC', ambiguous='NaT', nonexistent='NaT').dt.tz_convert(temp_local_tz)
-
-    df_agg_bids_filtered = df_agg_bids_raw[df_agg_bids_raw['Timestamp_aware_local'].dt.date == target_date].copy()
-    
-    if not df_agg_bids_filtered.empty:
-        df_agg_bids_filtered['Timestamp'] = df_agg_bids_filtered['Timestamp_aware_local'].dt.tz_convert('UTC').dt.tz_localize(None)
-        df_agg_bids_filtered = df_agg_bids_filtered.drop(columns=['Timestamp_aware_local'])
-
-        piv = df_agg_bids_filtered.pivot_table(
-            index="Timestamp",
-            columns="flowDirection",
-            values=["offered", "activated", "unavailable"]
-        )
-        piv.columns = [
-            f"afrr_plus_{col}" if fd == "A01" else f"afrr_minus_{col}"
-            for col, fd in piv.columns
-        ]
-        piv = piv.reset_index()
+        if not df_agg_bids_filtered.empty:
+            piv = df_agg_bids_filtered.pivot_table(
+                index="Timestamp",
+                columns="flowDirection",
+                values=["offered", "activated", "unavailable"],
+                observed=True
+            )
+            piv.columns = [
+                f"afrr_plus_{col}" if fd == "A01" else f"afrr_minus_{col}"
+                for col, fd in piv.columns
+            ]
+            piv = piv.reset_index()
         
-        all_expected_cols = [
-            "Timestamp",
-            "afrr_plus_offered", "afrr_plus_activated", "afrr_plus_unavailable",
-            "afrr_minus_offered", "afrr_minus_activated", "afrr_minus_unavailable"
-        ]
-        for col in all_expected_cols:
-            if col not in piv.columns:
-                piv[col] = float('nan')
-
-        piv = piv[all_expected_cols].sort_values("Timestamp")
+            all_expected_cols = [
+                "Timestamp",
+                "afrr_plus_offered", "afrr_plus_activated", "afrr_plus_unavailable",
+                "afrr_minus_offered", "afrr_minus_activated", "afrr_minus_unavailable"
+            ]
+            for col in all_expected_cols:
+                if col not in piv.columns:
+                    piv[col] = float('nan')
+
+            piv = piv[all_expected_cols].sort_values("Timestamp")
         
-        piv = _fill_offered_nearest_modular(piv)
+            piv = _fill_offered_nearest_modular(piv)
 
-        for col in ["afrr_minus_offered", "afrr_minus_activated", "afrr_minus_unavailable"]:
-            if col in piv.columns:
-                piv[col] = -piv[col]
-        
-        return piv
-    else:
-        return pd.DataFrame()
+            for col in ["afrr_minus_offered", "afrr_minus_activated", "afrr_minus_unavailable"]:
+                if col in piv.columns:
+                    piv[col] = -piv[col]
+
+            if incomplete:
+                piv.attrs[data_store.INCOMPLETE_ATTR] = incomplete
+            return piv
+        else:
+            return _failed_result(incomplete) if incomplete else pd.DataFrame()
 
-@st.cache_data(ttl=3600)
 def fetch_all_aggregated_bids_data(
     target_date: datetime.date,
     country_code: str
 ) -> dict[str, pd.DataFrame]:
     """
-    Načítá a kešuje oba typy agregovaných nabídek (A67 a A68).
+    Načítá oba typy agregovaných nabídek (A67 a A68); kešování řeší _fetch_single_aggregated_bids_data.
     Vrací slovník {process_type: DataFrame}.
     """
     data = {}
@@ -0,0 +1,272 @@
+# data_orchestrator.py
+
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date
+from typing import Any, Callable, Hashable, Iterator
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import data_loader as dl
+import data_store
+import diagnostics
+import eic_codes
+import entsoe_http
+
+"""
+Tento modul obsahuje orchestraci souběžného načítání dat pro stránku dashboardu.
+Všechna data pro stránku se stahují paralelně ve sdíleném poolu vláken,
+takže doba načtení stránky odpovídá nejpomalejšímu dotazu, ne součtu všech dotazů.
+Totéž platí při srovnání více zemí - dotazy všech zemí běží v jednom společném běhu.
+Složené oblasti (eic_codes.composite_areas, např. DE) se načítají jako jedna úloha,
+která souběžně stáhne data všech regulačních oblastí a sloučí je.
+"""
+
+# Globální deadline pro načtení všech dat stránky (s).
+# Je delší než read timeout nejpomalejšího dotazu (90 s), aby se retry stihly aspoň jednou.
+PAGE_LOAD_DEADLINE_S = 120
+
+# Sdílený pool pro celý proces - omezuje celkový počet souběžných dotazů napříč sezeními
+MAX_WORKERS = 16
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="svr-loader")
+
+# Kolik úloh jednoho načtení stránky (jednoho run_concurrently) běží v poolu najednou. Stránka jedné
+# země má 6 datasetů; srovnání zemí (až 18 úloh) tak neobsadí celý pool a nezdrží ostatní sezení.
+MAX_JOBS_PER_PAGE = 6
+
+# Datasety, které se při srovnání zemí stahují i pro další (nehlavní) země
+COMPARISON_DATASETS = ("day_ahead", "afrr_activation", "aggregated_bids_A67", "aggregated_bids_A68")
+
+# Samostatný pool pro rozpad složených oblastí - úloha stránky na výsledky regulačních oblastí čeká,
+# takže nesmí čekat na vlákna ze stejného poolu (při plném _executor by hrozil deadlock)
+_fanout_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="svr-fanout")
+
+# Úlohy bez kontextu sezení (prefetch_scheduler) mají vlastní pooly - jejich vlákna nikdy nedostanou
+# ScriptRunContext, takže úloha nemůže zdědit kontext sezení, které na vlákně běželo dřív
+_background_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="svr-loader-bg")
+_background_fanout_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="svr-fanout-bg")
+
+# Sloučení dat složené oblasti podle datasetu:
+#   "sum"    objemy se sčítají po časových krocích
+#   "mean"   ceny se průměrují bez vah - nejde o skutečnou cenu složené oblasti, výsledek nese
+#            attrs[UNWEIGHTED_MEAN_ATTR] a UI ho tak popisuje (ceny oblastí ukazuje rozpad)
+#   "concat" nabídky všech oblastí tvoří jednu společnou merit order (sloupec ControlArea zachová rozpad)
+# Denní ceny se nerozpadají - složená oblast je jedna nabídková zóna (eic_codes.bidding_zone_by_country).
+COMPOSITE_MERGE = {
+    "afrr_activation": "mean",
+    "aggregated_bids_A67": "sum",
+    "aggregated_bids_A68": "sum",
+    "procured_capacity": "concat",
+    "balancing_bids": "concat",
+}
+
+# Atribut DataFrame se seznamem regulačních oblastí, pro které chybí data (neúplný součet)
+MISSING_AREAS_ATTR = "missing_areas"
+
+# Atribut DataFrame se seznamem regulačních oblastí, jejichž hodnoty jsou nevážený průměr (COMPOSITE_MERGE "mean")
+UNWEIGHTED_MEAN_ATTR = "unweighted_mean_of"
+
+
+def _run_in_worker(func: Callable[[], Any], ctx, rerun: diagnostics.RerunDiagnostics | None = None) -> Any:
+    """
+    Spustí úlohu ve vlákně poolu s ScriptRunContextem volajícího sezení,
+    aby st.cache_data a st.secrets fungovaly stejně jako v hlavním vlákně.
+    Měření úlohy se započítá do rerunu volajícího (diagnostics).
+    Úlohy s kontextem a bez něj běží v oddělených poolech (viz _background_executor), kontext
+    se tedy přepíše před každou úlohou a po jejím doběhnutí ho není třeba z vlákna mazat.
+    """
+    if ctx is not None:
+        add_script_run_ctx(threading.current_thread(), ctx)
+    with diagnostics.collecting(rerun):
+        return func()
+
+
+def run_concurrently(
+    jobs: dict[Hashable, Callable[[], Any]],
+    deadline_s: float = PAGE_LOAD_DEADLINE_S,
+    max_in_flight: int = MAX_JOBS_PER_PAGE
+) -> Iterator[tuple[Hashable, Any, Exception | None, float]]:
+    """
+    Spustí úlohy souběžně (nejvýše `max_in_flight` najednou, další se zadávají průběžně)
+    a postupně vrací (název, výsledek, chyba, čas v s) v pořadí, v jakém jednotlivé úlohy doběhnou.
+    Úlohy, které nestihnou globální deadline, jsou vráceny s chybou TimeoutError
+    (běžící dotaz doběhne na pozadí a jeho výsledek se uloží do cache).
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    rerun = diagnostics.current_rerun()
+    executor = _executor if ctx is not None else _background_executor
+    started_at = time.monotonic()
+    pending = iter(jobs.items())
+    in_flight = {}
+
+    def submit_next() -> bool:
+        item = next(pending, None)
+        if item is None:
+            return False
+        name, func = item
+        in_flight[executor.submit(_run_in_worker, func, ctx, rerun)] = name
+        return True
+
+    while len(in_flight) < max_in_flight and submit_next():
+        pass
+
+    while in_flight:
+        done, _ = wait(in_flight, timeout=max(deadline_s - (time.monotonic() - started_at), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            name = in_flight.pop(future)
+            submit_next()
+            elapsed = time.monotonic() - started_at
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"Načítání dat '{name}' selhalo: {e}")
+                yield name, None, e, elapsed
+            else:
+                yield name, result, None, elapsed
+
+    # Deadline vypršel - běžící úlohy doběhnou na pozadí, nezadané se už nespustí
+    elapsed = time.monotonic() - started_at
+    timed_out = list(in_flight.items()) + [(None, name) for name, _ in pending]
+    for future, name in timed_out:
+        if future is not None:
+            future.cancel()
+        logging.warning(f"Načítání dat '{name}' nestihlo deadline {deadline_s} s.")
+        yield name, None, TimeoutError(f"Deadline {deadline_s} s vypršel"), elapsed
+
+
+def page_dataset_calls(target_date: date, country_code: str) -> dict[str, tuple[Callable[..., Any], tuple, dict]]:
+    """
+    Vrátí volání fetch funkcí (funkce, args, kwargs) pro všechny datasety stránky dashboardu.
+    Stejná volání používá i prefetch_scheduler, takže obnovuje přesně to, co stránka čte z cache.
+    Pro složenou oblast vrací volání fetch_composite_area (kromě denních cen).
+    """
+    if eic_codes.get_member_areas(country_code):
+        calls = page_dataset_calls(target_date, eic_codes.get_member_areas(country_code)[0])
+        calls["day_ahead"] = (dl.fetch_day_ahead_prices_data, (country_code, target_date), {})
+        for name in COMPOSITE_MERGE:
+            calls[name] = (fetch_composite_area, (name, target_date, country_code), {})
+        return calls
+
+    return {
+        "day_ahead": (dl.fetch_day_ahead_prices_data, (country_code, target_date), {}),
+        "afrr_activation": (dl.fetch_afrr_activation_prices_data, (target_date, country_code), {}),
+        "procured_capacity": (dl.fetch_procured_capacity_data, (), {"target_date": target_date, "country_code": country_code}),
+        "aggregated_bids_A67": (dl._fetch_single_aggregated_bids_data, (target_date, country_code, "A67"), {}),
+        "aggregated_bids_A68": (dl._fetch_single_aggregated_bids_data, (target_date, country_code, "A68"), {}),
+        "balancing_bids": (dl.fetch_balancing_bids_for_day_modular, (), {
+            "target_date": target_date,
+            "country_code": country_code,
+            "process_type": "A51"
+        }),
+    }
+
+
+def build_page_jobs(target_date: date, country_code: str) -> dict[str, Callable[[], Any]]:
+    """Vrátí úlohy pro načtení všech datasetů, které stránka dashboardu zobrazuje."""
+    return {
+        name: functools.partial(func, *args, **kwargs)
+        for name, (func, args, kwargs) in page_dataset_calls(target_date, country_code).items()
+    }
+
+
+def build_multi_country_jobs(target_date: date, country_codes: list[str]) -> dict[tuple[str, str], Callable[[], Any]]:
+    """
+    Vrátí úlohy pro stránku se srovnáním zemí, klíčované (dataset, země).
+    První země je hlavní a načítají se pro ni všechny datasety stránky,
+    pro ostatní země jen COMPARISON_DATASETS.
+    """
+    jobs = {}
+    for index, country_code in enumerate(country_codes):
+        for name, job in build_page_jobs(target_date, country_code).items():
+            if index == 0 or name in COMPARISON_DATASETS:
+                jobs[(name, country_code)] = job
+    return jobs
+
+
+def _run_in_fanout_worker(func: Callable[[], Any], ctx, priority: int, rerun: diagnostics.RerunDiagnostics | None) -> Any:
+    # Vlákno fan-outu přebírá kontext sezení, prioritu limitéru i měření rerunu od volající úlohy
+    with entsoe_http.request_priority(priority):
+        return _run_in_worker(func, ctx, rerun)
+
+
+def fetch_composite_area_breakdown(
+    dataset_name: str,
+    target_date: date,
+    composite_code: str,
+    refresh: bool = False
+) -> dict[str, pd.DataFrame]:
+    """
+    Souběžně načte dataset pro všechny regulační oblasti složené oblasti a vrátí {oblast: DataFrame}.
+    Jednotlivé oblasti jdou přes běžné fetch funkce, takže se kešují a ukládají samostatně.
+    S `refresh=True` se data oblastí znovu stáhnou (pro prefetch_scheduler).
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    priority = entsoe_http.current_priority()
+    rerun = diagnostics.current_rerun()
+    executor = _fanout_executor if ctx is not None else _background_fanout_executor
+    futures = {}
+    for member_area in eic_codes.get_member_areas(composite_code):
+        func, args, kwargs = page_dataset_calls(target_date, member_area)[dataset_name]
+        call = functools.partial(func.refresh if refresh else func, *args, **kwargs)
+        futures[member_area] = executor.submit(_run_in_fanout_worker, call, ctx, priority, rerun)
+
+    frames = {}
+    for member_area, future in futures.items():
+        try:
+            frames[member_area] = future.result()
+        except Exception as e:
+            logging.error(f"Načítání dat '{dataset_name}' pro regulační oblast {member_area} ({composite_code}) selhalo: {e}")
+            frames[member_area] = pd.DataFrame()
+    return frames
+
+
+def merge_composite_frames(dataset_name: str, frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Sloučí data regulačních oblastí podle COMPOSITE_MERGE. Chybějící oblasti se vynechají
+    a uvedou v attrs[MISSING_AREAS_ATTR]; pokud je některá oblast zastaralá, výsledek
+    přebírá nejstarší attrs[data_store.STALE_ATTR].
+    """
+    available = {area: df for area, df in frames.items() if df is not None and not df.empty}
+    if not available:
+        return pd.DataFrame()
+
+    merge_mode = COMPOSITE_MERGE[dataset_name]
+    if merge_mode == "concat":
+        merged = pd.concat([df.assign(ControlArea=area) for area, df in available.items()], ignore_index=True)
+    else:
+        stacked = pd.concat(available.values(), ignore_index=True)
+        grouped = stacked.groupby("Timestamp", as_index=False, sort=True)
+        merged = grouped.sum(min_count=1) if merge_mode == "sum" else grouped.mean()
+        if merge_mode == "mean":
+            merged.attrs[UNWEIGHTED_MEAN_ATTR] = list(available)
+
+    missing_areas = [area for area in frames if area not in available]
+    if missing_areas:
+        logging.warning(f"Sloučená data '{dataset_name}' jsou neúplná, chybí regulační oblasti {missing_areas}.")
+        merged.attrs[MISSING_AREAS_ATTR] = missing_areas
+
+    stale_since = [df.attrs[data_store.STALE_ATTR] for df in available.values() if data_store.STALE_ATTR in df.attrs]
+    if stale_since:
+        merged.attrs[data_store.STALE_ATTR] = min(stale_since)
+    return merged
+
+
+def fetch_composite_area(dataset_name: str, target_date: date, composite_code: str) -> pd.DataFrame:
+    """Načte dataset pro složenou oblast (např. DE) souběžně po regulačních oblastech a sloučí ho."""
+    frames = fetch_composite_area_breakdown(dataset_name, target_date, composite_code)
+    return merge_composite_frames(dataset_name, frames)
+
+
+def _refresh_composite_area(dataset_name: str, target_date: date, composite_code: str) -> pd.DataFrame:
+    frames = fetch_composite_area_breakdown(dataset_name, target_date, composite_code, refresh=True)
+    return merge_composite_frames(dataset_name, frames)
+
+
+# Stejné rozhraní jako fetch funkce s @data_cache.cached (používá prefetch_scheduler)
+fetch_composite_area.refresh = _refresh_composite_area
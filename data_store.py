@@ -0,0 +1,202 @@
+# data_store.py
+
+import functools
+import inspect
+import logging
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytz
+
+import diagnostics
+import single_flight
+
+"""
+Tento modul obsahuje perzistentní úložiště stažených dat na disku.
+Data jsou ukládána jako Parquet soubory rozdělené podle datasetu, země a dne:
+
+    <SVR_DATA_STORE_DIR>/<dataset>/country=<CC>/date=<YYYY-MM-DD>/<varianta>.parquet
+
+Ukládají se pouze "uzavřené" dny, tj. dny, jejichž data se na straně ENTSO-E
+už nemění. Takový den se tedy z API stahuje za celou dobu běhu nasazení jen jednou.
+
+Pro ještě neuzavřené dny se vedle ukládá poslední dobrý výsledek (<varianta>.last_good.parquet).
+Když pak API nevrátí nic (typicky výpadek), vrátí se tato data označená časem stažení (STALE_ATTR).
+Výsledky, které fetch funkce označí jako neúplné (INCOMPLETE_ATTR), se neukládají vůbec.
+"""
+
+STORE_DIR = Path(os.environ.get("SVR_DATA_STORE_DIR", Path(__file__).resolve().parent / "data_store"))
+
+# Časová zóna, ve které ENTSO-E uzavírá obchodní den
+_MARKET_TZ = pytz.timezone("Europe/Brussels")
+
+# Den je považován za uzavřený až po uplynutí této doby od jeho konce
+# (ENTSO-E publikuje některá data, např. aktivované ceny, se zpožděním).
+CLOSED_DAY_GRACE = timedelta(days=1)
+
+# Přípona varianty pro poslední dobrý výsledek neuzavřeného dne
+LAST_GOOD_SUFFIX = ".last_good"
+
+# Klíč v DataFrame.attrs, kterým se označují starší data (čas jejich stažení, UTC-aware)
+STALE_ATTR = "stale_since"
+
+# Klíč v DataFrame.attrs, kterým fetch funkce označují neúplný výsledek - dotaz na API selhal
+# (na rozdíl od prázdného výsledku pro data, která ještě nejsou publikována) nebo se část odpovědi
+# nepodařilo zpracovat (neplatný vnořený ZIP, nevalidní XML); hodnota je popis chyby.
+# Neúplné výsledky se neukládají.
+INCOMPLETE_ATTR = "incomplete"
+
+# Sdílené mezi všemi persisted funkcemi - klíč obsahuje název datasetu
+in_flight_fetches = single_flight.SingleFlight("ENTSOE-E")
+
+
+def is_day_closed(target_date: date, now: datetime | None = None) -> bool:
+    """Vrátí True, pokud se data pro daný den již nebudou měnit."""
+    now_local = (now or datetime.now(pytz.utc)).astimezone(_MARKET_TZ)
+    day_end_local = _MARKET_TZ.localize(datetime(target_date.year, target_date.month, target_date.day) + timedelta(days=1))
+    return now_local >= day_end_local + CLOSED_DAY_GRACE
+
+
+def partition_path(dataset: str, country_code: str, target_date: date, variant: str = "data") -> Path:
+    """Vrátí cestu k Parquet souboru pro danou partition."""
+    return STORE_DIR / dataset / f"country={country_code.upper()}" / f"date={target_date.isoformat()}" / f"{variant}.parquet"
+
+
+def has_partition(dataset: str, country_code: str, target_date: date, variant: str = "data") -> bool:
+    """Vrátí True, pokud je partition již uložená na disku."""
+    return partition_path(dataset, country_code, target_date, variant).is_file()
+
+
+def load_partition(dataset: str, country_code: str, target_date: date, variant: str = "data") -> pd.DataFrame | None:
+    """
+    Načte partition z disku. Vrací None, pokud neexistuje nebo ji nelze přečíst
+    (poškozený soubor se pak jednoduše stáhne znovu).
+    """
+    path = partition_path(dataset, country_code, target_date, variant)
+    if not path.is_file():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logging.warning(f"Nelze načíst uložená data {path}: {e}")
+        return None
+
+
+def save_partition(df: pd.DataFrame, dataset: str, country_code: str, target_date: date, variant: str = "data") -> bool:
+    """
+    Uloží DataFrame jako partition. Zápis je atomický (dočasný soubor + os.replace),
+    takže souběžný čtenář nikdy neuvidí napůl zapsaný soubor.
+    """
+    path = partition_path(dataset, country_code, target_date, variant)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logging.warning(f"Nelze uložit data do {path}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def load_last_good(dataset: str, country_code: str, target_date: date, variant: str = "data") -> pd.DataFrame | None:
+    """Načte poslední dobrý výsledek neuzavřeného dne, označený časem uložení v df.attrs[STALE_ATTR]."""
+    path = partition_path(dataset, country_code, target_date, f"{variant}{LAST_GOOD_SUFFIX}")
+    df = load_partition(dataset, country_code, target_date, f"{variant}{LAST_GOOD_SUFFIX}")
+    if df is None:
+        return None
+    try:
+        df.attrs[STALE_ATTR] = datetime.fromtimestamp(path.stat().st_mtime, pytz.utc)
+    except OSError:
+        return None
+    return df
+
+
+def _partition_key(bound_arguments: dict) -> tuple[str, date, str]:
+    """
+    Z argumentů fetch funkce určí (země, den, varianta).
+    Varianta je složena z ostatních parametrů (process_type, document_type, ...),
+    aby se různé dotazy pro stejný den neukládaly do jednoho souboru.
+    """
+    country_code = bound_arguments["country_code"]
+    target_date = next(value for value in bound_arguments.values() if isinstance(value, date))
+    variant_parts = [
+        str(value) for name, value in bound_arguments.items()
+        if name != "country_code" and value is not target_date
+    ]
+    return country_code, target_date, "_".join(variant_parts) or "data"
+
+
+def persisted(dataset: str):
+    """
+    Dekorátor pro fetch funkce v data_loader.py.
+    Před voláním API zkusí načíst partition z disku; výsledek pro uzavřený den uloží.
+    Prázdné výsledky se neukládají (data mohou být publikována později); místo nich
+    se vrací poslední dobrý výsledek, pokud existuje (load_last_good).
+    Neúplné výsledky (INCOMPLETE_ATTR) se vrací, ale neukládají - příští dotaz stáhne den znovu.
+    Souběžná volání se stejnou partition se slučují do jednoho dotazu (single_flight.py).
+    Dekorovaná funkce má navíc atributy `dataset`, `is_stored(*args, **kwargs)`
+    a `partition_key(*args, **kwargs)` -> (země, den, varianta).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def key_for(args, kwargs) -> tuple[str, date, str]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return _partition_key(bound.arguments)
+
+        def load_or_fetch(args, kwargs, country_code, target_date, variant):
+            with diagnostics.stage("store"):
+                stored_df = load_partition(dataset, country_code, target_date, variant)
+            if stored_df is not None:
+                logging.info(f"Data {dataset} pro {country_code}, {target_date} ({variant}) načtena z lokálního úložiště.")
+                diagnostics.set_source("store")
+                return stored_df
+
+            diagnostics.set_source("api")
+            df = func(*args, **kwargs)
+            last_good_variant = f"{variant}{LAST_GOOD_SUFFIX}"
+
+            if isinstance(df, pd.DataFrame) and not df.empty:
+                if INCOMPLETE_ATTR in df.attrs:
+                    logging.warning(f"Data {dataset} pro {country_code}, {target_date} ({variant}) jsou neúplná ({df.attrs[INCOMPLETE_ATTR]}), neukládají se.")
+                    return df
+                with diagnostics.stage("store"):
+                    if is_day_closed(target_date):
+                        if save_partition(df, dataset, country_code, target_date, variant):
+                            partition_path(dataset, country_code, target_date, last_good_variant).unlink(missing_ok=True)
+                    else:
+                        save_partition(df, dataset, country_code, target_date, last_good_variant)
+                return df
+
+            # Prázdný výsledek pro den, který už data měl, je výpadek - vrátíme poslední dobrá data
+            with diagnostics.stage("store"):
+                last_good_df = load_last_good(dataset, country_code, target_date, variant)
+            if last_good_df is not None:
+                diagnostics.set_source("last_good")
+                logging.warning(f"API nevrátilo data {dataset} pro {country_code}, {target_date} ({variant}), používám poslední dobrá data z {last_good_df.attrs[STALE_ATTR]:%Y-%m-%d %H:%M} UTC.")
+                return last_good_df
+            return df
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            country_code, target_date, variant = key_for(args, kwargs)
+            # Souběžná volání pro stejnou partition (dataset, země, den, process type, ...) sdílí jeden dotaz
+            return in_flight_fetches.do(
+                (dataset, country_code.upper(), target_date, variant),
+                lambda: load_or_fetch(args, kwargs, country_code, target_date, variant)
+            )
+
+        def is_stored(*args, **kwargs) -> bool:
+            """Vrátí True, pokud je výsledek pro dané argumenty už uložený na disku (bez volání API)."""
+            return has_partition(dataset, *key_for(args, kwargs))
+
+        wrapper.dataset = dataset
+        wrapper.is_stored = is_stored
+        wrapper.partition_key = lambda *args, **kwargs: key_for(args, kwargs)
+        return wrapper
+    return decorator
@@ -3,30 +3,25 @@ import requests
 from datetime import datetime, timedelta
 import logging
 import os
-import zipfile
-import io
 import xml.etree.ElementTree as ET
+from entsoe.exceptions import NoMatchingDataError
 
 # Předpokládáme, že eic_codes.py je ve stejném adresáři
 import eic_codes 
+import entsoe_documents
 
 # --- Nastavení logování pro debugovací skript ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- ZÍSKÁNÍ API KLÍČE ---
 # Protože tento skript nebude spouštěn přes Streamlit, nemůžeme přímo číst st.secrets.
-# Pro účely ladění sem prosím VLOŽTE SVŮJ ENTSOE API KLÍČ.
-# NEBO se ujistěte, že máte environmentální proměnnou ENTSOE_API_TOKEN nastavenou.
-# Jakmile budeme hotovi s debugováním, tuto část odstraníme.
-
-# Možnost 1: Vložte svůj API klíč přímo (POZOR na bezpečnost, jen pro lokální debug)
-API_TOKEN = "ef3d70e0-2c39-48f7-9c60-e19a8f382f06" 
-
-# Možnost 2: Přečtěte z environmentální proměnné (bezpečnější pro lokální debug)
-# API_TOKEN = os.environ.get("ENTSOE_API_TOKEN") 
+# API klíč se čte z environmentální proměnné ENTSOE_API_TOKEN (klíč nepatří do zdrojového kódu).
+# Bez skutečného klíče lze skript pustit proti lokálnímu mock serveru (entsoe_mock_server.py):
+#   SVR_ENTSOE_API_URL=http://127.0.0.1:8765/api ENTSOE_API_TOKEN=mock python debug_at_capacity.py
+API_TOKEN = os.environ.get("ENTSOE_API_TOKEN")
 
 if not API_TOKEN:
-    logging.error("ENTSPE API Klíč není nastaven. Prosím, vložte ho do skriptu 'debug_at_capacity.py' nebo nastavte environmentální proměnnou ENTSOE_API_TOKEN.")
+    logging.error("ENTSOE API klíč není nastaven. Nastavte environmentální proměnnou ENTSOE_API_TOKEN.")
     exit()
 
 # --- Parametry pro API volání ---
@@ -36,8 +31,6 @@ DOCUMENT_TYPE = "A15" # Procured balancing reserves
 PROCESS_TYPE = "A51" # FCR, aFRR, mFRR total
 MARKET_AGREEMENT_TYPE = "A01" # Day-Ahead
 
-ENTSOE_API_URL = "https://web-api.tp.entsoe.eu/api"
-
 def fetch_raw_procured_capacity_data(
     target_date: datetime.date,
     country_code: str,
@@ -48,7 +41,7 @@ def fetch_raw_procured_capacity_data(
 ) -> str:
     """
     Stahuje syrová data z ENTSOE-E API pro rezervovanou kapacitu a vrací je jako řetězec.
-    Pokud je odpověď ZIP, extrahuje XML.
+    Pokud je odpověď ZIP (i vnořený), extrahuje XML přes entsoe_documents.
     """
     area_domain = eic_codes.get_eic(country_code)
 
@@ -76,44 +69,21 @@ def fetch_raw_procured_capacity_data(
     logging.info(f"Parametry: {params}")
 
     try:
-        response = requests.get(url=ENTSOE_API_URL, params=params, timeout=90)
-        response.raise_for_status() # Vyvolá chybu pro HTTP chyby (4xx nebo 5xx)
-
-        content_type = response.headers.get('Content-Type', '')
-        logging.info(f"Content-Type odpovědi: {content_type}")
-
-        if 'application/zip' in content_type or response.content.startswith(b'PK\x03\x04'):
-            logging.info("Odpověď je ZIP archiv. Rozbaluji...")
-            xml_content = ""
-            with io.BytesIO(response.content) as bio_zip1:
-                with zipfile.ZipFile(bio_zip1) as zip_file_level1:
-                    for file_name_l1 in zip_file_level1.namelist():
-                        logging.info(f"Nalezen soubor v ZIPu: {file_name_l1}")
-                        with zip_file_level1.open(file_name_l1) as content_l1:
-                            bytes_l1 = content_l1.read()
-                            
-                            if file_name_l1.lower().endswith('.zip'):
-                                logging.info(f"Nalezen vnořený ZIP: {file_name_l1}. Rozbaluji...")
-                                with io.BytesIO(bytes_l1) as bio_zip2:
-                                    with zipfile.ZipFile(bio_zip2) as zip_file_level2:
-                                        for file_name_l2 in zip_file_level2.namelist():
-                                            logging.info(f"Nalezen soubor ve vnořeném ZIPu: {file_name_l2}")
-                                            if file_name_l2.lower().endswith('.xml'):
-                                                with zip_file_level2.open(file_name_l2) as xml_file_l2:
-                                                    xml_content += xml_file_l2.read().decode("utf-8", errors='replace') + "\n"
-                            elif file_name_l1.lower().endswith('.xml'):
-                                xml_content += bytes_l1.decode("utf-8", errors='replace') + "\n"
-            return xml_content
-        
-        elif 'application/xml' in content_type or 'text/xml' in content_type:
-            logging.info("Odpověď je XML soubor.")
-            return response.content.decode("utf-8", errors="replace")
-        else:
-            logging.warning(f"Neočekávaný Content-Type: {content_type}. Obsah (prvních 500b): {response.content[:500]}")
-            return ""
-
+        xml_content = ""
+        with entsoe_documents.fetch_document(params, timeout=90) as document:
+            for xml_name, xml_stream in entsoe_documents.iter_xml_streams(document, "rezervovanou kapacitu"):
+                logging.info(f"Nalezen XML dokument: {xml_name}")
+                xml_content += xml_stream.read().decode("utf-8", errors="replace") + "\n"
+        return xml_content
+
+    except NoMatchingDataError as e:
+        logging.info(f"API vrátilo NoMatchingData/Error_Reason pro {target_date}: {e}")
+        return ""
     except requests.exceptions.HTTPError as e:
-        logging.error(f"HTTP Chyba: {e.response.status_code} pro {target_date}. Odpověď: {e.response.text[:500]}...")
+        if e.response is not None:
+            logging.error(f"HTTP Chyba: {e.response.status_code} pro {target_date}. Odpověď: {e.response.text[:500]}...")
+        else:
+            logging.error(f"HTTP Chyba: {e} pro {target_date}.")
         return ""
     except requests.exceptions.RequestException as e:
         logging.error(f"Chyba spojení: {e} pro {target_date}.")
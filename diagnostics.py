@@ -0,0 +1,238 @@
+# diagnostics.py
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+"""
+Tento modul obsahuje měření jednoho rerunu dashboardu: kolik času strávilo každé volání
+fetch funkce (data_loader.py) a tvorby grafu (plot_generator.create_*) v jednotlivých fázích,
+kolik bajtů se stáhlo, kolik řádků vzniklo a jestli data přišla z cache.
+
+Fáze (čas fáze je bez vnořených fází, součet tedy nepřesahuje celkový čas volání):
+    rate_limit  čekání na token limitéru (entsoe_http)
+    network     HTTP dotaz a stažení těla odpovědi
+    unzip       otevírání ZIP archivů a kopie vnořených ZIPů; dekomprese člena během čtení parserem patří do parse
+    parse       XML parsery (u denních cen celé zpracování v entsoe-py)
+    store       čtení a zápis lokálního úložiště (data_store)
+    transform   pandas úpravy po parsování a příprava dat pro graf
+    figure      stavba Plotly grafu
+Zbytek času volání (vyhledání v cache, čekání na souběžný stejný dotaz, režie) je "other".
+
+Stav cache volání fetch funkce: hit, stale (vrácena zastaralá data, obnova běží na pozadí),
+negative (prázdný výsledek z negativní cache) nebo miss; u miss navíc zdroj dat: store,
+api nebo last_good (poslední dobrá data z úložiště při výpadku API).
+
+Měření je vázané na vlákno: skript ho zapne start_rerun(), vlákna poolu ho přebírají
+přes collecting() (viz data_orchestrator._run_in_worker). Mimo rerun jsou všechny funkce no-op.
+Na konci rerunu se souhrn zapíše jako jeden JSON řádek do logu (vypnout SVR_DIAGNOSTICS_LOG=0).
+"""
+
+# Souhrn rerunu jako jeden JSON řádek v logu (pro sběr logů a offline analýzu)
+DIAGNOSTICS_LOG_ENABLED = os.environ.get("SVR_DIAGNOSTICS_LOG", "1") != "0"
+
+# Prefix řádku v logu, podle kterého se dá řádek vyfiltrovat
+LOG_PREFIX = "svr-diagnostics"
+
+STAGES = ("rate_limit", "network", "unzip", "parse", "store", "transform", "figure")
+
+
+class CallRecord:
+    """Měření jednoho volání fetch funkce ("fetch") nebo tvorby grafu ("plot")."""
+
+    def __init__(self, kind: str, name: str, key: str = ""):
+        self.kind = kind
+        self.name = name
+        self.key = key
+        self.cache = None
+        self.source = None
+        self.stages = defaultdict(float)
+        self.bytes = 0
+        self.rows = None
+        self.total_s = 0.0
+        self._stage_stack = [] # čas vnořených fází pro každou otevřenou fázi
+
+    def to_dict(self) -> dict:
+        stages = {stage: round(seconds, 4) for stage, seconds in self.stages.items() if seconds > 0}
+        other_s = self.total_s - sum(self.stages.values())
+        if other_s > 0.0005:
+            stages["other"] = round(other_s, 4)
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "key": self.key,
+            "cache": self.cache,
+            "source": self.source,
+            "total_s": round(self.total_s, 4),
+            "stages_s": stages,
+            "bytes": self.bytes,
+            "rows": self.rows,
+        }
+
+
+class RerunDiagnostics:
+    """Všechna volání jednoho rerunu skriptu (plní se i z vláken poolu)."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.started_at = time.time()
+        self.wall_s = None
+        self.calls: list[CallRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: CallRecord) -> None:
+        with self._lock:
+            self.calls.append(record)
+
+    def finish(self) -> None:
+        self.wall_s = time.time() - self.started_at
+
+    def summary(self) -> dict:
+        """Souhrn rerunu: součty fází, bajtů a řádků, počty stavů cache a seznam volání."""
+        with self._lock:
+            calls = [record.to_dict() for record in self.calls]
+        stage_totals = defaultdict(float)
+        for call in calls:
+            for stage, seconds in call["stages_s"].items():
+                stage_totals[stage] += seconds
+        return {
+            "label": self.label,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "wall_s": round(self.wall_s if self.wall_s is not None else time.time() - self.started_at, 3),
+            "stages_s": {stage: round(seconds, 4) for stage, seconds in sorted(stage_totals.items(), key=lambda item: -item[1])},
+            "bytes": sum(call["bytes"] for call in calls),
+            "rows": sum(call["rows"] or 0 for call in calls if call["kind"] == "fetch"),
+            "cache": dict(Counter(call["cache"] for call in calls if call["kind"] == "fetch")),
+            "calls": calls,
+        }
+
+    def log_line(self) -> str:
+        return f"{LOG_PREFIX} {json.dumps(self.summary(), ensure_ascii=False, default=str)}"
+
+
+_context = threading.local()
+
+
+def current_rerun() -> RerunDiagnostics | None:
+    return getattr(_context, "rerun", None)
+
+
+def _current_call() -> CallRecord | None:
+    return getattr(_context, "call", None)
+
+
+def start_rerun(label: str = "") -> RerunDiagnostics:
+    """Zahájí měření rerunu v aktuálním vlákně (předchozí rerun téhož vlákna se zahodí)."""
+    rerun = RerunDiagnostics(label)
+    _context.rerun = rerun
+    _context.call = None
+    return rerun
+
+
+def finish_rerun(rerun: RerunDiagnostics) -> None:
+    """Ukončí měření rerunu a zapíše jeho souhrn do logu."""
+    rerun.finish()
+    if current_rerun() is rerun:
+        _context.rerun = None
+    if DIAGNOSTICS_LOG_ENABLED:
+        logging.info(rerun.log_line())
+
+
+@contextlib.contextmanager
+def collecting(rerun: RerunDiagnostics | None):
+    """Volání v aktuálním vlákně (např. ve vlákně poolu) se započítají do `rerun`."""
+    previous_rerun, previous_call = current_rerun(), _current_call()
+    _context.rerun, _context.call = rerun, None
+    try:
+        yield
+    finally:
+        _context.rerun, _context.call = previous_rerun, previous_call
+
+
+@contextlib.contextmanager
+def call(kind: str, name: str, key: str = ""):
+    """Měří jedno volání; vrací CallRecord, mimo rerun None."""
+    rerun = current_rerun()
+    if rerun is None:
+        yield None
+        return
+
+    record = CallRecord(kind, name, key)
+    previous_call = _current_call()
+    _context.call = record
+    started_at = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.total_s = time.perf_counter() - started_at
+        _context.call = previous_call
+        rerun.add(record)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Přičte čas bloku k fázi `name` aktuálního volání (bez času vnořených fází)."""
+    record = _current_call()
+    if record is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    record._stage_stack.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started_at
+        nested_s = record._stage_stack.pop()
+        record.stages[name] += elapsed - nested_s
+        if record._stage_stack:
+            record._stage_stack[-1] += elapsed
+
+
+def timed_stage(name: str):
+    """Dekorátor: celé volání funkce se počítá do fáze `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def plot_call(func):
+    """Dekorátor pro plot_generator.create_*: volání se měří jako "plot" ve fázi figure."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with call("plot", func.__name__), stage("figure"):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def set_cache_status(status: str) -> None:
+    record = _current_call()
+    if record is not None:
+        record.cache = status
+
+
+def set_source(source: str) -> None:
+    record = _current_call()
+    if record is not None:
+        record.source = source
+
+
+def add_bytes(count: int) -> None:
+    record = _current_call()
+    if record is not None:
+        record.bytes += count
+
+
+def set_rows(count: int) -> None:
+    record = _current_call()
+    if record is not None:
+        record.rows = count
@@ -1,5 +1,7 @@
 # eic_codes.py
 
+import logging
+
 # slovník: kód země -> EIC kód
 eic_by_country = {
     "CZ": "10YCZ-CEPS-----N",
@@ -14,18 +16,77 @@ eic_by_country = {
     "FR": "10YFR-RTE------C",
 }
 
+# slovník: kód země -> časová zóna, ve které se počítá obchodní (lokální) den
+timezone_by_country = {
+    "CZ": "Europe/Prague",
+    "DE_50": "Europe/Berlin",
+    "DE_TR": "Europe/Berlin",
+    "DE_tennet": "Europe/Berlin",
+    "DE_amprion": "Europe/Berlin",
+    "AT": "Europe/Vienna",
+    "PL": "Europe/Warsaw",
+    "SK": "Europe/Bratislava",
+    "BE": "Europe/Brussels",
+    "FR": "Europe/Paris",
+    "DE": "Europe/Berlin",
+}
+
+# slovník: složená oblast -> regulační oblasti (kódy z eic_by_country), ze kterých se skládá.
+# Data složené oblasti se stahují souběžně po regulačních oblastech a slučují (data_orchestrator.py).
+composite_areas = {
+    "DE": ["DE_TR", "DE_tennet", "DE_amprion", "DE_50"],
+}
+
+# slovník: kód země -> nabídková zóna (kód entsoe-py) pro denní ceny, pokud se liší od kódu země
+bidding_zone_by_country = {
+    "DE": "DE_LU",
+    "DE_50": "DE_LU",
+    "DE_TR": "DE_LU",
+    "DE_tennet": "DE_LU",
+    "DE_amprion": "DE_LU",
+}
+
 def list_keys():
     """Vrátí seznam dostupných kódů zemí."""
     return list(eic_by_country.keys())
 
+def list_composite_keys():
+    """Vrátí seznam kódů složených oblastí (např. DE)."""
+    return list(composite_areas.keys())
+
+def get_member_areas(country: str) -> list[str]:
+    """Vrátí regulační oblasti složené oblasti (case-insensitive); pro běžnou zemi prázdný seznam."""
+    country_upper = country.strip().upper()
+    for key, member_areas in composite_areas.items():
+        if key.upper() == country_upper:
+            return list(member_areas)
+    return []
+
+def get_bidding_zone(country: str) -> str:
+    """Vrátí nabídkovou zónu pro denní ceny (case-insensitive); jinak kód země beze změny."""
+    country_upper = country.strip().upper()
+    for key, bidding_zone in bidding_zone_by_country.items():
+        if key.upper() == country_upper:
+            return bidding_zone
+    return country
+
 def get_eic(country: str) -> str:
     """Vrátí EIC kód pro zadanou zemi (case-insensitive)."""
     # Upraveno pro bezpečnější přístup, pokud klíč neexistuje
     country_upper = country.strip().upper()
-    if country_upper in eic_by_country:
-        return eic_by_country[country_upper]
-    else:
-        # Vrátíme prázdný řetězec, což by mělo být ošetřeno v data_loaderu.
-        # Streamlit logování bude také zaznamenávat upozornění, pokud se EIC nenajde.
-        logging.warning(f"EIC kód pro zemi '{country}' nebyl nalezen.")
-        return ""
\ No newline at end of file
+    for key, eic in eic_by_country.items():
+        if key.upper() == country_upper:
+            return eic
+    # Vrátíme prázdný řetězec, což by mělo být ošetřeno v data_loaderu.
+    # Streamlit logování bude také zaznamenávat upozornění, pokud se EIC nenajde.
+    logging.warning(f"EIC kód pro zemi '{country}' nebyl nalezen.")
+    return ""
+
+def get_timezone(country: str) -> str:
+    """Vrátí název časové zóny pro zadanou zemi (case-insensitive), pro neznámou zemi 'UTC'."""
+    country_upper = country.strip().upper()
+    for key, tz_name in timezone_by_country.items():
+        if key.upper() == country_upper:
+            return tz_name
+    logging.warning(f"Časová zóna pro zemi '{country}' nebyla nalezena, používám UTC.")
+    return "UTC"
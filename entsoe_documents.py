@@ -0,0 +1,126 @@
+# entsoe_documents.py
+
+import contextlib
+import logging
+import re
+import shutil
+import tempfile
+import zipfile
+
+import requests
+from entsoe.exceptions import NoMatchingDataError
+
+import diagnostics
+import entsoe_http
+
+"""
+Tento modul obsahuje jednotné stahování a rozbalování dokumentů z ENTSOE-E API.
+Odpověď se stahuje po blocích do SpooledTemporaryFile (v paměti do SPOOL_MAX_MEMORY,
+pak na disku) a z ní se streamově čtou XML dokumenty: přímo, ze ZIPu i z vnořeného ZIPu.
+Žádný mezikrok (bytes odpovědi, bytes vnořeného ZIPu, dekódovaný str) se nedrží v paměti celý.
+"""
+
+# Velikost bloku při stahování a kopírování (B)
+CHUNK_SIZE = 256 * 1024
+
+# Do této velikosti (B) drží spool data v paměti, větší odpovědi jdou do dočasného souboru
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+_ZIP_MAGIC = b'PK\x03\x04'
+_ACKNOWLEDGEMENT_MARKERS = (b"Acknowledgement_MarketDocument", b"NoMatchingData", b"Error_Reason")
+_REASON_TEXT_RE = re.compile(rb"<(?:\w+:)?text>(.*?)</(?:\w+:)?text>", re.DOTALL)
+
+
+@contextlib.contextmanager
+def fetch_document(params: dict, timeout: float = 60):
+    """
+    Stáhne odpověď ENTSOE-E API do spoolu a vrátí ho jako binární soubor (context manager).
+    HTTP chyby vyhazuje jako requests.exceptions.HTTPError (tělo chyby je načtené pro logování),
+    chyby při čtení těla odpovědi (přerušené spojení, timeout) se počítají do circuit breakeru.
+    """
+    response = entsoe_http.get(params, timeout=timeout, stream=True)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        if not response.ok:
+            response.content # Načtení (krátkého) těla chyby, aby bylo dostupné i po zavření spojení
+        response.raise_for_status()
+        with diagnostics.stage("network"):
+            try:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    spool.write(chunk)
+            except requests.exceptions.RequestException:
+                # Session zaznamenala úspěch už při přijetí hlaviček; přerušené čtení těla je také výpadek
+                entsoe_http.get_circuit_breaker(params.get("documentType", "unknown")).record_failure()
+                raise
+        diagnostics.add_bytes(spool.tell())
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        response.close()
+
+    with spool:
+        yield spool
+
+
+def _raise_if_acknowledgement(head: bytes) -> None:
+    """Acknowledgement dokument (NoMatchingData, Error_Reason) převede na NoMatchingDataError."""
+    if any(marker in head for marker in _ACKNOWLEDGEMENT_MARKERS):
+        reason_match = _REASON_TEXT_RE.search(head)
+        reason = reason_match.group(1).decode("utf-8", errors="replace").strip() if reason_match else head[:250].decode("utf-8", errors="replace")
+        raise NoMatchingDataError(reason.replace("\n", " ").replace("\r", ""))
+
+
+def _iter_zip_xml_streams(zip_source, label: str, skipped: list[str] | None, depth: int = 0):
+    with zipfile.ZipFile(zip_source) as archive:
+        for member_name in archive.namelist():
+            lower_name = member_name.lower()
+            if lower_name.endswith('.zip'):
+                # Vnořený ZIP potřebuje seekovatelný soubor - člen se překopíruje do spoolu po blocích
+                try:
+                    with archive.open(member_name) as member, tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as inner_spool:
+                        shutil.copyfileobj(member, inner_spool, CHUNK_SIZE)
+                        inner_spool.seek(0)
+                        yield from _iter_zip_xml_streams(inner_spool, label, skipped, depth + 1)
+                except zipfile.BadZipFile:
+                    logging.warning(f"Soubor {member_name} vypadal jako ZIP, ale není platný ({label}).")
+                    if skipped is not None:
+                        skipped.append(f"{member_name}: neplatný ZIP")
+            elif lower_name.endswith('.xml'):
+                with archive.open(member_name) as xml_stream:
+                    yield member_name, xml_stream
+
+
+def iter_xml_streams(document, label: str = "ENTSOE-E dokument", skipped: list[str] | None = None):
+    """
+    Generátor XML dokumentů v odpovědi: vrací (název, binární stream) pro čisté XML,
+    pro XML členy ZIPu i pro XML ve vnořených ZIPech. Stream je platný jen do dalšího
+    kroku generátoru, parser ho musí zpracovat hned.
+    Acknowledgement dokument vyhodí NoMatchingDataError, neplatný hlavní ZIP zipfile.BadZipFile.
+    Neplatný vnořený ZIP se přeskočí a jeho popis se přidá do `skipped` (výsledek pak není úplný).
+    Čas strávený v generátoru (otevírání archivů, kopie vnořených ZIPů) se měří jako fáze unzip.
+    """
+    xml_streams = _iter_document_xml_streams(document, label, skipped)
+    try:
+        while True:
+            with diagnostics.stage("unzip"):
+                item = next(xml_streams, None)
+            if item is None:
+                return
+            yield item
+    finally:
+        xml_streams.close() # Zavře otevřené archivy i při předčasném ukončení čtení
+
+
+def _iter_document_xml_streams(document, label: str, skipped: list[str] | None):
+    head = document.read(8192)
+    document.seek(0)
+
+    if head.startswith(_ZIP_MAGIC):
+        yield from _iter_zip_xml_streams(document, label, skipped)
+    elif head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+        _raise_if_acknowledgement(head)
+        yield "response.xml", document
+    else:
+        logging.warning(f"Neočekávaný obsah odpovědi pro {label}. Obsah (prvních 200b): {head[:200]}")
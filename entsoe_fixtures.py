@@ -0,0 +1,236 @@
+# entsoe_fixtures.py
+
+import io
+import random
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+"""
+Tento modul obsahuje generátor syntetických dokumentů ENTSOE-E API (XML podle schémat ENTSO-E).
+Používá ho lokální mock server (entsoe_mock_server.py) a benchmarky parserů.
+Velikost dokumentu se nastavuje počtem časových řad × period × bodů (body vyplývají z délky
+periody a rozlišení 15/60 min); stejné parametry a seed vždy dají stejný dokument.
+
+Podporované dokumenty:
+    A44  denní ceny (Publication_MarketDocument)
+    A84  ceny aktivace regulační energie (Balancing_MarketDocument)
+    A15  rezervovaná kapacita (Balancing_MarketDocument)
+    A24  agregované nabídky (Balancing_MarketDocument)
+    A37  nabídky regulační energie (ReserveBid_MarketDocument)
+    Acknowledgement_MarketDocument pro "No matching data found"
+"""
+
+PUBLICATION_NS = "urn:iec62325.351:tc57wg16:451-3:publicationdocument:7:3"
+BALANCING_NS = "urn:iec62325.351:tc57wg16:451-6:balancingdocument:4:1"
+RESERVE_BID_NS = "urn:iec62325.351:tc57wg16:451-7:reservebiddocument:7:1"
+ACKNOWLEDGEMENT_NS = "urn:iec62325.351:tc57wg16:451-1:acknowledgementdocument:7:0"
+
+NO_MATCHING_DATA_TEXT = "No matching data found for Data item ENTSOE mock server."
+
+# Formát časů v dokumentech ENTSO-E (UTC)
+_TIME_FORMAT = "%Y-%m-%dT%H:%MZ"
+
+# Směry: A01 = nahoru (aFRR+), A02 = dolů (aFRR-)
+_FLOW_DIRECTIONS = ("A01", "A02")
+
+
+def parse_period(period_str: str) -> datetime:
+    """Převede periodStart/periodEnd dotazu (YYYYMMDDHHMM, UTC) na naivní UTC datetime."""
+    return datetime.strptime(period_str, "%Y%m%d%H%M")
+
+
+def _split_periods(period_start: datetime, period_end: datetime, n_periods: int, resolution_minutes: int,
+                   split_at_utc_midnight: bool = False) -> list[tuple[datetime, int]]:
+    """
+    Rozdělí interval na n_periods navazujících period; vrací (začátek, počet bodů).
+    Se `split_at_utc_midnight` se nejdřív rozdělí po dnech UTC (jak API vrací okno lokálního dne
+    přes půlnoc UTC) a každý díl pak na n_periods period.
+    """
+    if split_at_utc_midnight:
+        periods = []
+        start = period_start
+        while start < period_end:
+            end = min(period_end, start.replace(hour=0, minute=0) + timedelta(days=1))
+            periods.extend(_split_periods(start, end, n_periods, resolution_minutes))
+            start = end
+        return periods
+    total_points = max(int((period_end - period_start) / timedelta(minutes=resolution_minutes)), 0)
+    n_periods = max(min(n_periods, total_points), 1)
+    periods = []
+    start = period_start
+    for index in range(n_periods):
+        points = total_points // n_periods + (1 if index < total_points % n_periods else 0)
+        periods.append((start, points))
+        start += timedelta(minutes=resolution_minutes * points)
+    return periods
+
+
+def _period_xml(start: datetime, points: int, resolution_minutes: int, point_values) -> str:
+    """XML jedné Period; point_values(pozice) vrací vnitřek elementu Point (bez position)."""
+    end = start + timedelta(minutes=resolution_minutes * points)
+    parts = [
+        f"<Period><timeInterval><start>{start.strftime(_TIME_FORMAT)}</start><end>{end.strftime(_TIME_FORMAT)}</end></timeInterval>"
+        f"<resolution>PT{resolution_minutes}M</resolution>"
+    ]
+    for position in range(1, points + 1):
+        parts.append(f"<Point><position>{position}</position>{point_values(position)}</Point>")
+    parts.append("</Period>")
+    return "".join(parts)
+
+
+def _document_header(root_tag: str, namespace: str, document_type: str, period_start: datetime, period_end: datetime) -> str:
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><{root_tag} xmlns="{namespace}">'
+        f"<mRID>mock-{document_type}-{period_start.strftime('%Y%m%d%H%M')}</mRID><revisionNumber>1</revisionNumber>"
+        f"<type>{document_type}</type><createdDateTime>{period_start.strftime('%Y-%m-%dT%H:%M:%SZ')}</createdDateTime>"
+        f"<period.timeInterval><start>{period_start.strftime(_TIME_FORMAT)}</start><end>{period_end.strftime(_TIME_FORMAT)}</end></period.timeInterval>"
+    )
+
+
+def day_ahead_document(
+    period_start: datetime,
+    period_end: datetime,
+    domain: str,
+    resolution_minutes: int = 60,
+    n_periods: int = 1,
+    seed: int = 0
+) -> bytes:
+    """Denní ceny (A44): jedna časová řada, cena s denním profilem."""
+    rng = random.Random(seed)
+    parts = [_document_header("Publication_MarketDocument", PUBLICATION_NS, "A44", period_start, period_end)]
+    parts.append(
+        f"<TimeSeries><mRID>1</mRID><businessType>A62</businessType>"
+        f"<in_Domain.mRID codingScheme=\"A01\">{domain}</in_Domain.mRID><out_Domain.mRID codingScheme=\"A01\">{domain}</out_Domain.mRID>"
+        f"<currency_Unit.name>EUR</currency_Unit.name><price_Measure_Unit.name>MWH</price_Measure_Unit.name><curveType>A01</curveType>"
+    )
+    for start, points in _split_periods(period_start, period_end, n_periods, resolution_minutes):
+        def price(position, start=start):
+            hour = (start + timedelta(minutes=resolution_minutes * (position - 1))).hour
+            return f"<price.amount>{60 + 40 * (8 <= hour < 20) + rng.uniform(-25, 25):.2f}</price.amount>"
+        parts.append(_period_xml(start, points, resolution_minutes, price))
+    parts.append("</TimeSeries></Publication_MarketDocument>")
+    return "".join(parts).encode("utf-8")
+
+
+def balancing_document(
+    document_type: str,
+    period_start: datetime,
+    period_end: datetime,
+    domain: str,
+    n_series: int = 2,
+    n_periods: int = 1,
+    resolution_minutes: int = 15,
+    seed: int = 0,
+    split_at_utc_midnight: bool = False
+) -> bytes:
+    """
+    Balancing_MarketDocument pro A84 (ceny aktivace), A15 (rezervovaná kapacita) a A24 (agregované nabídky).
+    Časové řady se střídají ve směru A01/A02; obsah bodů odpovídá typu dokumentu.
+    Se `split_at_utc_midnight` mají řady samostatné periody pro každý den UTC.
+    """
+    rng = random.Random(seed)
+    point_values = {
+        "A84": lambda direction: f"<activation_Price.amount>{rng.uniform(40, 400) if direction == 'A01' else rng.uniform(-150, 90):.2f}</activation_Price.amount>",
+        "A15": lambda direction: f"<quantity>{rng.uniform(5, 120):.1f}</quantity><procurement_Price.amount>{rng.uniform(2, 40):.2f}</procurement_Price.amount>",
+        "A24": lambda direction: (
+            f"<quantity>{rng.uniform(300, 900):.1f}</quantity><secondaryQuantity>{rng.uniform(0, 300):.1f}</secondaryQuantity>"
+            f"<unavailable_Quantity.quantity>{rng.uniform(0, 50):.1f}</unavailable_Quantity.quantity>"
+        ),
+    }[document_type]
+    business_type = {"A84": "A96", "A15": "B95", "A24": "B74"}[document_type]
+
+    parts = [_document_header("Balancing_MarketDocument", BALANCING_NS, document_type, period_start, period_end)]
+    for series_index in range(n_series):
+        direction = _FLOW_DIRECTIONS[series_index % 2]
+        parts.append(
+            f"<TimeSeries><mRID>{series_index + 1}</mRID><businessType>{business_type}</businessType>"
+            f"<acquiring_Domain.mRID codingScheme=\"A01\">{domain}</acquiring_Domain.mRID>"
+            f"<connecting_Domain.mRID codingScheme=\"A01\">{domain}</connecting_Domain.mRID>"
+            f"<flowDirection.direction>{direction}</flowDirection.direction><curveType>A01</curveType>"
+        )
+        for start, points in _split_periods(period_start, period_end, n_periods, resolution_minutes, split_at_utc_midnight):
+            parts.append(_period_xml(start, points, resolution_minutes, lambda position, direction=direction: point_values(direction)))
+        parts.append("</TimeSeries>")
+    parts.append("</Balancing_MarketDocument>")
+    return "".join(parts).encode("utf-8")
+
+
+def reserve_bid_document(
+    period_start: datetime,
+    period_end: datetime,
+    domain: str,
+    n_series: int = 50,
+    n_periods: int = 1,
+    resolution_minutes: int = 15,
+    seed: int = 0,
+    first_bid_number: int = 1
+) -> bytes:
+    """Nabídky regulační energie (A37): n_series nabídek (Bid_TimeSeries) se střídajícím se směrem."""
+    rng = random.Random(seed)
+    parts = [_document_header("ReserveBid_MarketDocument", RESERVE_BID_NS, "A37", period_start, period_end)]
+    for series_index in range(n_series):
+        direction = _FLOW_DIRECTIONS[series_index % 2]
+        base_price = rng.uniform(20, 600) if direction == "A01" else rng.uniform(-300, 80)
+        parts.append(
+            f"<Bid_TimeSeries><mRID>BID-{first_bid_number + series_index:06d}</mRID><auction.mRID>AFRR</auction.mRID><businessType>B74</businessType>"
+            f"<connecting_Domain.mRID codingScheme=\"A01\">{domain}</connecting_Domain.mRID>"
+            f"<quantity_Measure_Unit.name>MAW</quantity_Measure_Unit.name><currency_Unit.name>EUR</currency_Unit.name>"
+            f"<divisible>A01</divisible><flowDirection.direction>{direction}</flowDirection.direction>"
+        )
+        for start, points in _split_periods(period_start, period_end, n_periods, resolution_minutes):
+            parts.append(_period_xml(
+                start, points, resolution_minutes,
+                lambda position, base_price=base_price: f"<quantity.quantity>{rng.choice((1, 2, 5, 10, 15, 25))}</quantity.quantity><energy_Price.amount>{base_price + rng.uniform(-5, 5):.2f}</energy_Price.amount>"
+            ))
+        parts.append("</Bid_TimeSeries>")
+    parts.append("</ReserveBid_MarketDocument>")
+    return "".join(parts).encode("utf-8")
+
+
+def acknowledgement_document(reason_text: str = NO_MATCHING_DATA_TEXT, reason_code: str = "999") -> bytes:
+    """Acknowledgement_MarketDocument, kterým API odpovídá, když pro dotaz nemá data."""
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><Acknowledgement_MarketDocument xmlns="{ACKNOWLEDGEMENT_NS}">'
+        f"<mRID>mock-ack</mRID><createdDateTime>{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}</createdDateTime>"
+        f"<Reason><code>{reason_code}</code><text>{reason_text}</text></Reason></Acknowledgement_MarketDocument>"
+    ).encode("utf-8")
+
+
+def zip_documents(documents: dict[str, bytes], nested: bool = False) -> bytes:
+    """
+    Zabalí XML dokumenty {název: obsah} do ZIPu. S `nested=True` je každý dokument
+    ještě ve vlastním vnitřním ZIPu (jak API vrací některé A37 odpovědi).
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in documents.items():
+            if nested:
+                archive.writestr(name.rsplit(".", 1)[0] + ".zip", zip_documents({name: content}))
+            else:
+                archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def split_reserve_bid_document(
+    period_start: datetime,
+    period_end: datetime,
+    domain: str,
+    n_series: int,
+    parts: int,
+    n_periods: int = 1,
+    resolution_minutes: int = 15,
+    seed: int = 0
+) -> dict[str, bytes]:
+    """Rozdělí nabídky A37 do `parts` samostatných dokumentů (obsah jedné ZIP odpovědi)."""
+    parts = max(min(parts, n_series), 1)
+    documents = {}
+    first_bid_number = 1
+    for index in range(parts):
+        part_series = n_series // parts + (1 if index < n_series % parts else 0)
+        documents[f"A37_{period_start.strftime('%Y%m%d')}_{index + 1:03d}.xml"] = reserve_bid_document(
+            period_start, period_end, domain,
+            n_series=part_series, n_periods=n_periods, resolution_minutes=resolution_minutes,
+            seed=seed + index, first_bid_number=first_bid_number
+        )
+        first_bid_number += part_series
+    return documents
@@ -0,0 +1,324 @@
+# entsoe_http.py
+
+import contextlib
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import diagnostics
+import metrics
+
+"""
+Tento modul obsahuje sdílenou HTTP vrstvu pro všechna volání ENTSOE-E API.
+Jedna requests.Session pro celý proces drží keep-alive spojení (connection pool),
+takže se TLS handshake s web-api.tp.entsoe.eu neopakuje pro každý dotaz.
+Přechodné chyby (429, 5xx) jsou automaticky opakovány s exponenciálním backoffem.
+Všechny dotazy session (i z entsoe-py klienta) procházejí společným token-bucket limitérem
+s prioritami: interaktivní načítání stránky má přednost před backfillem a úlohami na pozadí.
+Při výpadku API circuit breaker (zvlášť pro každý typ dokumentu) dotazy po několika chybách
+okamžitě odmítá, místo aby každý čekal celý timeout, a občas pustí zkušební dotaz.
+"""
+
+ENTSOE_DEFAULT_API_URL = "https://web-api.tp.entsoe.eu/api"
+
+# Adresa API; SVR_ENTSOE_API_URL ji přesměruje např. na lokální mock server (entsoe_mock_server.py)
+ENTSOE_API_URL = os.environ.get("SVR_ENTSOE_API_URL", ENTSOE_DEFAULT_API_URL)
+
+# Timeout pro navázání spojení (s). Timeout pro čtení předává volající.
+CONNECT_TIMEOUT = 10
+
+# Velikost poolu spojení - odpovídá maximálnímu počtu souběžných dotazů z jednoho procesu
+POOL_MAXSIZE = 16
+
+
+class _RateLimitedRetry(Retry):
+    """
+    Retry, který si před každým opakováním (po backoffu) vezme token z limitéru.
+    Opakování probíhají uvnitř urllib3, mimo _RateLimitedSession.request, a kvóta ENTSO-E je počítá také.
+    """
+
+    def sleep(self, response=None) -> None:
+        super().sleep(response)
+        rate_limiter.acquire(current_priority()) # urllib3 opakuje ve vlákně volajícího, priorita tedy platí
+
+
+# Opakování: 3 pokusy s backoffem 1 s, 2 s, 4 s; respektuje hlavičku Retry-After u 429/503
+RETRY_POLICY = _RateLimitedRetry(
+    total=3,
+    connect=3,
+    read=2,
+    status=3,
+    backoff_factor=1.0,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    respect_retry_after_header=True,
+    raise_on_status=False, # Poslední odpověď se vrátí a chybu vyhodí raise_for_status() u volajícího
+)
+
+# Kvóta ENTSO-E je 400 dotazů/min na token; necháváme rezervu pro ostatní klienty stejného tokenu.
+# Limit platí pro jeden proces - souběžně běžící backfill má vlastní, nižší limit (backfill.py --rate-per-min).
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("SVR_ENTSOE_RATE_PER_MIN", 300))
+RATE_LIMIT_BURST = 10
+
+# Prioritní pruhy limitéru (nižší číslo = vyšší priorita)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket sdílený celým procesem. Čekající dotazy tvoří frontu podle
+    (priorita, pořadí příchodu), takže volný token dostane vždy nejdřív interaktivní dotaz.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate_per_s = rate_per_minute / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._condition = threading.Condition()
+        self._waiters = [] # halda (priorita, pořadí)
+        self._sequence = itertools.count()
+        self._stats = {
+            priority: {"queue_depth": 0, "acquired": 0, "wait_s_total": 0.0, "wait_s_max": 0.0, "wait_s_last": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        """Změní rychlost doplňování tokenů (např. nižší limit pro backfill)."""
+        with self._condition:
+            self._refill()
+            self.rate_per_s = rate_per_minute / 60.0
+            self._condition.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_s)
+        self._refilled_at = now
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Počká na volný token (blokuje) a vrátí dobu čekání v s."""
+        started_at = time.monotonic()
+        ticket = (priority, next(self._sequence))
+        lane_stats = self._stats[priority]
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            lane_stats["queue_depth"] += 1
+            while True:
+                self._refill()
+                if self._waiters[0] == ticket and self._tokens >= 1:
+                    break
+                # Čekáme na další token, případně na uvolnění čela fronty
+                self._condition.wait(max((1 - self._tokens) / self.rate_per_s, 0.01))
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            waited = time.monotonic() - started_at
+            lane_stats["queue_depth"] -= 1
+            lane_stats["acquired"] += 1
+            lane_stats["wait_s_total"] += waited
+            lane_stats["wait_s_max"] = max(lane_stats["wait_s_max"], waited)
+            lane_stats["wait_s_last"] = waited
+            self._condition.notify_all()
+
+        if waited > 1.0:
+            logging.info(f"Dotaz na ENTSOE-E API čekal na rate limiter {waited:.1f} s ({PRIORITY_NAMES[priority]}).")
+        return waited
+
+    def stats(self) -> dict[str, dict]:
+        """Vrátí aktuální hloubku fronty a statistiky čekání pro každý prioritní pruh."""
+        with self._condition:
+            return {PRIORITY_NAMES[priority]: dict(lane_stats) for priority, lane_stats in self._stats.items()}
+
+
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+
+_request_context = threading.local()
+
+
+@contextlib.contextmanager
+def request_priority(priority: int):
+    """Nastaví prioritu dotazů z aktuálního vlákna (např. PRIORITY_BACKGROUND pro backfill)."""
+    previous = current_priority()
+    _request_context.priority = priority
+    try:
+        yield
+    finally:
+        _request_context.priority = previous
+
+
+def current_priority() -> int:
+    return getattr(_request_context, "priority", PRIORITY_INTERACTIVE)
+
+
+def get_rate_limiter_stats() -> dict[str, dict]:
+    """Hloubka fronty a doby čekání limitéru podle priority (pro monitoring)."""
+    return rate_limiter.stats()
+
+
+# Circuit breaker: po CIRCUIT_FAILURE_THRESHOLD chybách za sebou se dotazy na daný typ dokumentu
+# odmítají bez volání API; po CIRCUIT_OPEN_S projde jeden zkušební dotaz. Když selže,
+# doba otevření se zdvojnásobí (nejvýše CIRCUIT_OPEN_MAX_S).
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_S = 30
+CIRCUIT_OPEN_MAX_S = 300
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Dotaz odmítnut bez volání API - circuit breaker pro daný typ dokumentu je otevřený.
+    Záměrně není ConnectionError: retry dekorátor entsoe-py by odmítnutý dotaz opakoval.
+    """
+
+
+class CircuitBreaker:
+    """Stav circuit breakeru jednoho typu dokumentu: closed -> open -> half_open -> closed/open."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.open_s = CIRCUIT_OPEN_S
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """Vyhodí CircuitOpenError, pokud dotaz nemá jít na API."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.open_s:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                logging.info(f"Circuit breaker {self.name}: zkušební dotaz na ENTSOE-E API.")
+                return
+            raise CircuitOpenError(f"ENTSOE-E API pro {self.name} je nedostupné, dotaz odmítnut (circuit breaker otevřen)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logging.info(f"Circuit breaker {self.name}: API opět odpovídá, zavírám.")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.open_s = CIRCUIT_OPEN_S
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open":
+                self.open_s = min(self.open_s * 2, CIRCUIT_OPEN_MAX_S)
+            elif self.state != "closed" or self.consecutive_failures < CIRCUIT_FAILURE_THRESHOLD:
+                return
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+            logging.warning(f"Circuit breaker {self.name}: {self.consecutive_failures} chyb za sebou, dotazy odmítám {self.open_s} s.")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive_failures, "open_s": self.open_s}
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(document_type: str) -> CircuitBreaker:
+    with _circuit_breakers_lock:
+        if document_type not in _circuit_breakers:
+            _circuit_breakers[document_type] = CircuitBreaker(document_type)
+        return _circuit_breakers[document_type]
+
+
+def get_circuit_breaker_states() -> dict[str, dict]:
+    """Stav circuit breakerů podle typu dokumentu (pro monitoring a UI)."""
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+class _RateLimitedSession(requests.Session):
+    """
+    Session, jejíž každý dotaz projde circuit breakerem svého typu dokumentu
+    a pak si vezme token ze sdíleného limitéru.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        if url == ENTSOE_DEFAULT_API_URL:
+            url = ENTSOE_API_URL # entsoe-py má adresu API pevně danou, přesměrování platí i pro něj
+        params = kwargs.get("params") or {}
+        breaker = get_circuit_breaker(params.get("documentType", "unknown") if isinstance(params, dict) else "unknown")
+        breaker.before_request()
+        with diagnostics.stage("rate_limit"):
+            rate_limiter.acquire(current_priority())
+        try:
+            with diagnostics.stage("network"):
+                response = super().request(method, url, *args, **kwargs)
+        except BaseException:
+            breaker.record_failure()
+            raise
+        if not kwargs.get("stream"):
+            diagnostics.add_bytes(len(response.content)) # Streamované odpovědi počítá entsoe_documents.fetch_document
+        # 5xx a 429 (po vyčerpání retry) znamenají výpadek; 4xx je chyba dotazu, ne API
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    session = _RateLimitedSession()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=RETRY_POLICY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Vrátí sdílenou (thread-safe) session pro celý proces."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+                logging.info("Vytvořena sdílená HTTP session pro ENTSOE-E API.")
+    return _session
+
+
+def get(params: dict, timeout: float = 60, stream: bool = False) -> requests.Response:
+    """
+    Provede GET dotaz na ENTSOE-E API přes sdílenou session.
+    `timeout` je timeout pro čtení odpovědi (s); na chyby reaguje volající přes raise_for_status().
+    Se `stream=True` se tělo odpovědi nestahuje najednou (viz entsoe_documents.fetch_document).
+    """
+    return get_session().get(ENTSOE_API_URL, params=params, timeout=(CONNECT_TIMEOUT, timeout), stream=stream)
+
+
+metrics.REGISTRY.register(metrics.CallbackGauge(
+    "svr_rate_limiter_queue_depth",
+    "Počet dotazů čekajících na token limitéru podle prioritního pruhu.",
+    ("priority",),
+    lambda: {lane: lane_stats["queue_depth"] for lane, lane_stats in get_rate_limiter_stats().items()},
+))
+metrics.REGISTRY.register(metrics.CallbackGauge(
+    "svr_circuit_breaker_open",
+    "1, pokud circuit breaker typu dokumentu dotazy odmítá (open, half_open), jinak 0.",
+    ("document_type",),
+    lambda: {document_type: int(state["state"] != "closed") for document_type, state in get_circuit_breaker_states().items()},
+))
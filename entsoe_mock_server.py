@@ -0,0 +1,345 @@
+# entsoe_mock_server.py
+
+import argparse
+import hashlib
+import logging
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+import eic_codes
+import entsoe_fixtures
+
+"""
+Tento modul obsahuje lokální náhradu ENTSOE-E API pro offline vývoj, zátěžové testy a benchmarky.
+Server odpovídá na dotazy A44, A84, A15, A24 a A37 syntetickými dokumenty (entsoe_fixtures.py),
+případně přehrává nahrané odpovědi z adresáře s fixtures. Umí vracet NoMatchingData
+(Acknowledgement dokument), ZIP i vnořený ZIP a uměle přidávat latenci a chyby.
+
+Použití (z kořene repozitáře; token v .streamlit/secrets.toml může být libovolný):
+
+    python entsoe_mock_server.py --port 8765 --latency-ms 150 --jitter-ms 100 --error-rate 0.05
+    SVR_ENTSOE_API_URL=http://127.0.0.1:8765/api streamlit run app_SVR_dash.py
+
+Nahrání skutečných odpovědí (chybějící fixtures se stáhnou z API a uloží):
+
+    python entsoe_mock_server.py --fixtures-dir fixtures/entsoe --record-from https://web-api.tp.entsoe.eu/api
+
+V kódu (benchmarky): `with MockEntsoeServer(latency_ms=50) as server:` a entsoe_http.ENTSOE_API_URL = server.base_url.
+"""
+
+DEFAULT_PORT = 8765
+
+# Parametr dotazu s EIC kódem oblasti podle typu dokumentu
+DOMAIN_PARAMS = {
+    "A44": "in_Domain",
+    "A84": "controlArea_Domain",
+    "A15": "area_Domain",
+    "A24": "area_Domain",
+    "A37": "connecting_Domain",
+}
+
+# EIC kódy nabídkových zón pro A44, které nejsou v eic_codes.eic_by_country (entsoe-py posílá kód zóny)
+_EXTRA_BIDDING_ZONE_EICS = {"10Y1001A1001A82H"} # DE_LU
+
+# Ceny aktivace a agregované nabídky se publikují průběžně - body po (now - zpoždění) API ještě nemá
+INTRADAY_DOCUMENT_TYPES = ("A84", "A24")
+PUBLICATION_DELAY = timedelta(minutes=5)
+
+# Od tohoto dne jsou denní ceny SDAC v 15min rozlišení
+DAY_AHEAD_15MIN_FROM = datetime(2025, 10, 1)
+
+
+class MockEntsoeServer:
+    """
+    HTTP server napodobující ENTSOE-E API (GET /api). Běží ve vlákně na pozadí;
+    lze použít jako context manager. Počty odpovědí podle (typ dokumentu, výsledek) jsou v `stats`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        error_document_types: tuple[str, ...] = (),
+        no_data_document_types: tuple[str, ...] = (),
+        zip_document_types: tuple[str, ...] = ("A37",),
+        nested_zip: bool = True,
+        zip_parts: int = 2,
+        bid_series: int = 200,
+        balancing_series: int = 2,
+        fixtures_dir: str | Path | None = None,
+        record_from: str | None = None,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_document_types = set(error_document_types)
+        self.no_data_document_types = set(no_data_document_types)
+        self.zip_document_types = set(zip_document_types)
+        self.nested_zip = nested_zip
+        self.zip_parts = zip_parts
+        self.bid_series = bid_series
+        self.balancing_series = balancing_series
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.record_from = record_from
+        self.seed = seed
+        self.known_domains = set(eic_codes.eic_by_country.values()) | _EXTRA_BIDDING_ZONE_EICS
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        handler = type("_BoundMockEntsoeHandler", (_MockEntsoeHandler,), {"mock": self})
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> "MockEntsoeServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="entsoe-mock", daemon=True)
+        self._thread.start()
+        logging.info(f"ENTSOE-E mock server běží na {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self) -> None:
+        logging.info(f"ENTSOE-E mock server běží na {self.base_url}")
+        self._httpd.serve_forever()
+
+    def __enter__(self) -> "MockEntsoeServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _count(self, document_type: str, outcome: str) -> None:
+        with self._stats_lock:
+            self.stats[(document_type, outcome)] += 1
+
+    def _roll(self, probability: float) -> bool:
+        with self._random_lock:
+            return self._random.random() < probability
+
+    def _injected_latency_s(self) -> float:
+        with self._random_lock:
+            return (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+
+    # --- Odpovědi ---
+
+    def respond(self, params: dict) -> tuple[int, dict, bytes]:
+        """Vrátí (HTTP status, hlavičky, tělo) odpovědi na dotaz s parametry `params`."""
+        document_type = params.get("documentType", "")
+        latency_s = self._injected_latency_s()
+        if latency_s > 0:
+            time.sleep(latency_s)
+
+        if not params.get("securityToken"):
+            self._count(document_type, "unauthorized")
+            return 401, {"Content-Type": "text/html"}, b"<html><body><h1>Unauthorized</h1></body></html>"
+
+        if self.error_rate > 0 and (not self.error_document_types or document_type in self.error_document_types) and self._roll(self.error_rate):
+            self._count(document_type, f"error_{self.error_status}")
+            headers = {"Content-Type": "text/html"}
+            if self.error_status in (429, 503):
+                headers["Retry-After"] = "1"
+            return self.error_status, headers, f"<html><body><h1>{self.error_status} (mock)</h1></body></html>".encode()
+
+        fixture = self._fixture_path(params)
+        if fixture is not None:
+            for path in (fixture.with_suffix(".zip"), fixture.with_suffix(".xml")):
+                if path.exists():
+                    self._count(document_type, "fixture")
+                    return 200, {"Content-Type": _content_type(path.suffix)}, path.read_bytes()
+            if self.record_from:
+                return self._record(params, fixture)
+
+        if document_type not in DOMAIN_PARAMS:
+            self._count(document_type, "bad_request")
+            return 400, {"Content-Type": "application/xml"}, entsoe_fixtures.acknowledgement_document(
+                f"Unknown documentType '{document_type}' (ENTSOE mock server).", reason_code="999")
+
+        try:
+            period_start = entsoe_fixtures.parse_period(params["periodStart"])
+            period_end = entsoe_fixtures.parse_period(params["periodEnd"])
+        except (KeyError, ValueError):
+            self._count(document_type, "bad_request")
+            return 400, {"Content-Type": "application/xml"}, entsoe_fixtures.acknowledgement_document(
+                "Mandatory parameters periodStart/periodEnd missing or invalid (ENTSOE mock server).")
+
+        domain = params.get(DOMAIN_PARAMS[document_type], "")
+        body = self._synthetic_document(document_type, params, domain, period_start, period_end)
+        if body is None:
+            self._count(document_type, "no_data")
+            return 200, {"Content-Type": "application/xml"}, entsoe_fixtures.acknowledgement_document()
+
+        self._count(document_type, "ok")
+        return 200, {"Content-Type": _content_type(".zip" if body.startswith(b"PK") else ".xml")}, body
+
+    def _synthetic_document(self, document_type: str, params: dict, domain: str, period_start: datetime, period_end: datetime) -> bytes | None:
+        """Syntetický dokument pro dotaz, nebo None, pokud má API odpovědět NoMatchingData."""
+        if document_type in self.no_data_document_types or domain not in self.known_domains:
+            return None
+        if document_type == "A44" and int(params.get("offset", 0)) > 0:
+            return None # entsoe-py stránkuje po 100 dokumentech, dokud nedostane NoMatchingData
+
+        if document_type in INTRADAY_DOCUMENT_TYPES:
+            published_until = datetime.now(timezone.utc).replace(tzinfo=None) - PUBLICATION_DELAY
+            published_until -= timedelta(minutes=published_until.minute % 15, seconds=published_until.second, microseconds=published_until.microsecond)
+            period_end = min(period_end, published_until)
+        if period_end <= period_start:
+            return None
+
+        seed = zlib.crc32(f"{self.seed}|{document_type}|{domain}|{params.get('processType', '')}|{period_start:%Y%m%d%H%M}".encode())
+        zipped = document_type in self.zip_document_types
+        if document_type == "A44":
+            # entsoe-py se ptá i na den před a po; dotaz zasahující do 15min období dostane 15min ceny
+            resolution_minutes = 15 if period_end > DAY_AHEAD_15MIN_FROM else 60
+            documents = {"A44.xml": entsoe_fixtures.day_ahead_document(period_start, period_end, domain, resolution_minutes=resolution_minutes, seed=seed)}
+        elif document_type == "A37":
+            # Více XML dokumentů je jen v ZIPu; bez ZIPu jsou všechny nabídky v jednom dokumentu
+            documents = entsoe_fixtures.split_reserve_bid_document(
+                period_start, period_end, domain, n_series=self.bid_series, parts=self.zip_parts if zipped else 1, seed=seed)
+        else:
+            # Okno lokálního dne přes půlnoc UTC vrací API jako dvě periody časové řady
+            documents = {f"{document_type}.xml": entsoe_fixtures.balancing_document(
+                document_type, period_start, period_end, domain, n_series=self.balancing_series, seed=seed,
+                split_at_utc_midnight=True)}
+
+        if zipped:
+            return entsoe_fixtures.zip_documents(documents, nested=self.nested_zip)
+        return next(iter(documents.values()))
+
+    # --- Fixtures ---
+
+    def _fixture_path(self, params: dict) -> Path | None:
+        """Cesta k fixture (bez přípony) pro dotaz; klíč nezávisí na tokenu."""
+        if self.fixtures_dir is None:
+            return None
+        key = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if name != "securityToken")
+        return self.fixtures_dir / f"{params.get('documentType', 'unknown')}_{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+
+    def _record(self, params: dict, fixture: Path) -> tuple[int, dict, bytes]:
+        """Přepošle dotaz na skutečné API a úspěšnou odpověď uloží jako fixture."""
+        document_type = params.get("documentType", "")
+        try:
+            response = requests.get(self.record_from, params=params, timeout=(10, 120))
+        except requests.exceptions.RequestException as e:
+            self._count(document_type, "record_failed")
+            logging.error(f"Nahrávání fixture {fixture.name} selhalo: {e}")
+            return 502, {"Content-Type": "text/html"}, f"<html><body><h1>502 (mock record): {e}</h1></body></html>".encode()
+
+        if response.status_code == 200:
+            path = fixture.with_suffix(".zip" if response.content.startswith(b"PK") else ".xml")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(response.content)
+            logging.info(f"Nahrána fixture {path} ({len(response.content)} B).")
+        self._count(document_type, "recorded")
+        return response.status_code, {"Content-Type": response.headers.get("Content-Type", "application/xml")}, response.content
+
+
+def _content_type(suffix: str) -> str:
+    return "application/zip" if suffix == ".zip" else "application/xml"
+
+
+class _MockEntsoeHandler(BaseHTTPRequestHandler):
+    mock: MockEntsoeServer = None # Nastavuje MockEntsoeServer (podtřída s navázaným serverem)
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/api":
+            self._send(404, {"Content-Type": "text/html"}, b"<html><body><h1>Not Found</h1></body></html>")
+            return
+        status, headers, body = self.mock.respond(dict(parse_qsl(url.query)))
+        self._send(status, headers, body)
+
+    def _send(self, status: int, headers: dict, body: bytes) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"ENTSOE-E mock: {format % args}")
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Lokální náhrada ENTSOE-E API se syntetickými nebo nahranými odpověďmi.")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresa, na které server poslouchá.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (výchozí {DEFAULT_PORT}).")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Přidaná latence každé odpovědi (ms).")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Náhodná latence navíc 0..N ms.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Podíl odpovědí s chybou (0-1).")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status injektovaných chyb (výchozí 503).")
+    parser.add_argument("--error-document-types", nargs="*", default=[], help="Chyby jen pro tyto typy dokumentů (výchozí: všechny).")
+    parser.add_argument("--no-data", nargs="*", default=[], help="Typy dokumentů, které vždy vrátí NoMatchingData.")
+    parser.add_argument("--zip", nargs="*", default=["A37"], help="Typy dokumentů vracené jako ZIP (výchozí A37).")
+    parser.add_argument("--flat-zip", action="store_true", help="ZIP bez vnořených ZIPů.")
+    parser.add_argument("--zip-parts", type=int, default=2, help="Počet XML dokumentů v ZIP odpovědi A37.")
+    parser.add_argument("--bid-series", type=int, default=200, help="Počet nabídek (Bid_TimeSeries) v odpovědi A37.")
+    parser.add_argument("--fixtures-dir", default=None, help="Adresář s nahranými odpověďmi (mají přednost před syntetickými).")
+    parser.add_argument("--record-from", default=None, help="URL skutečného API; chybějící fixtures se stáhnou a uloží.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed syntetických dat a injektovaných chyb.")
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.error_rate <= 1:
+        parser.error("--error-rate musí být mezi 0 a 1.")
+    if args.record_from and not args.fixtures_dir:
+        parser.error("--record-from vyžaduje --fixtures-dir.")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = _parse_args(argv)
+    server = MockEntsoeServer(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        error_document_types=tuple(args.error_document_types),
+        no_data_document_types=tuple(args.no_data),
+        zip_document_types=tuple(args.zip),
+        nested_zip=not args.flat_zip,
+        zip_parts=args.zip_parts,
+        bid_series=args.bid_series,
+        fixtures_dir=args.fixtures_dir,
+        record_from=args.record_from,
+        seed=args.seed,
+    )
+    logging.info(f"Dashboard proti mock serveru: SVR_ENTSOE_API_URL={server.base_url} streamlit run app_SVR_dash.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+# entsoe_xml.py
+
+import calendar
+import functools
+import io
+import itertools
+import logging
+import os
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError: # lxml je volitelné, bez něj se parsuje přes ElementTree
+    lxml_etree = None
+
+"""
+Tento modul obsahuje streamové procházení bodů časových řad v XML dokumentech ENTSO-E,
+na kterém stojí parsery v data_loader.py. Má dva backendy se stejným výstupem:
+
+    lxml   iterparse v C filtrovaný na element časové řady a předkompilované XPath dotazy
+           podle zanoření ve schématu ENTSO-E (TimeSeries/Period/Point); delší periody
+           čte po sloupcích (jeden XPath na hodnotu); použije se, pokud je lxml nainstalované
+    etree  xml.etree.ElementTree.iterparse ze standardní knihovny (záložní)
+
+Jinak se hodnoty bodu čtou jedním průchodem přes potomky elementu Point
+(místo opakovaného findtext s namespacem pro každou hodnotu).
+Shodu výstupů obou backendů ověřuje check_xml_backends.py nad korpusem fixtures.
+
+Backend lze vynutit proměnnou prostředí SVR_XML_BACKEND ("lxml", "etree", výchozí "auto").
+"""
+
+BACKENDS = ("lxml", "etree")
+
+# Krok bodů, pokud perioda nemá (známé) resolution
+DEFAULT_STEP_S = 900
+
+# lxml backend čte periody s alespoň tolika body po sloupcích (XPath na hodnotu), menší po bodech;
+# u krátkých period (typicky nabídky A37) by režie XPath dotazů převážila
+LXML_COLUMNS_MIN_POINTS = 16
+
+
+def resolve_backend(setting: str) -> str:
+    """Převede nastavení ("auto", "lxml", "etree") na backend dostupný v tomto prostředí."""
+    if setting == "auto":
+        return "lxml" if lxml_etree is not None else "etree"
+    if setting not in BACKENDS:
+        logging.warning(f"Neznámý XML backend '{setting}', používám automatický výběr.")
+        return resolve_backend("auto")
+    if setting == "lxml" and lxml_etree is None:
+        logging.warning("XML backend lxml není nainstalovaný, používám ElementTree.")
+        return "etree"
+    return setting
+
+
+backend = resolve_backend(os.environ.get("SVR_XML_BACKEND", "auto"))
+
+
+def _qname(namespace: str, tag: str) -> str:
+    return f"{{{namespace}}}{tag}"
+
+
+def _resolution_to_seconds(resolution_str: str | None) -> int:
+    if resolution_str in ("PT60M", "P1H"):
+        return 3600
+    elif resolution_str == "PT30M":
+        return 1800
+    elif resolution_str == "PT1M":
+        return 60
+    return DEFAULT_STEP_S # PT15M i neznámé rozlišení
+
+
+def _start_to_epoch(start_text: str | None, label: str) -> int | None:
+    try:
+        return calendar.timegm(time.strptime(start_text, "%Y-%m-%dT%H:%MZ"))
+    except (TypeError, ValueError):
+        logging.warning(f"Nelze parsovat start_time: {start_text} pro {label}.")
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def _point_reader(tag_position: str, value_tags: tuple[tuple[str, ...], ...]):
+    """
+    Vrátí funkci, která jedním průchodem potomků Pointu vrátí (text position, texty hodnot).
+    `value_tags` má pro každou hodnotu n-tici alternativních tagů v pořadí priority;
+    chybějící hodnota je None, prázdný element "" (stejně jako findtext).
+    """
+    wanted = {tag_position, *(tag for alternatives in value_tags for tag in alternatives)}
+
+    def read(point) -> tuple[str | None, tuple]:
+        texts = {}
+        for child in point:
+            tag = child.tag
+            if tag in wanted and tag not in texts:
+                texts[tag] = child.text or ""
+        values = []
+        for alternatives in value_tags:
+            text = None
+            for tag in alternatives:
+                text = texts.get(tag)
+                if text is not None:
+                    break
+            values.append(text)
+        return texts.get(tag_position), tuple(values)
+
+    return read
+
+
+def iter_series_points(xml_source, namespace: str, series_tag: str, label: str,
+                       value_tags: tuple[tuple[str, ...], ...], xml_backend: str | None = None):
+    """
+    Streamově prochází XML dokument ENTSO-E a pro každý Point časové řady vrací
+    (mRID řady, flowDirection.direction, čas bodu v epoch s UTC, (texty hodnot podle value_tags)).
+    `xml_source` je binární stream nebo bytes. Body se vrací ze všech period řady - okno přes
+    půlnoc UTC (lokální den) API dělí do více period.
+    Při nevalidním XML vyhodí ET.ParseError (u obou backendů).
+    """
+    if isinstance(xml_source, (bytes, bytearray)):
+        xml_source = io.BytesIO(xml_source)
+    if (xml_backend or backend) == "lxml":
+        return _iter_series_points_lxml(xml_source, namespace, series_tag, label, value_tags)
+    return _iter_series_points_etree(xml_source, namespace, series_tag, label, value_tags)
+
+
+def _iter_series_points_etree(xml_source, namespace: str, series_tag: str, label: str, value_tags):
+    read_point = _point_reader(_qname(namespace, "position"), value_tags)
+    tag_series = _qname(namespace, series_tag)
+    tag_mrid = _qname(namespace, "mRID")
+    tag_direction = _qname(namespace, "flowDirection.direction")
+    tag_period = _qname(namespace, "Period")
+    tag_start = _qname(namespace, "start")
+    tag_resolution = _qname(namespace, "resolution")
+    tag_point = _qname(namespace, "Point")
+
+    root = None
+    in_series = False
+    in_period = False
+    series_id = None
+    flow_direction = None
+    start_epoch = None
+    step_s = DEFAULT_STEP_S
+
+    for event, elem in ET.iterparse(xml_source, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if root is None:
+                root = elem
+            elif tag == tag_series:
+                in_series = True
+                series_id = None
+                flow_direction = None
+            elif tag == tag_period and in_series:
+                in_period = True
+                start_epoch = None
+                step_s = DEFAULT_STEP_S
+            continue
+
+        if not in_series:
+            continue
+
+        if tag == tag_point:
+            if start_epoch is not None:
+                pos_str, values = read_point(elem)
+                position = int(pos_str) if pos_str is not None else 0
+                yield series_id, flow_direction, start_epoch + (position - 1) * step_s, values
+            elem.clear()
+        elif tag == tag_mrid:
+            if series_id is None: # První mRID v časové řadě je její ID
+                series_id = elem.text
+        elif tag == tag_direction:
+            if flow_direction is None:
+                flow_direction = elem.text
+        elif tag == tag_start and in_period:
+            start_epoch = _start_to_epoch(elem.text, label)
+        elif tag == tag_resolution and in_period:
+            step_s = _resolution_to_seconds(elem.text)
+        elif tag == tag_period:
+            in_period = False
+            if start_epoch is None:
+                logging.warning(f"Chybí start_time nebo resolution v Period elementu pro {label}.")
+        elif tag == tag_series:
+            in_series = False
+            root.clear() # Uvolnění již zpracovaných časových řad
+
+
+@functools.lru_cache(maxsize=8)
+def _lxml_queries(namespace: str) -> dict:
+    """Předkompilované XPath dotazy pro časovou řadu a periodu daného namespace."""
+    namespaces = {"ns": namespace}
+    return {
+        "series_id": lxml_etree.XPath("ns:mRID/text()", namespaces=namespaces, smart_strings=False),
+        "direction": lxml_etree.XPath("ns:flowDirection.direction/text()", namespaces=namespaces, smart_strings=False),
+        "periods": lxml_etree.XPath("ns:Period", namespaces=namespaces),
+        "start": lxml_etree.XPath("ns:timeInterval/ns:start/text()", namespaces=namespaces, smart_strings=False),
+        "resolution": lxml_etree.XPath("ns:resolution/text()", namespaces=namespaces, smart_strings=False),
+        "points": lxml_etree.XPath("ns:Point", namespaces=namespaces),
+    }
+
+
+def _lxml_column_queries(namespace: str, tag: str) -> tuple:
+    """XPath dotazy pro jednu hodnotu všech bodů periody najednou: (texty v pořadí bodů, počet elementů)."""
+    namespaces = {"ns": namespace}
+    local_name = tag.rpartition("}")[2]
+    return (
+        lxml_etree.XPath(f"ns:Point/ns:{local_name}/text()", namespaces=namespaces, smart_strings=False),
+        lxml_etree.XPath(f"count(ns:Point/ns:{local_name})", namespaces=namespaces),
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _lxml_period_reader(namespace: str, value_tags: tuple[tuple[str, ...], ...]):
+    """
+    Vrátí funkci, která přečte pozice a hodnoty všech bodů periody po sloupcích (jeden XPath na sloupec),
+    nebo None, pokud periodu takto přečíst nejde a body se musí číst po jednom. Sloupec se použije,
+    jen když má stejně elementů i neprázdných textů jako je bodů (hodnota v každém bodě právě jednou).
+    """
+    count_points = lxml_etree.XPath("count(ns:Point)", namespaces={"ns": namespace})
+    position_queries = _lxml_column_queries(namespace, "position")
+    slots = [[_lxml_column_queries(namespace, tag) for tag in alternatives] for alternatives in value_tags]
+
+    def read_column(queries, period, n_points: int):
+        texts, count = queries
+        if count(period) != n_points:
+            return None
+        column = texts(period)
+        return column if len(column) == n_points else None
+
+    def read(period):
+        n_points = int(count_points(period))
+        if n_points < LXML_COLUMNS_MIN_POINTS:
+            return None
+        positions = read_column(position_queries, period, n_points)
+        if positions is None:
+            return None
+
+        columns = []
+        for alternatives in slots:
+            column = itertools.repeat(None, n_points) # Žádná z alternativ v periodě není
+            for texts, count in alternatives:
+                present = count(period)
+                if present == n_points:
+                    column = texts(period)
+                    if len(column) != n_points:
+                        return None # Prázdný element v některém bodě
+                    break
+                if present:
+                    return None # Alternativa je jen v části bodů
+            columns.append(column)
+        return zip(positions, zip(*columns))
+
+    return read
+
+
+def _lxml_series_points(series, queries: dict, read_period, read_point, label: str):
+    """Body jedné časové řady (elementu z lxml iterparse)."""
+    series_id = next(iter(queries["series_id"](series)), None)
+    flow_direction = next(iter(queries["direction"](series)), None)
+
+    for period in queries["periods"](series):
+        start_texts = queries["start"](period)
+        start_epoch = _start_to_epoch(start_texts[-1], label) if start_texts else None
+        if start_epoch is None:
+            logging.warning(f"Chybí start_time nebo resolution v Period elementu pro {label}.")
+            continue
+        resolution_texts = queries["resolution"](period)
+        step_s = _resolution_to_seconds(resolution_texts[-1]) if resolution_texts else DEFAULT_STEP_S
+
+        points = read_period(period)
+        if points is None:
+            points = (read_point(point) for point in queries["points"](period))
+        for pos_str, values in points:
+            position = int(pos_str) if pos_str is not None else 0
+            yield series_id, flow_direction, start_epoch + (position - 1) * step_s, values
+
+
+def _iter_series_points_lxml(xml_source, namespace: str, series_tag: str, label: str, value_tags):
+    queries = _lxml_queries(namespace)
+    read_period = _lxml_period_reader(namespace, value_tags)
+    read_point = _point_reader(_qname(namespace, "position"), value_tags)
+    try:
+        # iterparse vrací jen konce časových řad - hlavičky dokumentu a ostatní elementy řeší C kód lxml
+        for _, series in lxml_etree.iterparse(xml_source, events=("end",), tag=_qname(namespace, series_tag),
+                                              resolve_entities=False, no_network=True):
+            yield from _lxml_series_points(series, queries, read_period, read_point, label)
+
+            # Uvolnění zpracované řady i již zpracovaných sourozenců. Proxy objekty period a bodů
+            # v tu chvíli už neexistují (skončil generátor řady), jinak by je clear() musel přesouvat.
+            series.clear(keep_tail=False)
+            while series.getprevious() is not None:
+                del series.getparent()[0]
+    except lxml_etree.XMLSyntaxError as e:
+        raise ET.ParseError(str(e)) from e
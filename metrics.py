@@ -0,0 +1,281 @@
+# metrics.py
+
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+"""
+Tento modul obsahuje metriky procesu dashboardu ve formátu Prometheus (text exposition 0.0.4).
+Vlastní minimální registr (čítače, histogramy a gauge počítané při scrapu), bez závislosti
+na prometheus_client. Endpoint /metrics běží ve vlákně vedle Streamlitu na vlastním portu,
+jeden pro celý proces; každá replika se scrapuje zvlášť a agreguje se až v Prometheu.
+
+Metriky plní hooky v data_loader.py (dotazy na API, parsování), data_cache.py (cache),
+entsoe_http.py (limiter, circuit breakery) a app_SVR_dash.py (sezení, reruny).
+
+Nastavení přes proměnné prostředí:
+    SVR_METRICS_ENABLED  "0" endpoint vypne (výchozí "1"); metriky se sbírají i tak
+    SVR_METRICS_HOST     adresa, na které endpoint poslouchá (výchozí "127.0.0.1", jen lokálně);
+                         endpoint nemá autentizaci - vystavit ho ven (např. "0.0.0.0" pro scrape
+                         z Promethea mimo stroj/kontejner) je třeba nastavit vědomě
+    SVR_METRICS_PORT     port endpointu (výchozí 9464)
+"""
+
+METRICS_ENABLED = os.environ.get("SVR_METRICS_ENABLED", "1") != "0"
+METRICS_HOST = os.environ.get("SVR_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("SVR_METRICS_PORT", 9464))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Sezení je aktivní, pokud mělo rerun během posledních SESSION_ACTIVE_WINDOW_S sekund
+SESSION_ACTIVE_WINDOW_S = 300
+
+# Hranice histogramů (s)
+REQUEST_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+RERUN_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metrika {self.name} očekává labely {self.labelnames}, dostala {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._sample_lines())
+        return lines
+
+    def _sample_lines(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotónně rostoucí čítač (název by měl končit na _total)."""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def _sample_lines(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Histogram s pevnými hranicemi košů (kumulativní _bucket, _sum, _count)."""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, list] = {} # labely -> [počty v koších (+Inf navíc), součet]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _sample_lines(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for upper_bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(upper_bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """Gauge, jehož hodnoty se zjišťují až při scrapu: `collect()` vrací {hodnoty labelů: hodnota}."""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...], collect):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def _sample_lines(self) -> list[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            logging.error(f"Metriku {self.name} se nepodařilo zjistit: {e}")
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Registry:
+    """Registr metrik procesu; expose() vrací celý text pro /metrics."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # Opakovaný import modulu (reload Streamlitu) registraci nahradí, nezdvojí
+            self._metrics[metric.name] = metric
+        return metric
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ENTSOE_REQUESTS = REGISTRY.register(Counter(
+    "svr_entsoe_requests_total",
+    "Dotazy na ENTSOE-E API podle typu dokumentu a výsledku (ok, no_data, http_error, connection_error, circuit_open, error).",
+    ("document_type", "outcome"),
+))
+ENTSOE_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "svr_entsoe_request_duration_seconds",
+    "Doba dotazu na ENTSOE-E API včetně stažení a zpracování odpovědi (s).",
+    ("document_type",),
+    REQUEST_BUCKETS,
+))
+PARSE_DURATION = REGISTRY.register(Histogram(
+    "svr_parse_duration_seconds",
+    "Doba parsování jednoho XML dokumentu (s).",
+    ("document_type",),
+    PARSE_BUCKETS,
+))
+PARSED_POINTS = REGISTRY.register(Counter(
+    "svr_parsed_points_total",
+    "Počet bodů časových řad získaných parsováním (propustnost = rate(points) / rate(duration_sum)).",
+    ("document_type",),
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "svr_cache_lookups_total",
+    "Vyhledání v paměťové cache fetch funkcí podle datasetu a výsledku (hit, stale, negative, miss).",
+    ("dataset", "status"),
+))
+RERUN_DURATION = REGISTRY.register(Histogram(
+    "svr_rerun_duration_seconds",
+    "Doba načtení dat a vykreslení grafů při jednom rerunu dashboardu (s).",
+    (),
+    RERUN_BUCKETS,
+))
+
+_session_last_seen: dict[str, float] = {}
+_sessions_lock = threading.Lock()
+
+
+def record_session_activity(session_id: str) -> None:
+    """Zaznamená rerun sezení (pro gauge aktivních sezení)."""
+    now = time.monotonic()
+    with _sessions_lock:
+        _session_last_seen[session_id] = now
+        for stale_id in [sid for sid, seen in _session_last_seen.items() if now - seen > SESSION_ACTIVE_WINDOW_S]:
+            del _session_last_seen[stale_id]
+
+
+def _active_sessions() -> dict[tuple, int]:
+    now = time.monotonic()
+    with _sessions_lock:
+        return {(): sum(1 for seen in _session_last_seen.values() if now - seen <= SESSION_ACTIVE_WINDOW_S)}
+
+
+REGISTRY.register(CallbackGauge(
+    "svr_active_sessions",
+    f"Počet sezení s rerunem během posledních {SESSION_ACTIVE_WINDOW_S} s.",
+    (),
+    _active_sessions,
+))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapy každých pár sekund by zahltily log
+        pass
+
+
+def start_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    """Spustí HTTP server s endpointem /metrics ve vlákně na pozadí."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="svr-metrics", daemon=True).start()
+    logging.info(f"Metriky jsou dostupné na http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_server_started() -> ThreadingHTTPServer | None:
+    """Spustí endpoint jednou za proces (sdílený všemi sezeními). Vrací None, pokud je vypnutý nebo port obsazený."""
+    if not METRICS_ENABLED:
+        logging.info("Endpoint metrik je vypnutý (SVR_METRICS_ENABLED=0).")
+        return None
+    try:
+        return start_server()
+    except OSError as e:
+        logging.error(f"Endpoint metrik se nepodařilo spustit na {METRICS_HOST}:{METRICS_PORT}: {e}")
+        return None
@@ -10,6 +10,8 @@ import logging
 import base64
 from pathlib import Path
 
+import diagnostics
+
 opa = 0.05
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -50,6 +52,7 @@ def _convert_utc_hour_to_local_display(utc_hour: int, target_date: date, user_tz
 
 # --- POMOCNÉ FUNKCE PRO PŘÍPRAVU DAT KUMULATIVNÍCH KŘIVEK ---
 
+@diagnostics.timed_stage("transform")
 def _prepare_afrr_bids_for_plot(df_group_raw: pd.DataFrame, direction: str, price_col: str, power_col: str) -> tuple[pd.DataFrame, float]:
     """
     Pomocná funkce pro přípravu dat kumulativní křivky aFRR bids.
@@ -65,7 +68,7 @@ def _prepare_afrr_bids_for_plot(df_group_raw: pd.DataFrame, direction: str, pric
         return pd.DataFrame(), 0.0
 
 
-    df_group = df_group_raw.groupby(['Timestamp', price_col, 'Direction'], as_index=False)[power_col].sum()
+    df_group = df_group_raw.groupby(['Timestamp', price_col, 'Direction'], as_index=False, observed=True)[power_col].sum() # Direction je kategorie
 
     if df_group.empty: # Přidána kontrola po groupby
         return pd.DataFrame(), 0.0
@@ -108,6 +111,7 @@ def _prepare_afrr_bids_for_plot(df_group_raw: pd.DataFrame, direction: str, pric
     
     return final_df, median_price
 
+@diagnostics.timed_stage("transform")
 def _prepare_capacity_for_plot(df_group_raw: pd.DataFrame, direction: str, price_col: str, power_col: str) -> tuple[pd.DataFrame, float]:
     """
     Pomocná funkce pro přípravu dat kumulativní křivky rezervované kapacity.
@@ -122,7 +126,7 @@ def _prepare_capacity_for_plot(df_group_raw: pd.DataFrame, direction: str, price
         logging.warning(f"Chybějící sloupce v df_group_raw pro kapacitu: {required_cols}. Dostupné: {df_group_raw.columns.tolist()}")
         return pd.DataFrame(), 0.0
 
-    df_group = df_group_raw.groupby(['Timestamp', price_col, 'Direction'], as_index=False)[power_col].sum()
+    df_group = df_group_raw.groupby(['Timestamp', price_col, 'Direction'], as_index=False, observed=True)[power_col].sum() # Direction je kategorie
     
     if df_group.empty: # Přidána kontrola po groupby
         return pd.DataFrame(), 0.0
@@ -167,9 +171,41 @@ def _prepare_capacity_for_plot(df_group_raw: pd.DataFrame, direction: str, price
 
     return final_df, weighted_average
 
+# --- POMOCNÁ FUNKCE PRO SROVNÁNÍ ZEMÍ ---
+@diagnostics.timed_stage("transform")
+def _align_on_utc_index(series_by_country: dict[str, pd.Series]) -> pd.DataFrame:
+    """
+    Zarovná časové řady více zemí (index = naivní UTC čas) na společný UTC index.
+    Řady s hrubším rozlišením (např. hodinové denní ceny) se doplní krokově (ffill),
+    ale jen v rozsahu, který daná řada pokrývá. Sloupce = kódy zemí.
+    """
+    series_by_country = {
+        country: series[~series.index.duplicated(keep="last")].sort_index()
+        for country, series in series_by_country.items()
+        if series is not None and not series.empty
+    }
+    if not series_by_country:
+        return pd.DataFrame()
+
+    common_index = series_by_country[next(iter(series_by_country))].index
+    for series in series_by_country.values():
+        common_index = common_index.union(series.index)
+
+    aligned = {}
+    for country, series in series_by_country.items():
+        aligned_series = series.reindex(common_index, method="ffill")
+        resolution = series.index.to_series().diff().min() if len(series) > 1 else timedelta(minutes=15)
+        aligned_series[common_index >= series.index.max() + resolution] = float("nan")
+        aligned[country] = aligned_series
+    aligned_df = pd.DataFrame(aligned, index=common_index)
+    aligned_df.index.name = "Timestamp"
+    return aligned_df
+
+
 # --- KONEC POMOCNÝCH FUNKCJ ---
 
 
+@diagnostics.plot_call
 def create_day_ahead_price_plot(
     df_prices: pd.DataFrame,
     country: str,
@@ -323,6 +359,7 @@ def create_day_ahead_price_plot(
     return fig
 
 
+@diagnostics.plot_call
 def create_aggregated_bids_plot(
     df_agg_bids: pd.DataFrame,
     country: str,
@@ -459,6 +496,7 @@ def create_aggregated_bids_plot(
     return fig
 
 
+@diagnostics.plot_call
 def create_cumulative_bid_curve_plot(
     df_raw_bids: pd.DataFrame,
     selected_date: datetime.date,
@@ -576,6 +614,7 @@ def create_cumulative_bid_curve_plot(
     return fig, combined_plot_df
 
 
+@diagnostics.plot_call
 def create_cumulative_procured_capacity_curve_plot(
     df_raw_capacity: pd.DataFrame,
     selected_date: datetime.date,
@@ -769,4 +808,230 @@ def create_cumulative_procured_capacity_curve_plot(
         legend=dict(orientation="h", yanchor="top", y=-0.2, xanchor="center", x=0.5)
     )
     
-    return fig, pd.DataFrame()
\ No newline at end of file
+    return fig, pd.DataFrame()
+
+
+# Barvy zemí ve srovnávacích grafech (pořadí podle výběru v sidebaru)
+COUNTRY_COLORS = px.colors.qualitative.Plotly
+
+
+@diagnostics.plot_call
+def create_country_comparison_price_plot(
+    day_ahead_by_country: dict[str, pd.DataFrame],
+    afrr_activation_by_country: dict[str, pd.DataFrame],
+    date: datetime.date,
+    user_tz_str: str
+) -> go.Figure:
+    """
+    Generuje srovnávací graf denních cen a cen aktivace aFRR pro více zemí.
+    Řady všech zemí jsou zarovnané na společný UTC index a zobrazené v lokálním čase.
+    Barva = země, styl čáry = typ ceny.
+    """
+    local_tz = pytz.timezone(user_tz_str)
+    tz_name_for_display = datetime.now(local_tz).tzname()
+    countries = list(dict.fromkeys([*day_ahead_by_country, *afrr_activation_by_country]))
+
+    price_series = {
+        "Day-Ahead": _align_on_utc_index({
+            country: df.set_index('Time')['Price'] for country, df in day_ahead_by_country.items()
+            if not df.empty and 'Price' in df.columns
+        }),
+        "aFRR+": _align_on_utc_index({
+            country: df.set_index('Timestamp')['afrr_plus_price'] for country, df in afrr_activation_by_country.items()
+            if not df.empty and 'afrr_plus_price' in df.columns
+        }),
+        "aFRR-": _align_on_utc_index({
+            country: df.set_index('Timestamp')['afrr_minus_price'] for country, df in afrr_activation_by_country.items()
+            if not df.empty and 'afrr_minus_price' in df.columns
+        }),
+    }
+
+    if all(aligned.empty for aligned in price_series.values()):
+        fig = go.Figure()
+        fig.add_annotation(text="Nejsou dostupná data pro zobrazení.",
+                           xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False,
+                           font=dict(size=16, color="gray"))
+        fig.update_layout(title=f"Srovnání cen {', '.join(countries)} ({date.strftime('%d.%m.%Y')})")
+        return fig
+
+    fig = go.Figure()
+
+    # --- PŘIDÁNÍ LOGA JAKO VODOZNAKU ---
+    logo_source = get_logo_as_base64("assets/logo.svg")
+    if logo_source:
+        fig.add_layout_image(
+            dict(
+                source=logo_source,
+                xref="paper", yref="paper",
+                x=0.5, y=0.5,
+                sizex=0.5, sizey=0.5,
+                xanchor="center", yanchor="middle",
+                sizing="contain",
+                opacity=opa,
+                layer="below"
+            )
+        )
+    # --- KONEC BLOKU S LOGEM ---
+
+    # Typ ceny -> (styl čáry, šířka, viditelnost); aFRR- je ve výchozím stavu skrytá kvůli přehlednosti
+    line_styles = {
+        "Day-Ahead": ("solid", 2.5, True),
+        "aFRR+": ("dot", 1.5, True),
+        "aFRR-": ("dash", 1.5, "legendonly"),
+    }
+    all_values = []
+    for price_label, aligned in price_series.items():
+        if aligned.empty:
+            continue
+        dash, width, visible = line_styles[price_label]
+        x_local = aligned.index.tz_localize('UTC').tz_convert(local_tz)
+        for country in aligned.columns:
+            if aligned[country].notna().any():
+                all_values.append(aligned[country].dropna())
+                fig.add_trace(go.Scatter(
+                    x=x_local,
+                    y=aligned[country],
+                    mode='lines',
+                    line_shape='hv',
+                    name=f"{country} {price_label}",
+                    legendgroup=country,
+                    line=dict(color=COUNTRY_COLORS[countries.index(country) % len(COUNTRY_COLORS)], width=width, dash=dash),
+                    visible=visible,
+                    hovertemplate=f"{country} {price_label}: %{{y:.2f}} EUR/MWh<extra></extra>"
+                ))
+
+    valid_prices = pd.concat(all_values) if all_values else pd.Series(dtype=float)
+    if valid_prices.empty:
+        y_min, y_max = -100, 200
+    else:
+        y_min = min(-10, valid_prices.min() * 1.05)
+        y_max = valid_prices.max() * 1.05
+        if y_max <= y_min:
+            y_max = y_min + 50
+
+    fig.update_layout(
+        title=f"Srovnání cen {', '.join(countries)} ({date.strftime('%d.%m.%Y')})",
+        xaxis_title=f"Čas ({tz_name_for_display})",
+        yaxis_title="Cena (EUR/MWh)",
+        hovermode="x unified",
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=-0.2,
+            xanchor="center",
+            x=0.5
+        ),
+        yaxis=dict(range=[y_min, y_max]),
+    )
+    fig.update_xaxes(
+        dtick="H1",
+        tickformat="%H:%M",
+        type='date',
+        showgrid=False
+    )
+    return fig
+
+
+@diagnostics.plot_call
+def create_country_comparison_agg_bids_plot(
+    agg_bids_by_country: dict[str, pd.DataFrame],
+    date: datetime.date,
+    user_tz_str: str,
+    selected_process_type_label: str
+) -> go.Figure:
+    """
+    Generuje srovnávací graf aktivovaných (a nabízených) objemů aFRR+ a aFRR- pro více zemí,
+    zarovnaných na společný UTC index.
+    """
+    local_tz = pytz.timezone(user_tz_str)
+    tz_name_for_display = datetime.now(local_tz).tzname()
+    countries = list(agg_bids_by_country)
+
+    start_of_day_local_aware = local_tz.localize(datetime(date.year, date.month, date.day, 0, 0, 0), is_dst=None)
+    end_of_day_local_aware = local_tz.localize(datetime(date.year, date.month, date.day, 23, 59, 59), is_dst=None)
+
+    # Sloupec -> (popisek, styl čáry, viditelnost)
+    volume_columns = {
+        "afrr_plus_activated": ("aFRR+ Activated", "solid", True),
+        "afrr_minus_activated": ("aFRR- Activated", "dash", True),
+        "afrr_plus_offered": ("aFRR+ Offered", "dot", "legendonly"),
+        "afrr_minus_offered": ("aFRR- Offered", "dashdot", "legendonly"),
+    }
+    volume_series = {
+        column: _align_on_utc_index({
+            country: df.set_index('Timestamp')[column] for country, df in agg_bids_by_country.items()
+            if not df.empty and column in df.columns
+        })
+        for column in volume_columns
+    }
+
+    title = f"Srovnání agregovaných nabídek {selected_process_type_label} {', '.join(countries)} ({date.strftime('%d.%m.%Y')})"
+    if all(aligned.empty for aligned in volume_series.values()):
+        fig = go.Figure()
+        fig.add_annotation(text="Nejsou dostupná data agregovaných nabídek.",
+                           xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False,
+                           font=dict(size=16, color="gray"))
+        fig.update_layout(title=title, xaxis=dict(range=[start_of_day_local_aware, end_of_day_local_aware]))
+        return fig
+
+    fig = go.Figure()
+
+    # --- PŘIDÁNÍ LOGA JAKO VODOZNAKU ---
+    logo_source = get_logo_as_base64("assets/logo.svg")
+    if logo_source:
+        fig.add_layout_image(
+            dict(
+                source=logo_source,
+                xref="paper", yref="paper",
+                x=0.5, y=0.5,
+                sizex=0.5, sizey=0.5,
+                xanchor="center", yanchor="middle",
+                sizing="contain",
+                opacity=opa,
+                layer="below"
+            )
+        )
+    # --- KONEC BLOKU S LOGEM ---
+
+    for column, aligned in volume_series.items():
+        if aligned.empty:
+            continue
+        volume_label, dash, visible = volume_columns[column]
+        x_local = aligned.index.tz_localize('UTC').tz_convert(local_tz)
+        for country in aligned.columns:
+            if aligned[country].notna().any():
+                fig.add_trace(go.Scatter(
+                    x=x_local, y=aligned[country],
+                    mode="lines", name=f"{country} {volume_label}",
+                    legendgroup=country,
+                    line=dict(color=COUNTRY_COLORS[countries.index(country) % len(COUNTRY_COLORS)], width=2 if visible is True else 1.5, dash=dash, shape="hv"),
+                    visible=visible,
+                    hovertemplate=f"{country} {volume_label}: %{{y:.2f}} MW<extra></extra>"
+                ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=f"Čas ({tz_name_for_display})",
+        yaxis_title="Výkon (MW)",
+        plot_bgcolor="white",
+        hovermode="x unified",
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=-0.2,
+            xanchor="center",
+            x=0.5
+        ),
+        font=dict(size=16)
+    )
+    fig.update_xaxes(
+        dtick="H1",
+        tickformat="%H:%M",
+        type='date',
+        showgrid=True, gridcolor="#eeeeee",
+        range=[start_of_day_local_aware, end_of_day_local_aware]
+    )
+    fig.update_yaxes(
+        showgrid=True, gridcolor="#eeeeee"
+    )
+    return fig
@@ -0,0 +1,114 @@
+# prefetch_scheduler.py
+
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pytz
+import streamlit as st
+
+import data_cache
+import data_orchestrator as do
+import eic_codes
+import entsoe_http
+
+"""
+Tento modul obsahuje plánovač přednačítání (prefetch) dat na pozadí.
+Každý dataset se obnovuje v rytmu, ve kterém ho ENTSO-E publikuje, pro všechny
+nastavené země - první návštěvník po publikaci tak už dostane data z cache.
+Obnova jde přes limiter s nízkou prioritou (entsoe_http.PRIORITY_BACKGROUND).
+
+Nastavení přes proměnné prostředí:
+    SVR_PREFETCH_ENABLED   "0" plánovač vypne (výchozí "1")
+    SVR_PREFETCH_COUNTRIES kódy zemí oddělené čárkou (výchozí "CZ")
+"""
+
+PREFETCH_ENABLED = os.environ.get("SVR_PREFETCH_ENABLED", "1") != "0"
+PREFETCH_COUNTRIES = [c.strip() for c in os.environ.get("SVR_PREFETCH_COUNTRIES", "CZ").split(",") if c.strip()]
+
+# Plán obnovy: (úloha z data_orchestrator.page_dataset_calls, posun cílového dne, perioda, posuny od půlnoci)
+PREFETCH_SCHEDULE = [
+    # Aktivační ceny a agregované nabídky se publikují průběžně po čtvrthodinách (se zpožděním několika minut)
+    ("afrr_activation", 0, timedelta(minutes=15), (timedelta(minutes=5),)),
+    ("aggregated_bids_A67", 0, timedelta(minutes=15), (timedelta(minutes=5),)),
+    ("aggregated_bids_A68", 0, timedelta(minutes=15), (timedelta(minutes=5),)),
+    ("balancing_bids", 0, timedelta(hours=1), (timedelta(minutes=10),)),
+    # Výsledky denní aukce (SDAC) pro zítřek kolem 12:45; opakujeme pro případ zpoždění
+    ("day_ahead", 1, timedelta(days=1), (timedelta(hours=13), timedelta(hours=13, minutes=30), timedelta(hours=14))),
+    # Dnešní ceny DA jsou známé už ze včerejší aukce a data_cache je drží do půlnoci (expires_at),
+    # stačí je tedy načíst jednou hned po půlnoci; hodinová obnova by jen trefovala platný záznam
+    ("day_ahead", 0, timedelta(days=1), (timedelta(minutes=1),)),
+    # Aukce kapacity probíhají po 4hodinových blocích
+    ("procured_capacity", 0, timedelta(hours=4), (timedelta(minutes=15),)),
+    ("procured_capacity", 1, timedelta(hours=4), (timedelta(minutes=15),)),
+]
+
+
+def _target_date(country_code: str, day_offset: int) -> date:
+    local_now = datetime.now(pytz.timezone(eic_codes.get_timezone(country_code)))
+    return (local_now + timedelta(days=day_offset)).date()
+
+
+class PrefetchScheduler:
+    """Vlákno na pozadí, které podle PREFETCH_SCHEDULE obnovuje cache fetch funkcí (data_cache.py)."""
+
+    def __init__(self, countries: list[str], schedule: list = PREFETCH_SCHEDULE):
+        self.countries = countries
+        self.schedule = schedule
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="svr-prefetch", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+        logging.info(f"Prefetch plánovač spuštěn pro země {self.countries}.")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def refresh(self, job_name: str, day_offset: int) -> None:
+        """Znovu načte dataset pro všechny země a uloží ho do cache místo předchozí hodnoty."""
+        for country_code in self.countries:
+            target_date = _target_date(country_code, day_offset)
+            func, args, kwargs = do.page_dataset_calls(target_date, country_code)[job_name]
+            try:
+                with entsoe_http.request_priority(entsoe_http.PRIORITY_BACKGROUND):
+                    # Starý záznam zůstává v cache, dokud nejsou stažena nová data - stránka na obnovu nečeká
+                    df = func.refresh(*args, **kwargs)
+                if df is None or df.empty:
+                    # Prázdný výsledek vyprší v cache podle data_cache.expires_at (do další očekávané publikace)
+                    logging.info(f"Prefetch {job_name} pro {country_code}, {target_date}: data zatím nejsou dostupná.")
+                else:
+                    logging.info(f"Prefetch {job_name} pro {country_code}, {target_date}: obnoveno ({len(df)} řádků).")
+            except Exception as e:
+                logging.error(f"Prefetch {job_name} pro {country_code}, {target_date} selhal: {e}")
+
+    def _run(self) -> None:
+        # Po startu se zahřejí všechna data, pak se jede podle plánu
+        for job_name, day_offset, _, _ in self.schedule:
+            if self._stop_event.is_set():
+                return
+            self.refresh(job_name, day_offset)
+
+        now = datetime.now(pytz.utc)
+        next_runs = [data_cache.next_publication_after(now, period, offsets) for _, _, period, offsets in self.schedule]
+        while not self._stop_event.is_set():
+            wait_s = (min(next_runs) - datetime.now(pytz.utc)).total_seconds()
+            if self._stop_event.wait(max(wait_s, 0)):
+                return
+            now = datetime.now(pytz.utc)
+            for index, (job_name, day_offset, period, offsets) in enumerate(self.schedule):
+                if next_runs[index] <= now:
+                    self.refresh(job_name, day_offset)
+                    next_runs[index] = data_cache.next_publication_after(now, period, offsets)
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_started() -> PrefetchScheduler | None:
+    """Spustí plánovač jednou za proces (sdílený všemi sezeními). Vrací None, pokud je vypnutý."""
+    if not PREFETCH_ENABLED:
+        logging.info("Prefetch plánovač je vypnutý (SVR_PREFETCH_ENABLED=0).")
+        return None
+    scheduler = PrefetchScheduler(PREFETCH_COUNTRIES)
+    scheduler.start()
+    return scheduler
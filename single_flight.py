@@ -0,0 +1,69 @@
+# single_flight.py
+
+import logging
+import threading
+from typing import Any, Callable, Hashable
+
+"""
+Tento modul obsahuje slučování souběžných stejných dotazů (single-flight).
+Pokud více vláken (sezení Streamlitu, backfill, úlohy na pozadí) chce současně stejná data,
+stahuje a parsuje je jen první z nich a ostatní počkají na jeho výsledek.
+Výsledek se nikam neukládá - po doběhnutí dotazu se klíč uvolní a o dalším volání
+rozhoduje cache (data_cache, data_store).
+"""
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Slučuje souběžná volání se stejným klíčem do jednoho."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _InFlightCall] = {}
+        self.coalesced_total = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Zavolá func(), pokud pro `key` neběží jiné volání; jinak počká na běžící volání
+        a vrátí jeho výsledek (nebo vyhodí jeho výjimku).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+                self.coalesced_total += 1
+
+        if not is_leader:
+            logging.info(f"Dotaz {self.name} {key} už běží, čekám na jeho výsledek.")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """Počet právě běžících (sloučených) volání."""
+        with self._lock:
+            return len(self._calls)
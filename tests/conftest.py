@@ -0,0 +1,38 @@
+# tests/conftest.py
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Moduly aplikace leží v kořeni repozitáře (spouští se přes streamlit run / python <skript>.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Testy nesmí spouštět vlákna prefetchu ani endpoint metrik
+os.environ.setdefault("SVR_PREFETCH_ENABLED", "0")
+os.environ.setdefault("SVR_METRICS_ENABLED", "0")
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Prázdné úložiště data_store v dočasném adresáři."""
+    import data_store
+    monkeypatch.setattr(data_store, "STORE_DIR", tmp_path / "store")
+    return data_store.STORE_DIR
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Lokální mock server ENTSOE-E API (entsoe_mock_server.py), na který jdou všechny dotazy session."""
+    import streamlit as st
+
+    import entsoe_http
+    from entsoe_mock_server import MockEntsoeServer
+
+    monkeypatch.setattr(st, "secrets", {"entsoe_api": {"token": "test-token"}})
+    monkeypatch.setattr(entsoe_http, "_circuit_breakers", {}) # Chyby z jiných testů nesmí nechat breaker otevřený
+    monkeypatch.setattr(entsoe_http, "rate_limiter", entsoe_http.TokenBucketLimiter(entsoe_http.RATE_LIMIT_PER_MINUTE, entsoe_http.RATE_LIMIT_BURST))
+    with MockEntsoeServer() as server:
+        monkeypatch.setattr(entsoe_http, "ENTSOE_API_URL", server.base_url)
+        yield server
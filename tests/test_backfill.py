@@ -0,0 +1,47 @@
+# tests/test_backfill.py
+
+from datetime import date, timedelta
+
+import backfill
+import entsoe_http
+
+DATASETS = ["afrr_activation_prices", "procured_capacity"]
+
+
+def _closed_day() -> date:
+    return date.today() - timedelta(days=10)
+
+
+def test_stored_and_empty_partitions_are_counted_and_skipped_on_rerun(mock_api, store_dir):
+    mock_api.no_data_document_types = {"A15"}
+    target_date = _closed_day()
+
+    counts = backfill.run_backfill(["CZ"], target_date, target_date, DATASETS, workers=2)
+    assert counts == {"skipped": 0, "stored": 1, "empty": 1, "failed": 0}
+
+    # Uložená partition se přeskočí, prázdná se zkusí znovu
+    counts = backfill.run_backfill(["CZ"], target_date, target_date, DATASETS, workers=2)
+    assert counts == {"skipped": 1, "stored": 0, "empty": 1, "failed": 0}
+
+
+def test_failed_requests_are_not_counted_as_empty(mock_api, store_dir):
+    mock_api.error_rate = 1.0
+    mock_api.error_status = 400 # Bez opakování v adaptéru session
+    target_date = _closed_day()
+
+    counts = backfill.run_backfill(["CZ"], target_date, target_date, DATASETS, workers=2)
+
+    assert counts == {"skipped": 0, "stored": 0, "empty": 0, "failed": 2}
+
+
+def test_run_with_failures_exits_non_zero(mock_api, store_dir):
+    mock_api.error_rate = 1.0
+    mock_api.error_status = 400
+    day = _closed_day().isoformat()
+    argv = ["--countries", "CZ", "--start", day, "--end", day, "--datasets", *DATASETS]
+
+    assert backfill.main(argv) == 1
+    assert entsoe_http.rate_limiter.rate_per_s == backfill.DEFAULT_RATE_PER_MINUTE / 60 # Backfill má vlastní limit
+
+    mock_api.error_rate = 0.0
+    assert backfill.main(argv) == 0
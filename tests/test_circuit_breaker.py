@@ -0,0 +1,163 @@
+# tests/test_circuit_breaker.py
+
+import pandas as pd
+import pytest
+import requests
+import streamlit as st
+from entsoe import EntsoePandasClient
+
+import data_loader as dl
+import entsoe_documents
+import entsoe_http
+from entsoe_http import CircuitBreaker, CircuitOpenError
+
+
+class _Clock:
+    """Náhrada time.monotonic() v entsoe_http, posouvaná ručně."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(entsoe_http.time, "monotonic", clock)
+    return clock
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(entsoe_http.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.before_request()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_and_rejects_requests(clock):
+    breaker = CircuitBreaker("A84")
+    for _ in range(entsoe_http.CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.before_request()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.snapshot() == {"state": "open", "consecutive_failures": 3, "open_s": entsoe_http.CIRCUIT_OPEN_S}
+    clock.now += entsoe_http.CIRCUIT_OPEN_S - 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("A84")
+    for _ in range(entsoe_http.CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 1
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = CircuitBreaker("A84")
+    _open(breaker)
+    clock.now += entsoe_http.CIRCUIT_OPEN_S
+
+    breaker.before_request() # Zkušební dotaz
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request() # Další volající během zkušebního dotazu
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = CircuitBreaker("A84")
+    _open(breaker)
+    clock.now += entsoe_http.CIRCUIT_OPEN_S
+    breaker.before_request()
+    breaker.record_success()
+
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "open_s": entsoe_http.CIRCUIT_OPEN_S}
+    breaker.before_request()
+    breaker.before_request()
+
+
+def test_failed_probe_reopens_with_doubled_interval_up_to_the_cap(clock):
+    breaker = CircuitBreaker("A84")
+    _open(breaker)
+
+    expected_open_s = entsoe_http.CIRCUIT_OPEN_S
+    for _ in range(6):
+        clock.now += breaker.open_s
+        breaker.before_request()
+        breaker.record_failure()
+        expected_open_s = min(expected_open_s * 2, entsoe_http.CIRCUIT_OPEN_MAX_S)
+        assert breaker.state == "open"
+        assert breaker.open_s == expected_open_s
+        # Nový interval se počítá od neúspěšného zkušebního dotazu
+        clock.now += breaker.open_s - 1
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+        clock.now -= breaker.open_s - 1
+    assert breaker.open_s == entsoe_http.CIRCUIT_OPEN_MAX_S
+
+    # Po úspěchu se interval vrací na výchozí hodnotu
+    clock.now += breaker.open_s
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.open_s == entsoe_http.CIRCUIT_OPEN_S
+
+
+class _InterruptedResponse:
+    """Odpověď 200, jejíž tělo se při čtení přeruší (spojení spadne uprostřed přenosu)."""
+
+    ok = True
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int):
+        yield b"<?xml"
+        raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+    def close(self) -> None:
+        pass
+
+
+def test_read_error_while_streaming_counts_as_failure(monkeypatch):
+    monkeypatch.setattr(entsoe_http, "_circuit_breakers", {})
+    monkeypatch.setattr(entsoe_http, "get", lambda params, timeout, stream: _InterruptedResponse())
+
+    for _ in range(entsoe_http.CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            with entsoe_documents.fetch_document({"documentType": "A37"}):
+                pass
+
+    assert entsoe_http.get_circuit_breaker_states()["A37"]["state"] == "open"
+
+
+def test_entsoe_client_has_explicit_timeout(monkeypatch):
+    monkeypatch.setattr(st, "secrets", {"entsoe_api": {"token": "test-token"}})
+    dl.get_entsoe_client.clear()
+    try:
+        client = dl.get_entsoe_client()
+    finally:
+        dl.get_entsoe_client.clear()
+
+    assert client.timeout == (entsoe_http.CONNECT_TIMEOUT, dl.ENTSOE_CLIENT_READ_TIMEOUT)
+
+
+def test_rejected_request_is_not_retried_by_entsoe_py(monkeypatch, mock_api):
+    breaker = entsoe_http.get_circuit_breaker("A44")
+    _open(breaker)
+    before_request_calls = []
+    original_before_request = breaker.before_request
+    monkeypatch.setattr(breaker, "before_request", lambda: before_request_calls.append(1) or original_before_request())
+    client = EntsoePandasClient(api_key="test-token", session=entsoe_http.get_session(), retry_count=3, retry_delay=0)
+
+    with pytest.raises(CircuitOpenError):
+        client.query_day_ahead_prices("CZ", start=pd.Timestamp("2025-06-10", tz="Europe/Prague"), end=pd.Timestamp("2025-06-11", tz="Europe/Prague"))
+
+    assert len(before_request_calls) == 1
+    assert not issubclass(CircuitOpenError, requests.exceptions.ConnectionError)
@@ -0,0 +1,152 @@
+# tests/test_data_cache.py
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+import pytz
+
+import data_cache
+from single_flight import SingleFlight
+from test_single_flight import WAIT_S, _start, _wait_until
+
+UTC = pytz.utc
+
+# Úterý 10. 6. 2025 12:07 obchodního (bruselského) času = 10:07 UTC
+NOW = UTC.localize(datetime(2025, 6, 10, 10, 7))
+TODAY = date(2025, 6, 10)
+
+
+def _utc(*args) -> datetime:
+    return UTC.localize(datetime(*args))
+
+
+def test_closed_day_never_expires_but_its_empty_result_does():
+    closed_day = TODAY - timedelta(days=9)
+    assert data_cache.expires_at("afrr_activation_prices", "CZ", closed_day, False, NOW) is None
+    assert data_cache.expires_at("afrr_activation_prices", "CZ", closed_day, True, NOW) == NOW + data_cache.EMPTY_RESULT_TTL
+
+
+def test_past_day_that_is_not_closed_yet_expires_after_past_day_ttl():
+    yesterday = TODAY - timedelta(days=1) # Uzavře se až 24 h po konci dne (data_store.CLOSED_DAY_GRACE)
+    for is_empty in (False, True):
+        assert data_cache.expires_at("aggregated_bids", "CZ", yesterday, is_empty, NOW) == NOW + data_cache.PAST_DAY_TTL
+
+
+def test_today_expires_at_the_next_publication_of_the_dataset():
+    # Čtvrthodinová data: publikace 5 min po konci čtvrthodiny -> 12:20 bruselského času
+    assert data_cache.expires_at("afrr_activation_prices", "CZ", TODAY, False, NOW) == _utc(2025, 6, 10, 10, 20)
+    assert data_cache.expires_at("balancing_bids", "CZ", TODAY, False, NOW) == _utc(2025, 6, 10, 10, 20)
+    # Kapacita po 4hodinových blocích: 00:15, 04:15, 08:15, 12:15, ...
+    assert data_cache.expires_at("procured_capacity", "CZ", TODAY, False, NOW) == _utc(2025, 6, 10, 10, 15)
+
+
+def test_todays_day_ahead_prices_are_kept_until_local_midnight():
+    # Půlnoc v Praze (CEST) = 22:00 UTC
+    assert data_cache.expires_at("day_ahead_prices", "CZ", TODAY, False, NOW) == _utc(2025, 6, 10, 22, 0)
+    assert data_cache.expires_at("day_ahead_prices", "CZ", TODAY, True, NOW) == NOW + data_cache.PUBLICATION_RETRY
+
+
+def test_tomorrows_day_ahead_prices_wait_for_the_auction_publication():
+    tomorrow = TODAY + timedelta(days=1)
+    # Před publikací SDAC (12:45 bruselského času = 10:45 UTC) se čeká na ni
+    assert data_cache.expires_at("day_ahead_prices", "CZ", tomorrow, True, NOW) == _utc(2025, 6, 10, 10, 45)
+    # Po ní (zpožděné výsledky) se zkouší znovu v kratším intervalu
+    after_auction = _utc(2025, 6, 10, 11, 0)
+    assert data_cache.expires_at("day_ahead_prices", "CZ", tomorrow, True, after_auction) == after_auction + data_cache.PUBLICATION_RETRY
+    # Zveřejněné ceny platí do konce svého dne
+    assert data_cache.expires_at("day_ahead_prices", "CZ", tomorrow, False, NOW) == _utc(2025, 6, 11, 22, 0)
+
+
+def test_other_future_data_is_retried_within_past_day_ttl():
+    tomorrow = TODAY + timedelta(days=1)
+    assert data_cache.expires_at("afrr_activation_prices", "CZ", tomorrow, True, NOW) == NOW + data_cache.PAST_DAY_TTL
+    # Těsně před půlnocí se čeká do začátku dne, ale nejméně PUBLICATION_RETRY
+    late_evening = _utc(2025, 6, 10, 21, 55)
+    assert data_cache.expires_at("afrr_activation_prices", "CZ", tomorrow, True, late_evening) == late_evening + data_cache.PUBLICATION_RETRY
+
+
+def test_next_publication_keeps_wall_clock_time_across_dst_change():
+    # 30. 3. 2025 se v Bruselu přechází na letní čas; 13:00 místního času je pak 11:00 UTC
+    now = _utc(2025, 3, 30, 10, 30)
+    assert data_cache.next_publication_after(now, timedelta(days=1), (timedelta(hours=13),)) == _utc(2025, 3, 30, 11, 0)
+    # Den předtím (zimní čas) je 13:00 místního času 12:00 UTC
+    now = _utc(2025, 3, 29, 10, 30)
+    assert data_cache.next_publication_after(now, timedelta(days=1), (timedelta(hours=13),)) == _utc(2025, 3, 29, 12, 0)
+
+
+def test_negative_backoff_grows_exponentially_up_to_its_cap():
+    # Dnešní čtvrthodinová data: publikace v 10:20 UTC, pak rozhoduje exponenciální backoff
+    assert data_cache.negative_retry_at("afrr_activation_prices", "CZ", TODAY, 1, NOW) == _utc(2025, 6, 10, 10, 20)
+    assert data_cache.negative_retry_at("afrr_activation_prices", "CZ", TODAY, 5, NOW) == NOW + timedelta(minutes=16)
+    assert data_cache.negative_retry_at("afrr_activation_prices", "CZ", TODAY, 10, NOW) == NOW + data_cache.NEGATIVE_BACKOFF_MAX
+    # Uzavřený den se může dotazovat až jednou za NEGATIVE_BACKOFF_MAX_CLOSED_DAY
+    closed_day = TODAY - timedelta(days=9)
+    assert data_cache.negative_retry_at("afrr_activation_prices", "CZ", closed_day, 8, NOW) == NOW + timedelta(minutes=128)
+    assert data_cache.negative_retry_at("afrr_activation_prices", "CZ", closed_day, 20, NOW) == NOW + data_cache.NEGATIVE_BACKOFF_MAX_CLOSED_DAY
+
+
+@pytest.fixture
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(data_cache, "_entries", OrderedDict())
+    monkeypatch.setattr(data_cache, "_negative_entries", {})
+    monkeypatch.setattr(data_cache, "_revalidating", set())
+    monkeypatch.setattr(data_cache, "_miss_flights", SingleFlight("cache"))
+
+
+def test_concurrent_misses_count_an_empty_result_once(store_dir, empty_cache):
+    import data_store
+
+    release = threading.Event()
+    calls = []
+
+    @data_cache.cached("afrr_activation_prices")
+    @data_store.persisted("afrr_activation_prices")
+    def fetch(country_code: str, target_date: date):
+        calls.append((country_code, target_date))
+        release.wait(WAIT_S)
+        return pd.DataFrame()
+
+    target_date = date.today() - timedelta(days=10)
+    results = []
+    threads = [_start(lambda: fetch("CZ", target_date), results)]
+    _wait_until(lambda: len(calls) == 1)
+    threads += [_start(lambda: fetch("CZ", target_date), results) for _ in range(9)]
+    _wait_until(lambda: data_cache._miss_flights.coalesced_total == 9)
+
+    release.set()
+    for thread in threads:
+        thread.join(WAIT_S)
+
+    assert len(calls) == 1
+    assert len(results) == 10 and all(isinstance(result, pd.DataFrame) and result.empty for result in results)
+    negative_entry = data_cache._negative_entries[("afrr_activation_prices", "CZ", target_date, "data")]
+    assert negative_entry.failures == 1
+
+    # Do dalšího pokusu se API neptá
+    assert fetch("CZ", target_date).empty
+    assert len(calls) == 1
+
+
+def test_incomplete_result_of_closed_day_is_cached_only_briefly(store_dir, empty_cache):
+    import data_store
+
+    calls = []
+
+    @data_cache.cached("afrr_activation_prices")
+    @data_store.persisted("afrr_activation_prices")
+    def fetch(country_code: str, target_date: date):
+        calls.append(target_date)
+        df = pd.DataFrame({"Timestamp": [datetime(2025, 6, 1)], "afrr_plus_price": [1.0]})
+        df.attrs[data_store.INCOMPLETE_ATTR] = "vynechané části odpovědi: b.zip"
+        return df
+
+    target_date = date.today() - timedelta(days=10)
+    before = datetime.now(UTC)
+    fetch("CZ", target_date)
+
+    entry = data_cache._entries[("afrr_activation_prices", "CZ", target_date, "data")]
+    assert entry.expires_at is not None # Uzavřený den by jinak platil navždy
+    assert entry.expires_at - before <= data_cache.INCOMPLETE_RESULT_TTL + timedelta(seconds=5)
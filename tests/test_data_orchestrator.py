@@ -0,0 +1,121 @@
+# tests/test_data_orchestrator.py
+
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+import data_orchestrator as do
+
+DAY = date(2025, 6, 10)
+
+
+class _ConcurrencyProbe:
+    """Úloha, která si zapamatuje nejvyšší počet současně běžících úloh."""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.started = []
+        self._lock = threading.Lock()
+
+    def job(self, value, duration_s: float = 0.05):
+        def run():
+            with self._lock:
+                self.running += 1
+                self.started.append(value)
+                self.max_running = max(self.max_running, self.running)
+            time.sleep(duration_s)
+            with self._lock:
+                self.running -= 1
+            return value
+        return run
+
+
+def test_page_runs_at_most_max_in_flight_jobs_at_once():
+    probe = _ConcurrencyProbe()
+    jobs = {name: probe.job(name) for name in range(10)}
+
+    results = {name: (result, error) for name, result, error, _ in do.run_concurrently(jobs, max_in_flight=3)}
+
+    assert results == {name: (name, None) for name in range(10)}
+    assert probe.max_running == 3
+
+
+def test_jobs_not_finished_or_not_started_by_deadline_time_out():
+    probe = _ConcurrencyProbe()
+    jobs = {"fast": probe.job("fast", 0.0), "slow": probe.job("slow", 1.0), "queued": probe.job("queued", 0.0)}
+
+    results = {name: error for name, _, error, _ in do.run_concurrently(jobs, deadline_s=0.3, max_in_flight=2)}
+
+    assert results["fast"] is None
+    assert results["queued"] is None # Zadána po doběhnutí "fast"
+    assert isinstance(results["slow"], TimeoutError)
+
+
+def test_job_never_submitted_before_deadline_times_out_without_running():
+    probe = _ConcurrencyProbe()
+    jobs = {"slow": probe.job("slow", 0.5), "queued": probe.job("queued", 0.0)}
+
+    results = {name: error for name, _, error, _ in do.run_concurrently(jobs, deadline_s=0.1, max_in_flight=1)}
+    time.sleep(0.5)
+
+    assert isinstance(results["queued"], TimeoutError)
+    assert probe.started == ["slow"] # "queued" se nespustila ani po deadline
+
+
+def test_failed_job_is_returned_with_its_error():
+    def failing():
+        raise ValueError("chyba")
+
+    [(name, result, error, _)] = list(do.run_concurrently({"job": failing}))
+
+    assert (name, result) == ("job", None)
+    assert isinstance(error, ValueError)
+
+
+def test_averaged_composite_prices_are_marked_as_unweighted_mean():
+    timestamps = pd.date_range("2025-06-10", periods=2, freq="15min")
+    frames = {
+        "DE_50HZ": pd.DataFrame({"Timestamp": timestamps, "afrr_plus_price": [100.0, 200.0]}),
+        "DE_AMPRION": pd.DataFrame({"Timestamp": timestamps, "afrr_plus_price": [300.0, 400.0]}),
+        "DE_TENNET": pd.DataFrame(),
+    }
+
+    merged = do.merge_composite_frames("afrr_activation", frames)
+
+    assert merged["afrr_plus_price"].tolist() == [200.0, 300.0]
+    assert merged.attrs[do.UNWEIGHTED_MEAN_ATTR] == ["DE_50HZ", "DE_AMPRION"]
+    assert merged.attrs[do.MISSING_AREAS_ATTR] == ["DE_TENNET"]
+    assert do.UNWEIGHTED_MEAN_ATTR not in do.merge_composite_frames("aggregated_bids_A67", {
+        "DE_50HZ": pd.DataFrame({"Timestamp": timestamps, "afrr_plus_activated": [1.0, 2.0]}),
+    }).attrs
+
+
+def test_multi_country_jobs_load_the_full_page_only_for_the_main_country():
+    jobs = do.build_multi_country_jobs(DAY, ["CZ", "AT", "SK"])
+
+    page_datasets = set(do.page_dataset_calls(DAY, "CZ"))
+    assert {name for name, country in jobs if country == "CZ"} == page_datasets
+    for country_code in ("AT", "SK"):
+        assert {name for name, country in jobs if country == country_code} == set(do.COMPARISON_DATASETS)
+    assert len(jobs) == len(page_datasets) + 2 * len(do.COMPARISON_DATASETS)
+
+
+def test_multi_country_job_calls_the_fetch_function_of_its_country(monkeypatch):
+    calls = []
+    monkeypatch.setattr(do.dl, "fetch_afrr_activation_prices_data", lambda target_date, country_code: calls.append((target_date, country_code)))
+
+    do.build_multi_country_jobs(DAY, ["CZ", "AT"])[("afrr_activation", "AT")]()
+
+    assert calls == [(DAY, "AT")]
+
+
+def test_composite_country_jobs_merge_member_areas_except_day_ahead():
+    jobs = do.build_multi_country_jobs(DAY, ["DE", "CZ"])
+
+    assert jobs[("day_ahead", "DE")].func is do.dl.fetch_day_ahead_prices_data
+    for name in do.COMPOSITE_MERGE:
+        assert jobs[(name, "DE")].func is do.fetch_composite_area
+        assert jobs[(name, "DE")].args == (name, DAY, "DE")
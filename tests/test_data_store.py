@@ -0,0 +1,128 @@
+# tests/test_data_store.py
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+import pytz
+
+import data_store
+
+# 10. 6. 2025 končí v Bruselu 10. 6. 22:00 UTC, uzavřený je den po něm (CLOSED_DAY_GRACE)
+DAY = date(2025, 6, 10)
+
+
+def _frame(value: float = 1.0) -> pd.DataFrame:
+    return pd.DataFrame({"Timestamp": [datetime(2025, 6, 10)], "value": [value]})
+
+
+@pytest.fixture
+def fetch_results():
+    """Fronta výsledků, které vrací testovací fetch funkce (poslední se opakuje)."""
+    return []
+
+
+@pytest.fixture
+def fetch(store_dir, fetch_results):
+    calls = []
+
+    @data_store.persisted("test_dataset")
+    def fetch_test_dataset(target_date: date, country_code: str, process_type: str = "A51"):
+        calls.append(target_date)
+        return fetch_results.pop(0) if len(fetch_results) > 1 else fetch_results[0]
+
+    fetch_test_dataset.calls = calls
+    return fetch_test_dataset
+
+
+def test_day_is_closed_one_day_after_its_end_in_brussels():
+    day_end = datetime(2025, 6, 10, 22, 0, tzinfo=pytz.utc)
+
+    assert not data_store.is_day_closed(DAY, day_end)
+    assert not data_store.is_day_closed(DAY, day_end + data_store.CLOSED_DAY_GRACE - timedelta(seconds=1))
+    assert data_store.is_day_closed(DAY, day_end + data_store.CLOSED_DAY_GRACE)
+
+
+@pytest.mark.parametrize("arguments, expected", [
+    ({"country_code": "CZ", "target_date": DAY}, ("CZ", DAY, "data")),
+    ({"target_date": DAY, "country_code": "CZ", "process_type": "A67"}, ("CZ", DAY, "A67")),
+    ({"target_date": DAY, "country_code": "CZ", "process_type": "A51", "document_type": "A37"}, ("CZ", DAY, "A51_A37")),
+])
+def test_partition_key_variant_is_built_from_the_other_arguments(arguments, expected):
+    assert data_store._partition_key(arguments) == expected
+
+
+def test_partition_key_applies_defaults_so_positional_and_keyword_calls_share_it(fetch):
+    assert fetch.partition_key(DAY, "CZ") == fetch.partition_key(target_date=DAY, country_code="CZ", process_type="A51") == ("CZ", DAY, "A51")
+    assert fetch.partition_key(DAY, "CZ", "A67") != fetch.partition_key(DAY, "CZ")
+
+
+def test_closed_day_is_stored_and_not_fetched_again(fetch, fetch_results):
+    fetch_results.append(_frame())
+    closed_day = date.today() - timedelta(days=10)
+
+    fetch(closed_day, "CZ")
+    df = fetch(closed_day, "CZ")
+
+    assert fetch.calls == [closed_day]
+    assert fetch.is_stored(closed_day, "CZ")
+    pd.testing.assert_frame_equal(df, _frame())
+
+
+def test_open_day_is_fetched_every_time_and_kept_only_as_last_good(fetch, fetch_results):
+    fetch_results.append(_frame())
+    today = date.today()
+
+    fetch(today, "CZ")
+    fetch(today, "CZ")
+
+    assert fetch.calls == [today, today]
+    assert not fetch.is_stored(today, "CZ")
+    assert data_store.load_last_good("test_dataset", "CZ", today, "A51") is not None
+
+
+def test_empty_result_of_open_day_falls_back_to_last_good(fetch, fetch_results):
+    fetch_results.extend([_frame(42.0), pd.DataFrame()])
+    today = date.today()
+
+    assert data_store.STALE_ATTR not in fetch(today, "CZ").attrs
+    df = fetch(today, "CZ")
+
+    assert df["value"].tolist() == [42.0]
+    assert df.attrs[data_store.STALE_ATTR] <= datetime.now(pytz.utc)
+
+
+def test_closed_day_replaces_its_last_good(fetch, fetch_results):
+    fetch_results.append(_frame())
+    closed_day = date.today() - timedelta(days=10)
+    data_store.save_partition(_frame(0.0), "test_dataset", "CZ", closed_day, f"A51{data_store.LAST_GOOD_SUFFIX}")
+
+    fetch(closed_day, "CZ")
+
+    assert data_store.load_last_good("test_dataset", "CZ", closed_day, "A51") is None
+
+
+def test_empty_result_of_closed_day_is_not_stored(fetch, fetch_results):
+    fetch_results.append(pd.DataFrame())
+    closed_day = date.today() - timedelta(days=10)
+
+    assert fetch(closed_day, "CZ").empty
+    assert not fetch.is_stored(closed_day, "CZ")
+
+
+@pytest.mark.parametrize("days_ago", [0, 10], ids=["open_day", "closed_day"])
+def test_incomplete_result_is_returned_but_never_stored(fetch, fetch_results, store_dir, days_ago):
+    incomplete = _frame()
+    incomplete.attrs[data_store.INCOMPLETE_ATTR] = "vynechané části odpovědi: b.zip"
+    fetch_results.extend([incomplete, _frame(2.0)])
+    target_date = date.today() - timedelta(days=days_ago)
+
+    df = fetch(target_date, "CZ")
+
+    assert data_store.INCOMPLETE_ATTR in df.attrs
+    assert not any(store_dir.rglob("*.parquet"))
+
+    # Další dotaz stáhne den znovu a úplný výsledek se už uloží
+    assert data_store.INCOMPLETE_ATTR not in fetch(target_date, "CZ").attrs
+    assert len(fetch.calls) == 2
+    assert any(store_dir.rglob("*.parquet"))
@@ -0,0 +1,62 @@
+# tests/test_entsoe_documents.py
+
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+from entsoe.exceptions import NoMatchingDataError
+
+import entsoe_documents
+import entsoe_fixtures
+
+_DOMAIN = "10YCZ-CEPS-----N"
+
+
+def _documents() -> dict[str, bytes]:
+    return entsoe_fixtures.split_reserve_bid_document(datetime(2025, 6, 10), datetime(2025, 6, 11), _DOMAIN, n_series=3, parts=3)
+
+
+def _read_all(content: bytes, skipped: list[str] | None = None) -> dict[str, bytes]:
+    return {name: stream.read() for name, stream in entsoe_documents.iter_xml_streams(io.BytesIO(content), "test", skipped)}
+
+
+def test_plain_xml_response_is_a_single_stream():
+    document = next(iter(_documents().values()))
+
+    assert _read_all(document) == {"response.xml": document}
+
+
+@pytest.mark.parametrize("nested", [False, True], ids=["zip", "nested_zip"])
+def test_every_xml_document_is_extracted_from_zip(nested):
+    documents = _documents()
+
+    assert _read_all(entsoe_fixtures.zip_documents(documents, nested=nested)) == documents
+
+
+def test_invalid_nested_zip_is_skipped_and_reported():
+    documents = _documents()
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in documents.items():
+            archive.writestr(name.replace(".xml", ".zip"), entsoe_fixtures.zip_documents({name: content}))
+        archive.writestr("broken.zip", b"PK\x03\x04 truncated")
+    skipped = []
+
+    assert _read_all(buffer.getvalue(), skipped) == documents
+    assert skipped == ["broken.zip: neplatný ZIP"]
+
+
+def test_invalid_top_level_zip_raises():
+    with pytest.raises(zipfile.BadZipFile):
+        _read_all(b"PK\x03\x04 truncated")
+
+
+def test_acknowledgement_raises_no_matching_data_with_its_reason():
+    with pytest.raises(NoMatchingDataError, match="No matching data found"):
+        _read_all(entsoe_fixtures.acknowledgement_document())
+
+
+def test_acknowledgement_with_error_reason_raises_no_matching_data():
+    with pytest.raises(NoMatchingDataError, match="Request too large"):
+        _read_all(entsoe_fixtures.acknowledgement_document("Request too large", reason_code="B18"))
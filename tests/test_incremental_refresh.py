@@ -0,0 +1,105 @@
+# tests/test_incremental_refresh.py
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import data_loader as dl
+
+
+@pytest.fixture(autouse=True)
+def intraday_frames(monkeypatch):
+    frames = {}
+    monkeypatch.setattr(dl, "_intraday_frames", frames)
+    return frames
+
+
+def _window(target_date: date):
+    return dl._local_day_utc_window(target_date, "CZ")
+
+
+def _frame(start, count: int, value: float) -> pd.DataFrame:
+    """`count` čtvrthodinových bodů od `start` s konstantní hodnotou."""
+    return pd.DataFrame({
+        "Timestamp": pd.date_range(start, periods=count, freq="15min"),
+        "value": [value] * count,
+    })
+
+
+class _Download:
+    """Náhrada download(od, do): vrací připravené výsledky a zaznamenává intervaly dotazů."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, start_utc, end_utc):
+        self.calls.append((start_utc, end_utc))
+        return self.results.pop(0)
+
+
+def test_refresh_downloads_only_the_tail_and_replaces_the_overlap(intraday_frames):
+    target_date = date.today()
+    start_utc, end_utc = _window(target_date)
+    key = ("afrr_activation_prices", "CZ", target_date, "data")
+    tail_start = start_utc + timedelta(hours=10)
+
+    # První stažení: 10 h a 3 čtvrthodiny (poslední hodina publikovaná jen částečně)
+    first = _frame(start_utc, 43, 1.0)
+    # Obnova: poslední hodina celá a opravená, k tomu další hodina
+    tail = _frame(tail_start, 8, 2.0)
+    download = _Download(first, tail)
+
+    dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+    df_day = dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+
+    assert download.calls == [(start_utc, end_utc), (tail_start, end_utc)]
+    assert len(df_day) == 48
+    assert df_day["Timestamp"].is_unique and df_day["Timestamp"].is_monotonic_increasing
+    assert (df_day.loc[df_day["Timestamp"] < tail_start, "value"] == 1.0).all()
+    assert (df_day.loc[df_day["Timestamp"] >= tail_start, "value"] == 2.0).all()
+    pd.testing.assert_frame_equal(intraday_frames[key], df_day)
+
+
+def test_empty_tail_keeps_the_previous_data(intraday_frames):
+    target_date = date.today()
+    start_utc, end_utc = _window(target_date)
+    key = ("aggregated_bids", "CZ", target_date, "A67")
+    first = _frame(start_utc, 43, 1.0)
+    download = _Download(first, first.iloc[0:0])
+
+    dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+    df_day = dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+
+    # Poslední (částečná) hodina se nesmí ztratit ani z výsledku, ani z uložených dat dne
+    pd.testing.assert_frame_equal(df_day, first)
+    pd.testing.assert_frame_equal(intraday_frames[key], first)
+
+
+def test_failed_tail_download_keeps_the_previous_data(intraday_frames):
+    target_date = date.today()
+    start_utc, end_utc = _window(target_date)
+    key = ("afrr_activation_prices", "CZ", target_date, "data")
+    first = _frame(start_utc, 43, 1.0)
+    download = _Download(first, None)
+
+    dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+    df_day = dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+
+    pd.testing.assert_frame_equal(df_day, first)
+    pd.testing.assert_frame_equal(intraday_frames[key], first)
+
+
+def test_closed_day_is_always_downloaded_whole(intraday_frames):
+    target_date = date.today() - timedelta(days=10)
+    start_utc, end_utc = _window(target_date)
+    key = ("afrr_activation_prices", "CZ", target_date, "data")
+    day = _frame(start_utc, 96, 1.0)
+    download = _Download(day, day)
+
+    dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+    dl._fetch_day_incrementally(key, start_utc, end_utc, download)
+
+    assert download.calls == [(start_utc, end_utc), (start_utc, end_utc)]
+    assert key not in intraday_frames
@@ -0,0 +1,203 @@
+# tests/test_parsers.py
+
+import contextlib
+import io
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import data_loader as dl
+import data_store
+import entsoe_fixtures
+import entsoe_xml
+
+_DOMAIN = "10YCZ-CEPS-----N"
+
+# Okno lokálního dne CZ v létě (22:00Z-22:00Z), API ho dělí do dvou period na půlnoci UTC
+_WINDOW_START = datetime(2025, 6, 9, 22, 0)
+_WINDOW_END = datetime(2025, 6, 10, 22, 0)
+
+BACKENDS = [backend for backend in entsoe_xml.BACKENDS if entsoe_xml.resolve_backend(backend) == backend]
+
+
+def _two_period_document(document_type: str) -> bytes:
+    document = entsoe_fixtures.balancing_document(document_type, _WINDOW_START, _WINDOW_END, _DOMAIN, split_at_utc_midnight=True)
+    assert document.count(b"<Period>") == 4 # 2 řady (A01, A02) x 2 periody
+    return document
+
+
+@pytest.mark.parametrize("xml_backend", BACKENDS)
+def test_activation_prices_are_read_from_every_period(xml_backend):
+    df = dl._parse_activated_balancing_price_xml_modular(_two_period_document("A84"), xml_backend=xml_backend)
+
+    assert len(df) == 96
+    assert df["Timestamp"].min() == _WINDOW_START
+    assert df["Timestamp"].max() == _WINDOW_END - timedelta(minutes=15)
+    assert df[["afrr_plus_price", "afrr_minus_price"]].notna().all().all()
+
+
+@pytest.mark.parametrize("xml_backend", BACKENDS)
+def test_aggregated_bids_are_read_from_every_period(xml_backend):
+    df = dl._parse_aggregated_bids_xml_modular(_two_period_document("A24"), xml_backend=xml_backend)
+
+    assert len(df) == 2 * 96
+    assert df.groupby("flowDirection", observed=True)["Timestamp"].nunique().to_dict() == {"A01": 96, "A02": 96}
+
+
+def test_closed_day_fetched_across_utc_midnight_is_stored_whole(mock_api, store_dir):
+    target_date = date.today() - timedelta(days=10)
+    start_utc, end_utc = dl._local_day_utc_window(target_date, "CZ")
+
+    fetch_prices = dl.fetch_afrr_activation_prices_data.__wrapped__ # Bez paměťové cache, s úložištěm
+    df_prices = fetch_prices(target_date, "CZ")
+    assert len(df_prices) == (end_utc - start_utc) / timedelta(minutes=15)
+    assert df_prices["Timestamp"].min() == start_utc
+
+    fetch_bids = dl._fetch_single_aggregated_bids_data.__wrapped__
+    df_bids = fetch_bids(target_date, "CZ", "A67")
+    assert len(df_bids) == (end_utc - start_utc) / timedelta(minutes=15)
+    assert fetch_bids.is_stored(target_date, "CZ", "A67")
+
+
+@pytest.mark.parametrize("xml_backend", BACKENDS)
+def test_reserve_bids_are_parsed_from_a_stream_into_typed_columns(xml_backend):
+    document = entsoe_fixtures.reserve_bid_document(_WINDOW_START, _WINDOW_END, _DOMAIN, n_series=4, n_periods=2)
+
+    df = dl._parse_reserve_bid_xml_modular(io.BytesIO(document), "A51", _DOMAIN, xml_backend=xml_backend).to_frame()
+
+    assert len(df) == 4 * 96
+    assert df.groupby("Bid ID", observed=True)["Timestamp"].agg(["min", "max", "nunique"]).to_dict("list") == {
+        "min": [_WINDOW_START] * 4, "max": [_WINDOW_END - timedelta(minutes=15)] * 4, "nunique": [96] * 4,
+    }
+    assert sorted(df["Bid ID"].unique()) == [f"BID-{number:06d}" for number in range(1, 5)]
+    assert df.groupby("Direction", observed=True).size().to_dict() == {"Up": 2 * 96, "Down": 2 * 96}
+    assert (df["ProcessType"] == "A51").all() and (df["ConnectingDomain"] == _DOMAIN).all()
+    assert df["Power (MW)"].gt(0).all() and df["Price (EUR/MWh)"].notna().all()
+
+
+@pytest.mark.parametrize("xml_backend", BACKENDS)
+def test_reserve_bid_point_without_quantity_is_skipped(xml_backend):
+    document = entsoe_fixtures.reserve_bid_document(_WINDOW_START, _WINDOW_END, _DOMAIN, n_series=2)
+    document = re.sub(rb"<quantity\.quantity>[^<]*</quantity\.quantity>", b"", document, count=1)
+
+    df = dl._parse_reserve_bid_xml_modular(document, "A51", _DOMAIN, xml_backend=xml_backend).to_frame()
+
+    assert len(df) == 2 * 96 - 1
+
+
+def test_documents_of_one_response_share_the_column_buffers():
+    documents = entsoe_fixtures.split_reserve_bid_document(_WINDOW_START, _WINDOW_END, _DOMAIN, n_series=5, parts=3)
+    columns = dl._new_reserve_bid_columns()
+
+    for document in documents.values():
+        assert dl._parse_reserve_bid_xml_modular(io.BytesIO(document), "A51", _DOMAIN, columns) is columns
+
+    df = columns.to_frame()
+    assert len(df) == 5 * 96
+    assert df["Bid ID"].nunique() == 5
+    assert list(df["Direction"].cat.categories[:3]) == list(dl._DIRECTION_CATEGORIES)
+
+
+def _empty_last_value(document: bytes, tag: str) -> bytes:
+    """Vyprázdní poslední element `tag` v dokumentu (float("") pak parser odmítne až po ostatních bodech)."""
+    last = list(re.finditer(rf"<{tag}>[^<]*</{tag}>".encode(), document))[-1]
+    return document[:last.start()] + f"<{tag}/>".encode() + document[last.end():]
+
+
+@pytest.fixture
+def served_document(monkeypatch):
+    """Nahradí stahování odpovědi API zadaným obsahem (bytes)."""
+    import streamlit as st
+
+    monkeypatch.setattr(st, "secrets", {"entsoe_api": {"token": "test-token"}})
+
+    def serve(content: bytes) -> None:
+        @contextlib.contextmanager
+        def fetch_document(params, timeout=60):
+            yield io.BytesIO(content)
+        monkeypatch.setattr(dl.entsoe_documents, "fetch_document", fetch_document)
+    return serve
+
+
+def test_failing_document_leaves_no_rows_in_shared_columns():
+    documents = list(entsoe_fixtures.split_reserve_bid_document(_WINDOW_START, _WINDOW_END, _DOMAIN, n_series=4, parts=2).values())
+    columns = dl._new_reserve_bid_columns()
+    dl._parse_reserve_bid_xml_modular(documents[0], "A51", _DOMAIN, columns)
+    rows_after_first = len(columns)
+
+    with pytest.raises(ValueError):
+        dl._parse_reserve_bid_xml_modular(_empty_last_value(documents[1], "energy_Price.amount"), "A51", _DOMAIN, columns)
+
+    assert len(columns) == rows_after_first
+    assert len(columns.to_frame()) == rows_after_first
+
+
+@pytest.mark.parametrize("fetch, documents, value_tag", [
+    (
+        dl.fetch_balancing_bids_for_day_modular,
+        lambda start, end: list(entsoe_fixtures.split_reserve_bid_document(start, end, _DOMAIN, n_series=4, parts=2).values()),
+        "energy_Price.amount",
+    ),
+    (
+        dl.fetch_procured_capacity_data,
+        lambda start, end: [entsoe_fixtures.balancing_document("A15", start, end, _DOMAIN, seed=seed) for seed in (1, 2)],
+        "quantity",
+    ),
+], ids=["A37", "A15"])
+def test_partially_parsed_response_is_not_returned_or_stored(fetch, documents, value_tag, served_document, store_dir):
+    target_date = date.today() - timedelta(days=10)
+    start = datetime(target_date.year, target_date.month, target_date.day)
+    first, second = documents(start, start + timedelta(days=1))
+    served_document(entsoe_fixtures.zip_documents({"a.xml": first, "b.xml": _empty_last_value(second, value_tag)}))
+
+    persisted_fetch = fetch.__wrapped__
+    assert persisted_fetch(target_date, "CZ").empty
+    assert not persisted_fetch.is_stored(target_date, "CZ")
+
+    # Celá odpověď se vrátí i uloží
+    served_document(entsoe_fixtures.zip_documents({"a.xml": first, "b.xml": second}))
+    assert not persisted_fetch(target_date, "CZ").empty
+    assert persisted_fetch.is_stored(target_date, "CZ")
+
+
+def _zip_with_broken_part(document: bytes, broken_part: str) -> bytes:
+    """ZIP odpověď s platným dokumentem a jednou nezpracovatelnou částí (neplatný vnořený ZIP, useknuté XML)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.xml", document)
+        if broken_part == "nested_zip":
+            archive.writestr("b.zip", b"PK\x03\x04 truncated")
+        else:
+            archive.writestr("b.xml", document[:len(document) // 2])
+    return buffer.getvalue()
+
+
+_PARTIAL_RESPONSE_CASES = {
+    "A37": (dl.fetch_balancing_bids_for_day_modular, (), lambda start, end: entsoe_fixtures.reserve_bid_document(start, end, _DOMAIN, n_series=2)),
+    "A15": (dl.fetch_procured_capacity_data, (), lambda start, end: entsoe_fixtures.balancing_document("A15", start, end, _DOMAIN)),
+    "A84": (dl.fetch_afrr_activation_prices_data, (), lambda start, end: entsoe_fixtures.balancing_document("A84", start, end, _DOMAIN)),
+    "A24": (dl._fetch_single_aggregated_bids_data, ("A67",), lambda start, end: entsoe_fixtures.balancing_document("A24", start, end, _DOMAIN)),
+}
+
+
+@pytest.mark.parametrize("broken_part", ["nested_zip", "invalid_xml"])
+@pytest.mark.parametrize("document_type", list(_PARTIAL_RESPONSE_CASES))
+def test_response_with_skipped_part_is_returned_marked_but_not_stored(document_type, broken_part, served_document, store_dir):
+    fetch, extra_args, build_document = _PARTIAL_RESPONSE_CASES[document_type]
+    target_date = date.today() - timedelta(days=10)
+    if document_type in ("A37", "A15"):
+        start = datetime(target_date.year, target_date.month, target_date.day)
+        end = start + timedelta(days=1)
+    else:
+        start, end = dl._local_day_utc_window(target_date, "CZ")
+    served_document(_zip_with_broken_part(build_document(start, end), broken_part))
+
+    persisted_fetch = fetch.__wrapped__
+    df = persisted_fetch(target_date, "CZ", *extra_args)
+
+    assert not df.empty # Zpracovaná část odpovědi se zobrazí
+    assert data_store.INCOMPLETE_ATTR in df.attrs
+    assert not persisted_fetch.is_stored(target_date, "CZ", *extra_args)
+    assert not any(store_dir.rglob("*.parquet")) # Ani jako poslední dobrý výsledek
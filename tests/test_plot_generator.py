@@ -0,0 +1,62 @@
+# tests/test_plot_generator.py
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import plot_generator as pg
+
+_START = datetime(2025, 6, 9, 22, 0) # Začátek dne 10. 6. v CZ (UTC)
+
+
+def _series(start: datetime, periods: int, freq: str, values=None) -> pd.Series:
+    index = pd.date_range(start, periods=periods, freq=freq)
+    return pd.Series(values if values is not None else range(periods), index=index, dtype=float)
+
+
+def test_hourly_series_is_filled_stepwise_onto_the_quarter_hour_index():
+    aligned = pg._align_on_utc_index({
+        "CZ": _series(_START, 8, "15min"),
+        "AT": _series(_START, 2, "h", [50.0, 60.0]),
+    })
+
+    assert list(aligned.columns) == ["CZ", "AT"]
+    assert aligned.index.name == "Timestamp"
+    assert len(aligned) == 8
+    assert aligned["AT"].tolist() == [50.0] * 4 + [60.0] * 4
+
+
+def test_series_is_not_extended_beyond_its_own_coverage():
+    aligned = pg._align_on_utc_index({
+        "CZ": _series(_START, 16, "15min"),
+        "AT": _series(_START, 2, "h", [50.0, 60.0]),
+        "SK": _series(_START, 4, "15min"),
+    })
+
+    assert aligned["AT"].iloc[:8].tolist() == [50.0] * 4 + [60.0] * 4
+    assert aligned["AT"].iloc[8:].isna().all()
+    assert aligned["SK"].iloc[:4].notna().all() and aligned["SK"].iloc[4:].isna().all()
+
+
+def test_series_of_other_countries_are_aligned_on_utc_not_on_position():
+    # Řada s jiným začátkem (jiné časové pásmo lokálního dne) se nesmí posunout na začátek indexu
+    aligned = pg._align_on_utc_index({
+        "CZ": _series(_START, 8, "15min"),
+        "PT": _series(_START + timedelta(hours=1), 4, "15min", [1.0, 2.0, 3.0, 4.0]),
+    })
+
+    assert aligned["PT"].iloc[:4].isna().all()
+    assert aligned["PT"].iloc[4:].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_duplicate_timestamps_keep_the_last_value_and_empty_series_are_dropped():
+    duplicated = pd.concat([_series(_START, 2, "15min", [1.0, 2.0]), _series(_START, 1, "15min", [9.0])])
+
+    aligned = pg._align_on_utc_index({"CZ": duplicated, "AT": pd.Series(dtype=float), "SK": None})
+
+    assert list(aligned.columns) == ["CZ"]
+    assert aligned["CZ"].tolist() == [9.0, 2.0]
+
+
+def test_no_series_gives_empty_frame():
+    assert pg._align_on_utc_index({}).empty
@@ -0,0 +1,73 @@
+# tests/test_rate_limiter.py
+
+import pandas as pd
+import pytest
+from entsoe import EntsoePandasClient
+
+import entsoe_http
+
+
+@pytest.fixture
+def retrying_session(monkeypatch, mock_api):
+    """Nová sdílená session s opakováním bez backoffu; mock server vrací 500 (bez Retry-After)."""
+    monkeypatch.setattr(entsoe_http, "RETRY_POLICY", entsoe_http.RETRY_POLICY.new(backoff_factor=0))
+    monkeypatch.setattr(entsoe_http, "_session", None)
+    mock_api.error_rate = 1.0
+    mock_api.error_status = 500
+    return mock_api
+
+
+def _acquired(lane: str) -> int:
+    return entsoe_http.get_rate_limiter_stats()[lane]["acquired"]
+
+
+def test_every_retry_takes_a_token(retrying_session):
+    response = entsoe_http.get({"documentType": "A84", "securityToken": "test-token"}, timeout=5)
+
+    assert response.status_code == 500
+    attempts = 1 + entsoe_http.RETRY_POLICY.status
+    assert sum(retrying_session.stats.values()) == attempts
+    assert _acquired("interactive") == attempts
+
+
+def test_retries_keep_the_priority_of_the_request(retrying_session):
+    with entsoe_http.request_priority(entsoe_http.PRIORITY_BACKGROUND):
+        entsoe_http.get({"documentType": "A84", "securityToken": "test-token"}, timeout=5)
+
+    assert _acquired("interactive") == 0
+    assert _acquired("background") == 1 + entsoe_http.RETRY_POLICY.status
+
+
+def test_set_rate_changes_refill_rate():
+    limiter = entsoe_http.TokenBucketLimiter(300, 10)
+    limiter.set_rate(60)
+
+    assert limiter.rate_per_s == 1.0
+
+
+def test_requests_to_the_default_api_url_are_redirected(mock_api):
+    params = {"documentType": "A84", "securityToken": "test-token"}
+
+    response = entsoe_http.get_session().get(entsoe_http.ENTSOE_DEFAULT_API_URL, params=params, timeout=5)
+
+    assert response.url.startswith(mock_api.base_url)
+    assert sum(count for (document_type, _), count in mock_api.stats.items() if document_type == "A84") == 1
+
+
+def test_entsoe_py_client_is_redirected_to_the_configured_api(mock_api):
+    client = EntsoePandasClient(api_key="test-token", session=entsoe_http.get_session(), retry_count=1, retry_delay=0)
+
+    prices = client.query_day_ahead_prices("CZ", start=pd.Timestamp("2025-06-10", tz="Europe/Prague"), end=pd.Timestamp("2025-06-11", tz="Europe/Prague"))
+
+    assert not prices.empty
+    assert any(document_type == "A44" for document_type, _ in mock_api.stats)
+
+
+def test_other_urls_are_not_rewritten(monkeypatch, mock_api):
+    # Přesměrování platí jen pro výchozí adresu API, jiná adresa se použije beze změny
+    monkeypatch.setattr(entsoe_http, "ENTSOE_API_URL", "http://127.0.0.1:9/api")
+    params = {"documentType": "A84", "securityToken": "test-token"}
+
+    response = entsoe_http.get_session().get(mock_api.base_url, params=params, timeout=5)
+
+    assert response.url.startswith(mock_api.base_url) # Na přesměrovanou adresu (port 9) by spojení selhalo
@@ -0,0 +1,153 @@
+# tests/test_single_flight.py
+
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from single_flight import SingleFlight
+
+WAIT_S = 5
+
+
+def _wait_until(condition) -> None:
+    deadline = time.monotonic() + WAIT_S
+    while not condition():
+        assert time.monotonic() < deadline, "podmínka nenastala včas"
+        time.sleep(0.001)
+
+
+def _start(target, results: list) -> threading.Thread:
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            results.append(e)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_concurrent_callers_are_coalesced_into_one_call():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(WAIT_S)
+        return object()
+
+    results = []
+    threads = [_start(lambda: flight.do("key", fetch), results)]
+    _wait_until(lambda: flight.in_flight() == 1)
+    threads += [_start(lambda: flight.do("key", fetch), results) for _ in range(9)]
+    _wait_until(lambda: flight.coalesced_total == 9)
+
+    release.set()
+    for thread in threads:
+        thread.join(WAIT_S)
+
+    assert len(calls) == 1
+    assert len(results) == 10
+    assert all(result is results[0] for result in results) # Všichni dostanou výsledek jediného volání
+    assert flight.in_flight() == 0
+
+
+def test_waiters_receive_the_leaders_exception():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(WAIT_S)
+        raise ValueError("API nedostupné")
+
+    results = []
+    threads = [_start(lambda: flight.do("key", fetch), results)]
+    _wait_until(lambda: flight.in_flight() == 1)
+    threads += [_start(lambda: flight.do("key", fetch), results) for _ in range(4)]
+    _wait_until(lambda: flight.coalesced_total == 4)
+
+    release.set()
+    for thread in threads:
+        thread.join(WAIT_S)
+
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_key_is_released_after_the_call_finishes():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", fetch) == 1
+    assert flight.do("key", fetch) == 2 # Výsledek se nedrží, další volání jde znovu
+    assert flight.coalesced_total == 0
+
+    def failing_fetch():
+        raise RuntimeError("chyba")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", failing_fetch)
+    assert flight.in_flight() == 0
+    assert flight.do("key", fetch) == 3
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        release.wait(WAIT_S)
+        return key
+
+    results = []
+    threads = [_start(lambda key=key: flight.do(key, lambda: fetch(key)), results) for key in ("a", "b", "c")]
+    _wait_until(lambda: flight.in_flight() == 3)
+    release.set()
+    for thread in threads:
+        thread.join(WAIT_S)
+
+    assert sorted(calls) == ["a", "b", "c"]
+    assert sorted(results) == ["a", "b", "c"]
+    assert flight.coalesced_total == 0
+
+
+def test_persisted_fetches_for_the_same_partition_share_one_request(store_dir):
+    import data_store
+
+    release = threading.Event()
+    calls = []
+
+    @data_store.persisted("test_dataset")
+    def fetch(country_code: str, target_date: date, process_type: str):
+        calls.append((country_code, target_date, process_type))
+        release.wait(WAIT_S)
+        return pd.DataFrame({"value": [1.0]})
+
+    coalesced_before = data_store.in_flight_fetches.coalesced_total
+    results = []
+    threads = [_start(lambda: fetch("CZ", date.today(), "A51"), results)]
+    _wait_until(lambda: len(calls) == 1)
+    threads += [_start(lambda: fetch("CZ", date.today(), "A51"), results) for _ in range(7)]
+    _wait_until(lambda: data_store.in_flight_fetches.coalesced_total - coalesced_before == 7)
+
+    release.set()
+    for thread in threads:
+        thread.join(WAIT_S)
+
+    assert calls == [("CZ", date.today(), "A51")]
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
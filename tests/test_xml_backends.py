@@ -0,0 +1,49 @@
+# tests/test_xml_backends.py
+
+import os
+from pathlib import Path
+
+import pytest
+
+# V CI se srovnání backendů nesmí tiše přeskočit (lxml je v requirements-dev.txt)
+if os.environ.get("CI"):
+    import lxml # noqa: F401
+else:
+    pytest.importorskip("lxml")
+
+import bench_parsers
+import check_xml_backends
+import entsoe_xml
+
+
+def _corpus() -> dict[str, tuple[str, bytes]]:
+    """Korpus check_xml_backends.py, volitelně s nahranými odpověďmi mock serveru (SVR_XML_FIXTURES_DIR)."""
+    corpus = check_xml_backends.build_corpus()
+    fixtures_dir = os.environ.get("SVR_XML_FIXTURES_DIR")
+    if fixtures_dir:
+        corpus.update(check_xml_backends.load_fixtures(Path(fixtures_dir)))
+    return corpus
+
+
+CORPUS = _corpus()
+
+
+@pytest.mark.parametrize("name", list(CORPUS))
+def test_lxml_and_etree_parse_identically(name):
+    document_type, content = CORPUS[name]
+    default_backend = entsoe_xml.backend
+
+    assert check_xml_backends.compare(name, document_type, content) is None
+    assert entsoe_xml.backend == default_backend # Backend se předává parametrem, globální nastavení se nemění
+
+
+def test_unexpected_exception_is_a_difference_even_if_both_backends_raise_it(monkeypatch):
+    def failing_parser(document: bytes, xml_backend: str | None = None):
+        raise RuntimeError("chyba parseru")
+
+    monkeypatch.setitem(bench_parsers.PARSERS, "activation_prices", failing_parser)
+    document_type, content = CORPUS["a84_short_15min"]
+
+    assert check_xml_backends.compare("a84_short_15min", document_type, content) is not None
+    # U poškozeného dokumentu se selhání obou backendů toleruje
+    assert check_xml_backends.compare("a84_short_15min_truncated", document_type, content) is None